@@ -0,0 +1,98 @@
+"""
+Latency of short recipe executions sharing an event loop with long ones.
+
+Thousands of "Hello world" executions are started on one event loop next to
+a few recipes that loop for a hundred thousand instructions and more. Since
+Execution.run_async hands the event loop over every slice of instructions,
+the short executions should finish in milliseconds whatever the long ones
+do, the smaller the slices the lower their latency. The short recipe runs
+its method in a loop of one iteration, so that its instructions are all
+executed instead of folded (see chef.fold_prefix).
+
+    python benchmarks/async_sessions.py
+"""
+
+import asyncio
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from chef import Chef, Execution, fold_prefix  # noqa: E402
+
+SHORT_SESSIONS = 2_000
+LONG_SESSIONS = 10
+SLICE_SIZES = [100, 1_000, 10_000, 1_000_000]
+
+LONG_RECIPE = """Long Loop.
+
+Ingredients.
+50000 g counter
+1 g one
+
+Method.
+Spin the counter.
+Put one into the mixing bowl.
+Fold one into the mixing bowl.
+Spin the counter until spun.
+
+Serves 1.
+"""
+
+
+# Hello World with its method in a loop of one iteration
+def short_recipe(script):
+    script = script.replace("Ingredients.\n", "Ingredients.\n1 g oven\n")
+    script = script.replace("Method.\n", "Method.\nHeat the oven.\n")
+    pour = "Pour contents of the mixing bowl into the baking dish.\n"
+    return script.replace(pour, pour + "Heat the oven until heated.\n")
+
+
+def compile_recipe(script):
+    chef = Chef(script)
+    chef.parse_script()
+    return chef.program
+
+
+async def session(program, slice_size, latencies):
+    start = time.perf_counter()
+    await asyncio.sleep(0)
+    await Execution(program).run_async(io.StringIO(), slice_size=slice_size)
+    latencies.append(time.perf_counter() - start)
+
+
+async def run(short, long, slice_size):
+    short_latencies, long_latencies = [], []
+    tasks = [session(long, slice_size, long_latencies) for _ in range(LONG_SESSIONS)]
+    tasks += [
+        session(short, slice_size, short_latencies) for _ in range(SHORT_SESSIONS)
+    ]
+    await asyncio.gather(*tasks)
+    short_latencies.sort()
+    return (
+        short_latencies[len(short_latencies) // 2],
+        short_latencies[len(short_latencies) * 99 // 100],
+        max(long_latencies),
+    )
+
+
+def main():
+    examples = os.path.join(os.path.dirname(__file__), "..", "examples")
+    with open(os.path.join(examples, "hello_world.txt")) as f:
+        short = compile_recipe(short_recipe(f.read()))
+    long = compile_recipe(LONG_RECIPE)
+    assert fold_prefix(short)[0] == 0 and fold_prefix(long)[0] == 0
+
+    print(f"{'slice size':>12} {'short p50 ms':>14} {'short p99 ms':>14}", end=" ")
+    print(f"{'long max s':>12}")
+    for slice_size in SLICE_SIZES:
+        p50, p99, slowest = asyncio.run(run(short, long, slice_size))
+        print(
+            f"{slice_size:>12} {p50 * 1e3:>14.1f} {p99 * 1e3:>14.1f} {slowest:>12.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
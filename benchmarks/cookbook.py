@@ -0,0 +1,90 @@
+"""
+Opening a cookbook of many recipes and cooking one of them.
+
+The cookbook is a temporary file of independent recipes, each one with an
+auxiliary recipe. Cookbook indexes it in one streaming pass, so opening it
+should take time linear in its size but little memory, and cooking a single
+recipe should cost the same whatever the size of the cookbook.
+
+    python benchmarks/cookbook.py [number of recipes]
+"""
+
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from chef import Cookbook  # noqa: E402
+from corpus import recipe  # noqa: E402
+
+COUNTS = [100, 1_000, 10_000, 100_000]
+
+
+def generate_recipe(number):
+    auxiliary = (
+        f"Sauce {number}.\n\n"
+        f"Ingredients.\n{number % 100} g sugar\n\n"
+        "Method.\nPut sugar into the mixing bowl.\n\n"
+    )
+    return recipe(
+        f"Dish {number}",
+        [f"{number % 1000} g flour", "10 ml water"],
+        [
+            "Put flour into the mixing bowl.",
+            f"Serve with sauce {number}.",
+            "Put water into the mixing bowl.",
+            "Liquefy water.",
+            "Pour contents of the mixing bowl into the baking dish.",
+        ],
+        auxiliary=auxiliary,
+    )
+
+
+def run(count, directory):
+    path = os.path.join(directory, f"cookbook-{count}.chef")
+    with open(path, "w") as f:
+        for number in range(count):
+            f.write(generate_recipe(number))
+
+    start = time.perf_counter()
+    cookbook = Cookbook(path, cache=False)
+    index = time.perf_counter() - start
+    assert len(cookbook) == count
+
+    # measured apart, tracing slows the scan down
+    tracemalloc.start()
+    Cookbook(path, cache=False)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    cookbook.cook(f"Dish {count - 1}", io.StringIO())
+    cook = time.perf_counter() - start
+
+    return os.path.getsize(path), index, peak, cook
+
+
+def main():
+    max_count = int(sys.argv[1]) if len(sys.argv) > 1 else COUNTS[-1]
+
+    print(
+        f"{'recipes':>8} {'bytes':>12} {'index s':>9} {'MB/s':>7}"
+        f" {'peak MB':>8} {'cook ms':>8}"
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        for count in COUNTS:
+            if count > max_count:
+                break
+            size, index, peak, cook = run(count, directory)
+            print(
+                f"{count:>8} {size:>12} {index:>9.3f} {size / index / 1e6:>7.1f}"
+                f" {peak / 1e6:>8.2f} {cook * 1e3:>8.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
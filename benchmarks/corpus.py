@@ -0,0 +1,167 @@
+"""
+Canonical recipes for the benchmark suite (see suite.py). Every recipe
+stresses a different part of the interpreter; they are generated so that
+their size can be tuned with the scale argument.
+"""
+
+import os
+
+EXAMPLES = os.path.join(os.path.dirname(__file__), "..", "examples")
+
+
+def ordinal(number):
+    if 10 <= number % 100 <= 20:
+        suffix = "th"
+    else:
+        suffix = {1: "st", 2: "nd", 3: "rd"}.get(number % 10, "th")
+    return f"{number}{suffix}"
+
+
+def recipe(title, ingredients, method, serves=1, auxiliary=""):
+    return (
+        f"{title}.\n\n"
+        "Ingredients.\n" + "\n".join(ingredients) + "\n\n"
+        "Method.\n" + "\n".join(method) + "\n\n"
+        f"Serves {serves}.\n\n" + auxiliary
+    )
+
+
+def hello_world(scale):
+    with open(os.path.join(EXAMPLES, "hello_world.txt")) as f:
+        return f.read()
+
+
+def factorial(scale):
+    with open(os.path.join(EXAMPLES, "factorial.txt")) as f:
+        return f.read().replace("\n10 g n\n", f"\n{min(30 * scale, 200)} g n\n")
+
+
+# Thousands of ingredients, every one of them used once
+def long_ingredient_list(scale):
+    count = 2_000 * scale
+    ingredients = [f"{i % 1000} g ingredient {i}" for i in range(count)]
+    method = [f"Put ingredient {i} into the mixing bowl." for i in range(count)]
+    method.append("Pour contents of the mixing bowl into the baking dish.")
+    return recipe("Long Ingredient List", ingredients, method)
+
+
+# A single mixing bowl growing to hundreds of thousands of ingredients
+def deep_stack(scale):
+    ingredients = [f"{50_000 * scale} g counter", "42 g answer"]
+    method = [
+        "Stack the counter.",
+        "Put answer into the mixing bowl.",
+        "Stack the counter until stacked.",
+        "Pour contents of the mixing bowl into the baking dish.",
+        "Pour contents of the mixing bowl into the baking dish.",
+    ]
+    return recipe("Deep Stack", ingredients, method)
+
+
+# Stirring a bowl of a few hundred ingredients over and over
+def stir_heavy(scale):
+    ingredients = ["500 g filler", f"{5_000 * scale} g counter", "7 g spoons"]
+    method = [
+        "Fill the filler.",
+        "Put filler into the mixing bowl.",
+        "Fill the filler until filled.",
+        "Stir the counter.",
+        "Stir the mixing bowl for 300 minutes.",
+        "Stir spoons into the mixing bowl.",
+        "Stir the counter until stirred.",
+        "Pour contents of the mixing bowl into the baking dish.",
+    ]
+    return recipe("Stir Heavy", ingredients, method)
+
+
+# Mixing a bowl of thousands of ingredients over and over
+def mix_heavy(scale):
+    ingredients = ["5000 g filler", f"{200 * scale} g counter"]
+    method = [
+        "Fill the filler.",
+        "Put filler into the mixing bowl.",
+        "Fill the filler until filled.",
+        "Whisk the counter.",
+        "Mix the mixing bowl well.",
+        "Whisk the counter until whisked.",
+        "Pour contents of the mixing bowl into the baking dish.",
+    ]
+    return recipe("Mix Heavy", ingredients, method)
+
+
+# Additions, subtractions and multiplications in a tight loop
+def arithmetic_loop(scale):
+    ingredients = [f"{20_000 * scale} g counter", "1 g one", "3 g three", "0 g total"]
+    method = [
+        "Put total into the mixing bowl.",
+        "Count the counter.",
+        "Add three to the mixing bowl.",
+        "Combine one into the mixing bowl.",
+        "Remove one from the mixing bowl.",
+        "Count the counter until counted.",
+        "Pour contents of the mixing bowl into the baking dish.",
+    ]
+    return recipe("Arithmetic Loop", ingredients, method)
+
+
+# Hundreds of mixing bowls used in turn
+def many_mixing_bowls(scale):
+    bowls = 200
+    ingredients = [f"{50 * scale} g counter", "1 g one"]
+    method = ["Rotate the counter."]
+    for i in range(1, bowls + 1):
+        method.append(f"Put one into the {ordinal(i)} mixing bowl.")
+    method.append("Rotate the counter until rotated.")
+    for i in range(1, bowls + 1):
+        method.append(
+            f"Pour contents of the {ordinal(i)} mixing bowl into the 1st baking dish."
+        )
+    return recipe("Many Mixing Bowls", ingredients, method)
+
+
+# A large set of auxiliary recipes, every one of them served
+def many_auxiliary_recipes(scale):
+    count = 300 * scale
+    ingredients = ["1 g one"]
+    method = ["Put one into the mixing bowl."]
+    auxiliary = []
+    for i in range(count):
+        method.append(f"Serve with sauce {i}.")
+        auxiliary.append(
+            f"Sauce {i}.\n\n"
+            f"Ingredients.\n{i % 100} g sugar\n\n"
+            "Method.\nClean the mixing bowl.\nPut sugar into the mixing bowl.\n\n"
+        )
+    method.append("Pour contents of the mixing bowl into the baking dish.")
+    return recipe(
+        "Many Auxiliary Recipes", ingredients, method, auxiliary="".join(auxiliary)
+    )
+
+
+# Hundreds of kilobytes of liquid output
+def large_serve(scale):
+    ingredients = [f"{100_000 * scale} g counter", "97 ml letter", "10 ml newline"]
+    method = [
+        "Write the counter.",
+        "Put letter into the mixing bowl.",
+        "Write the counter until written.",
+        "Put newline into the mixing bowl.",
+        "Liquefy contents of the mixing bowl.",
+        "Pour contents of the mixing bowl into the 1st baking dish.",
+        "Pour contents of the mixing bowl into the 2nd baking dish.",
+    ]
+    return recipe("Large Serve", ingredients, method, serves=2)
+
+
+CORPUS = {
+    "hello_world": hello_world,
+    "factorial": factorial,
+    "long_ingredient_list": long_ingredient_list,
+    "deep_stack": deep_stack,
+    "stir_heavy": stir_heavy,
+    "mix_heavy": mix_heavy,
+    "arithmetic_loop": arithmetic_loop,
+    "many_mixing_bowls": many_mixing_bowls,
+    "many_auxiliary_recipes": many_auxiliary_recipes,
+    "large_serve": large_serve,
+}
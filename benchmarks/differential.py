@@ -0,0 +1,221 @@
+"""
+Differential check of the execution backends against the reference one.
+
+Every recipe of the benchmark corpus and of examples/, and a few thousand
+randomly generated recipes, are cooked by every backend of chef.BACKENDS (in
+both stack representations). The output, the error raised if any, and the
+final ingredients, mixing bowls and baking dishes must be the same as with
+Execution, the reference interpreter, profiled so that it executes every
+instruction instead of folding the constant prefix of the method. The
+random recipes use every instruction, numbered and unnumbered mixing bowls
+and baking dishes, nested loops, auxiliary recipes and input, and many of
+them fail on purpose.
+Every execution is seeded the same, so that they all mix the same way.
+
+    python benchmarks/differential.py [number of random recipes] [--seed N]
+"""
+
+import argparse
+import io
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from chef import BACKENDS, Chef, Execution, InputSource, Profiler  # noqa: E402
+from corpus import CORPUS, ordinal, recipe  # noqa: E402
+
+SCALE = 1
+
+
+# How a recipe refers to its mixing bowls and baking dishes: always without a
+# number, always with one, or both (which often breaks the rules on purpose)
+STYLES = ["unnumbered", "numbered", "mixed"]
+
+
+def stack(rng, style, kind):
+    if style == "unnumbered" or style == "mixed" and rng.random() < 0.5:
+        return f"the {kind}"
+    return f"the {ordinal(rng.randint(1, 3))} {kind}"
+
+
+def statement(rng, names, auxiliary, style):
+    name = rng.choice(names)
+    bowl = stack(rng, style, "mixing bowl")
+    choices = [
+        f"Put {name} into {bowl}.",
+        f"Fold {name} into {bowl}.",
+        f"Add {name} to {bowl}.",
+        f"Remove {name} from {bowl}.",
+        f"Combine {name} into {bowl}.",
+        f"Divide {name} into {bowl}.",
+        f"Add dry ingredients to {bowl}.",
+        f"Liquefy {name}.",
+        f"Liquefy contents of {bowl}.",
+        f"Stir {bowl} for {rng.randint(0, 4)} minutes.",
+        f"Stir {name} into {bowl}.",
+        f"Mix {bowl} well.",
+        f"Clean {bowl}.",
+        f"Pour contents of {bowl} into {stack(rng, style, 'baking dish')}.",
+        f"Take {name} from refrigerator.",
+    ]
+    if auxiliary:
+        choices.append(f"Serve with {rng.choice(auxiliary)}.")
+    if rng.random() < 0.02:
+        if rng.random() < 0.5:
+            return "Refrigerate."
+        return f"Refrigerate for {rng.randint(1, 2)} hours."
+    # most recipes should get far enough to exercise the other instructions
+    if rng.random() < 0.4:
+        return choices[0]
+    return rng.choice(choices)
+
+
+def method(rng, names, auxiliary, style, length, depth=0):
+    lines = []
+    while len(lines) < length:
+        if depth < 2 and rng.random() < 0.1:
+            counter = f"counter {depth} {len(lines)}"
+            lines.append(f"Simmer the {counter}.")
+            body = method(rng, names, auxiliary, style, rng.randint(1, 6), depth + 1)
+            if rng.random() < 0.2:
+                body.insert(rng.randint(0, len(body)), "Set aside.")
+            lines.extend(body)
+            lines.append(f"Simmer the {counter} until simmered.")
+        else:
+            lines.append(statement(rng, names, auxiliary, style))
+    return lines
+
+
+# Ingredients counting the iterations of the loops
+def counters(lines):
+    return [
+        line[len("Simmer the ") : -1]
+        for line in lines
+        if line.startswith("Simmer the ") and not line.endswith("until simmered.")
+    ]
+
+
+def ingredients(rng, names, lines):
+    declarations = []
+    for name in names:
+        measure = rng.choice(["", "g ", "ml ", "cups "])
+        declarations.append(f"{rng.randint(0, 120)} {measure}{name}")
+    for counter in counters(lines):
+        declarations.append(f"{rng.randint(0, 3)} {counter}")
+    return declarations
+
+
+def random_recipe(rng):
+    names = [f"ingredient {i}" for i in range(rng.randint(1, 5))]
+    sauces = [f"sauce {i}" for i in range(rng.randint(0, 2))]
+    style = rng.choices(STYLES, [0.45, 0.45, 0.1])[0]
+    auxiliary = []
+    for index, sauce in enumerate(sauces):
+        # auxiliary recipes only serve the ones after them, so cooking ends
+        lines = method(rng, names, sauces[index + 1 :], style, rng.randint(1, 6))
+        auxiliary.append(
+            f"{sauce.capitalize()}.\n\n"
+            "Ingredients.\n" + "\n".join(ingredients(rng, names, lines)) + "\n\n"
+            "Method.\n" + "\n".join(lines) + "\n\n"
+        )
+    # fill the mixing bowls first and pour them at the end, so that more
+    # recipes get to cook and serve something
+    if style == "unnumbered":
+        bowls = ["the mixing bowl"]
+    else:
+        bowls = [f"the {ordinal(number)} mixing bowl" for number in (1, 2, 3)]
+    lines = [f"Put {rng.choice(names)} into {bowl}." for bowl in bowls * 2]
+    lines += method(rng, names, sauces, style, rng.randint(1, 25))
+    dish = stack(rng, style, "baking dish")
+    lines.append(f"Pour contents of {bowls[-1]} into {dish}.")
+    source = recipe(
+        "Random Recipe",
+        ingredients(rng, names, lines),
+        lines,
+        serves=rng.randint(1, 3),
+        auxiliary="".join(auxiliary),
+    )
+    numbers = " ".join(str(rng.randint(0, 50)) for _ in range(rng.randint(0, 10)))
+    return source, numbers
+
+
+def stacks(stacks):
+    return [list(stack.serving_order()) for stack in stacks]
+
+
+def cook(backend, program, compact, numbers, profiler=None):
+    execution = backend(program, compact=compact, seed=0)
+    output = io.StringIO()
+    error = None
+    try:
+        source = InputSource(io.BytesIO(numbers.encode()))
+        execution.run(output, profiler, source)
+        if not execution.refrigerated:
+            execution.serve(output)
+    except Exception as e:
+        error = (type(e).__name__, str(e))
+    return (
+        output.getvalue(),
+        error,
+        execution.refrigerated,
+        execution.values,
+        execution.ingredient_types,
+        stacks(execution.mixing_bowls),
+        stacks(execution.baking_dishes),
+        execution.number_of_mixing_bowls,
+        execution.number_of_baking_dishes,
+    )
+
+
+def compare(name, source, numbers=""):
+    chef = Chef(source)
+    chef.parse_script()
+    mismatches = 0
+    for compact in (False, True):
+        expected = cook(Execution, chef.program, compact, numbers, Profiler())
+        for backend_name, backend in BACKENDS.items():
+            # a fresh program, so the backend compiles it again
+            chef.parse_script()
+            result = cook(backend, chef.program, compact, numbers)
+            if result != expected:
+                mismatches += 1
+                print(f"{name}: {backend_name} (compact={compact}) differs")
+                print(f"  expected {expected[:3]}\n  got      {result[:3]}")
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("count", type=int, nargs="?", default=3000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    mismatches = 0
+    for name, generate in CORPUS.items():
+        mismatches += compare(name, generate(SCALE))
+    examples = os.path.join(os.path.dirname(__file__), "..", "examples")
+    for name in sorted(os.listdir(examples)):
+        if name.endswith((".chef", ".txt")):
+            with open(os.path.join(examples, name)) as f:
+                mismatches += compare(name, f.read())
+
+    rng = random.Random(args.seed)
+    errors = 0
+    for number in range(args.count):
+        source, numbers = random_recipe(rng)
+        mismatches += compare(f"random recipe {number}", source, numbers)
+        chef = Chef(source)
+        chef.parse_script()
+        errors += cook(Execution, chef.program, False, numbers)[1] is not None
+
+    print(
+        f"{len(CORPUS)} corpus recipes, examples and {args.count} random recipes"
+        f" ({errors} failing on purpose): {mismatches} mismatches"
+    )
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Re-parse time of a 10,000 line recipe after a one line edit.
+
+Chef.apply_edit only scans the sections around an edit again, and only
+compiles the method lines that changed, so editing one line should take
+milliseconds where parsing the whole script again takes much longer. An
+edit to the ingredients that moves the symbol table has to compile the
+whole method again (declaring one again, here), it is shown for comparison.
+
+    python benchmarks/incremental_parse.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from chef import Chef  # noqa: E402
+
+INGREDIENTS = 1_000
+METHOD_LINES = 8_000
+AUXILIARY_RECIPES = 250
+REPEAT = 20
+
+
+def generate_recipe():
+    ingredients = [f"{i} g ingredient {i}" for i in range(INGREDIENTS)]
+    method = []
+    for i in range(METHOD_LINES // 4):
+        name = f"ingredient {i % INGREDIENTS}"
+        method.append(f"Stir the {name}.")
+        method.append(f"Put {name} into the mixing bowl.")
+        method.append("Stir the mixing bowl for 3 minutes.")
+        method.append(f"Stir the {name} until stirred.")
+    auxiliary = [
+        f"Sauce {i}.\n\nIngredients.\n{i} g sugar\n\n"
+        "Method.\nPut sugar into the mixing bowl.\n\n"
+        for i in range(AUXILIARY_RECIPES)
+    ]
+    return (
+        "Incremental Benchmark.\n\n"
+        "Ingredients.\n" + "\n".join(ingredients) + "\n\n"
+        "Method.\n" + "\n".join(method) + "\n\n"
+        "Serves 1.\n\n" + "".join(auxiliary)
+    )
+
+
+def time_edit(chef, old, new):
+    start = chef.script.index(old)
+    begin = time.perf_counter()
+    chef.apply_edit(start, start + len(old), new)
+    elapsed = time.perf_counter() - begin
+    # undo, so that every repeat edits the same script
+    chef.apply_edit(start, start + len(new), old)
+    return elapsed
+
+
+def main():
+    script = generate_recipe()
+    print(f"{script.count(chr(10))} lines, {len(script)} bytes\n")
+
+    begin = time.perf_counter()
+    for _ in range(REPEAT):
+        chef = Chef(script)
+        chef.parse_script()
+    full = (time.perf_counter() - begin) / REPEAT
+
+    edits = {
+        "method line": (
+            "Put ingredient 500 into the mixing bowl.",
+            "Put ingredient 499 into the mixing bowl.",
+        ),
+        "new method line": (
+            "Stir the ingredient 500.\n",
+            "Stir the ingredient 500.\nFold ingredient 7 into the mixing bowl.\n",
+        ),
+        "ingredient value": ("\n17 g ingredient 17\n", "\n42 g ingredient 17\n"),
+        "new ingredient": (
+            "\n999 g ingredient 999\n",
+            "\n999 g ingredient 999\n1 g ingredient 1000\n",
+        ),
+        "shadowed ingredient": (
+            "\n999 g ingredient 999\n",
+            "\n999 g ingredient 999\n1 g ingredient 3\n",
+        ),
+        "auxiliary recipe": ("Sauce 100.", "Gravy 100."),
+    }
+
+    print(f"{'edit':<20} {'ms':>10} {'speedup':>10}")
+    print(f"{'full parse':<20} {full * 1e3:>10.2f} {1:>10.1f}")
+    for name, (old, new) in edits.items():
+        elapsed = min(time_edit(chef, old, new) for _ in range(REPEAT))
+        print(f"{name:<20} {elapsed * 1e3:>10.2f} {full / elapsed:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Per-instruction cost of ingredient lookups as the ingredient list grows.
+
+Every recipe generated here runs the same number of instructions, each one
+referencing an ingredient declared at the end of the list (the worst case for
+a linear scan). With the symbol table built in Chef.parse_ingredients the
+names are resolved to slots when the recipe is compiled, which is not timed,
+so the cost per executed instruction should stay flat no matter how many
+ingredients are declared (setting up the ingredients of the execution adds
+a little with tens of thousands of them).
+
+    python benchmarks/ingredient_lookup.py
+"""
+
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from chef import Chef  # noqa: E402
+
+INGREDIENT_COUNTS = [10, 100, 1_000, 10_000, 50_000]
+INSTRUCTIONS = 20_000
+
+
+def generate_recipe(number_of_ingredients, number_of_instructions):
+    ingredients = [f"{i % 100} g ingredient {i}" for i in range(number_of_ingredients)]
+    # in a loop of one iteration, so that the instructions are executed
+    # instead of folded (see chef.fold_prefix)
+    ingredients.append("1 g oven")
+    method = ["Heat the oven."]
+    for i in range(number_of_instructions):
+        name = f"ingredient {number_of_ingredients - 1 - i % 10}"
+        if i % 2 == 0:
+            method.append(f"Put {name} into the mixing bowl.")
+        else:
+            method.append(f"Fold {name} into the mixing bowl.")
+    method.append("Heat the oven until heated.")
+    return (
+        "Lookup Benchmark.\n\n"
+        "Ingredients.\n" + "\n".join(ingredients) + "\n\n"
+        "Method.\n" + "\n".join(method) + "\n\n"
+        "Serves 1.\n\n"
+    )
+
+
+def run(number_of_ingredients):
+    chef = Chef(generate_recipe(number_of_ingredients, INSTRUCTIONS))
+    chef.parse_script()
+
+    start = time.perf_counter()
+    chef.execute_script(io.StringIO())
+    elapsed = time.perf_counter() - start
+
+    return elapsed / INSTRUCTIONS
+
+
+def main():
+    print(f"{'ingredients':>12} {'ns/instruction':>16}")
+    for count in INGREDIENT_COUNTS:
+        print(f"{count:>12} {run(count) * 1e9:>16.0f}")
+
+
+if __name__ == "__main__":
+    main()
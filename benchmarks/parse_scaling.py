@@ -0,0 +1,82 @@
+"""
+Parse time of synthetic scripts from 1 KB to 50 MB.
+
+The scripts are a small main recipe followed by as many auxiliary recipes as
+needed to reach the target size, which is the case that made the old
+re.sub based parser quadratic. Chef.parse_script should scale linearly, so
+the throughput column should stay roughly constant.
+
+    python benchmarks/parse_scaling.py [max size in bytes]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from chef import Chef  # noqa: E402
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000, 10_000_000, 50_000_000]
+
+MAIN_RECIPE = """Parse Benchmark.
+
+Ingredients.
+72 g haricot beans
+33 potatoes
+
+Method.
+Put potatoes into the mixing bowl.
+Put haricot beans into the mixing bowl.
+Liquefy contents of the mixing bowl.
+Pour contents of the mixing bowl into the baking dish.
+
+Serves 1.
+
+"""
+
+AUXILIARY_RECIPE = """Sauce number {number}.
+
+Ingredients.
+{number} g sugar
+1 ml water
+
+Method.
+Put sugar into the mixing bowl.
+Add water to the mixing bowl.
+Combine water into the mixing bowl.
+
+"""
+
+
+def generate_script(size):
+    parts = [MAIN_RECIPE]
+    length = len(MAIN_RECIPE)
+    number = 0
+    while length < size:
+        recipe = AUXILIARY_RECIPE.format(number=number)
+        parts.append(recipe)
+        length += len(recipe)
+        number += 1
+    return "".join(parts)
+
+
+def main():
+    max_size = int(sys.argv[1]) if len(sys.argv) > 1 else SIZES[-1]
+
+    print(f"{'bytes':>12} {'seconds':>10} {'MB/s':>10}")
+    for size in SIZES:
+        if size > max_size:
+            break
+        script = generate_script(size)
+
+        start = time.perf_counter()
+        Chef(script).parse_script()
+        elapsed = time.perf_counter() - start
+
+        throughput = len(script) / elapsed / 1e6
+        print(f"{len(script):>12} {elapsed:>10.4f} {throughput:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
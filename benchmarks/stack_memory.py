@@ -0,0 +1,54 @@
+"""
+Memory per element of the list based and the compact (array backed) mixing
+bowls, measured with tracemalloc after pushing a million ingredients.
+
+    python benchmarks/stack_memory.py [number of elements]
+"""
+
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from chef import CompactMixingBowl, MixingBowl  # noqa: E402
+
+INGREDIENTS = [
+    {
+        "ingredient_name": "haricot beans",
+        "value": 72,
+        "measure": "g",
+        "measure_type": None,
+        "ingredient_type": "dry",
+    },
+    {
+        "ingredient_name": "water",
+        "value": 119,
+        "measure": "ml",
+        "measure_type": None,
+        "ingredient_type": "liquid",
+    },
+]
+
+
+def measure(bowl_class, elements):
+    tracemalloc.start()
+    bowl = bowl_class("Mixing Bowl 1")
+    for i in range(elements):
+        ingredient = INGREDIENTS[i % 2]
+        bowl.push(ingredient, i % 2, ingredient["value"], ingredient["ingredient_type"])
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size / elements
+
+
+def main():
+    elements = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    print(f"{'stack':>18} {'bytes/element':>14}")
+    for bowl_class in (MixingBowl, CompactMixingBowl):
+        print(f"{bowl_class.__name__:>18} {measure(bowl_class, elements):>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
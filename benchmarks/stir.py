@@ -0,0 +1,55 @@
+"""
+Cost of Stir on deep mixing bowls.
+
+Stir rolls the top ingredient n places down. The old implementation counted
+n from the bottom of the bowl, so moving the top ingredient a few places
+down shifted nearly the whole bowl and Stir-heavy recipes went quadratic.
+Counting from the top only moves the n ingredients above the insertion
+point, so stirring a few places should cost the same on any bowl depth.
+
+    python benchmarks/stir.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from chef import CompactMixingBowl, MixingBowl  # noqa: E402
+
+DEPTHS = [100, 10_000, 100_000, 1_000_000]
+STIRS = 20_000
+MINUTES = 5
+
+
+# The old Stir, n counted from the bottom of the bowl
+class BottomStirMixingBowl(MixingBowl):
+    def stir(self, n):
+        self.own()
+        ingredient = self.ingredients.pop()
+        self.ingredients.insert(n % len(self.ingredients), ingredient)
+
+
+def run(bowl_class, depth):
+    bowl = bowl_class("mixing bowl")
+    for i in range(depth):
+        bowl.push_value("ingredient", i, "dry")
+
+    start = time.perf_counter()
+    for _ in range(STIRS):
+        bowl.stir(MINUTES)
+    return (time.perf_counter() - start) / STIRS
+
+
+def main():
+    classes = [BottomStirMixingBowl, MixingBowl, CompactMixingBowl]
+    print(f"{'depth':>10}" + "".join(f"{c.__name__:>24}" for c in classes))
+    print(f"{'':>10}" + "".join(f"{'ns/stir':>24}" for c in classes))
+    for depth in DEPTHS:
+        timings = [run(bowl_class, depth) * 1e9 for bowl_class in classes]
+        print(f"{depth:>10}" + "".join(f"{t:>24.0f}" for t in timings))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Benchmark suite over the canonical recipes of corpus.py, with regression
+tracking against a stored baseline.
+
+Parsing, executing and serving every recipe are timed separately (best of
+a few repeats), and reported together with the instructions executed per
+second, the bytes served per second and the peak memory traced while
+cooking. The results are compared to benchmarks/baseline.json, any time or
+memory peak worse than the baseline by more than the tolerance is reported
+as a regression and makes the suite exit with status 1.
+
+    python benchmarks/suite.py                  # compare with the baseline
+    python benchmarks/suite.py --save           # record a new baseline
+    python benchmarks/suite.py --compact deep_stack large_serve
+    python benchmarks/suite.py --backend vm --baseline vm.json
+
+Timings depend on the machine, record a baseline on the machine the suite
+is compared on before relying on it.
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from chef import BACKENDS, Chef, Profiler  # noqa: E402
+from corpus import CORPUS  # noqa: E402
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+# Measurements compared with the baseline, lower is better for all of them
+TRACKED = ("parse", "execute", "serve", "peak_memory")
+# Timings shorter than this are mostly noise and never reported as regressions
+NOISE_SECONDS = 0.002
+
+
+def best_of(repeat, function):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, result
+
+
+def cook(program, compact, backend="interpreter"):
+    # seeded, so that Mix does the same work on every run
+    execution = BACKENDS[backend](program, compact, seed=0)
+    execution.run(io.StringIO())
+    return execution
+
+
+# Instructions folded instead of executed (see chef.fold_prefix) by the
+# executions of a run, sous-chefs included
+def folded_instructions(program, compact, backend):
+    folded = 0
+
+    class Counting(BACKENDS[backend]):
+        def start(self, *args, **kwargs):
+            nonlocal folded
+            super().start(*args, **kwargs)
+            folded += self.resume
+
+    Counting(program, compact, seed=0).run(io.StringIO())
+    return folded
+
+
+def measure(source, compact=False, repeat=3, backend="interpreter"):
+    def parse():
+        chef = Chef(source)
+        chef.parse_script()
+        return chef.program
+
+    parse_time, program = best_of(repeat, parse)
+    execute_time, execution = best_of(repeat, lambda: cook(program, compact, backend))
+
+    def serve():
+        output = io.StringIO()
+        if not execution.refrigerated:
+            execution.serve(output)
+        return output.getvalue()
+
+    serve_time, output = best_of(repeat, serve)
+    served = len(output.encode("utf-8"))
+
+    # Profiled and traced runs are slower, they only count. Profiled runs
+    # execute every instruction, the ones folded by the timed runs are not
+    # counted.
+    profiler = Profiler()
+    BACKENDS[backend](program, compact, seed=0).run(io.StringIO(), profiler)
+    instructions = sum(stats[0] for stats in profiler.lines.values())
+    instructions -= folded_instructions(program, compact, backend)
+
+    tracemalloc.start()
+    try:
+        parse()
+        cook(program, compact, backend)
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "parse": parse_time,
+        "execute": execute_time,
+        "serve": serve_time,
+        "instructions": instructions,
+        "instructions_per_second": instructions / execute_time,
+        "bytes_served": served,
+        "bytes_served_per_second": served / serve_time if serve_time else 0.0,
+        "peak_memory": peak_memory,
+    }
+
+
+def regressions(results, baseline, tolerance):
+    found = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        for key in TRACKED:
+            before, after = baseline[name][key], result[key]
+            if key != "peak_memory" and max(before, after) < NOISE_SECONDS:
+                continue
+            if before and after > before * (1 + tolerance):
+                found.append((name, key, before, after))
+    return found
+
+
+def report(results, sink):
+    print(
+        f"{'recipe':<24} {'parse ms':>9} {'exec ms':>9} {'serve ms':>9} "
+        f"{'Minstr/s':>9} {'MB/s':>9} {'peak MB':>9}",
+        file=sink,
+    )
+    for name, result in results.items():
+        print(
+            f"{name:<24} {result['parse'] * 1e3:>9.2f} "
+            f"{result['execute'] * 1e3:>9.2f} {result['serve'] * 1e3:>9.2f} "
+            f"{result['instructions_per_second'] / 1e6:>9.2f} "
+            f"{result['bytes_served_per_second'] / 1e6:>9.1f} "
+            f"{result['peak_memory'] / 1e6:>9.2f}",
+            file=sink,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("recipes", nargs="*", help="corpus recipes to run")
+    parser.add_argument("--scale", type=int, default=1, help="recipe size factor")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--compact", action="store_true")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="interpreter")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save", action="store_true", help="record the baseline")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="allowed slowdown before reporting a regression (default: 0.25)",
+    )
+    args = parser.parse_args()
+
+    for name in args.recipes:
+        if name not in CORPUS:
+            parser.error(f"Unknown recipe: {name}")
+    names = args.recipes or list(CORPUS)
+
+    results = {}
+    for name in names:
+        source = CORPUS[name](args.scale)
+        results[name] = measure(source, args.compact, args.repeat, args.backend)
+    report(results, sys.stdout)
+
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}, record one with --save")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    found = regressions(results, baseline, args.tolerance)
+    if not found:
+        print("\nNo regressions against the baseline")
+        return
+    print("\nRegressions against the baseline:")
+    for name, key, before, after in found:
+        print(f"  {name} {key}: {before:.6g} -> {after:.6g} ({after / before:.2f}x)")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
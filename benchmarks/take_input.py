@@ -0,0 +1,91 @@
+"""
+Throughput of "Take ... from refrigerator" on a million numbers.
+
+A recipe takes and adds up every number of a file given as its standard
+input. The numbers are read by the default InputSource, which reads chunks
+of 64 KB and splits a whole chunk at once, and by a source calling input()
+for every number. The "input only" column is the time spent reading the
+numbers without running the recipe.
+
+    python benchmarks/take_input.py [count]
+"""
+
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from chef import Chef, Execution, InputSource  # noqa: E402
+
+RECIPE = """Take Benchmark.
+
+Ingredients.
+{count} g counter
+0 g number
+0 g total
+
+Method.
+Put total into the mixing bowl.
+Read the counter.
+Take number from refrigerator.
+Add number to the mixing bowl.
+Read the counter until read.
+Pour contents of the mixing bowl into the baking dish.
+
+Serves 1.
+"""
+
+
+# A number per input() call
+class PromptSource:
+    def read_number(self):
+        try:
+            return int(input())
+        except EOFError:
+            return None
+
+
+def time_source(path, make_source, run):
+    stdin = sys.stdin
+    with open(path) as sys.stdin:
+        try:
+            start = time.perf_counter()
+            run(make_source())
+            return time.perf_counter() - start
+        finally:
+            sys.stdin = stdin
+
+
+def read_all(source):
+    while source.read_number() is not None:
+        pass
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    chef = Chef(RECIPE.format(count=count))
+    chef.parse_script()
+
+    def cook(source):
+        Execution(chef.program).run(io.StringIO(), source=source)
+
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+        f.write("".join(f"{i % 1000}\n" for i in range(count)))
+    try:
+        print(f"{'source':<14} {'seconds':>9} {'numbers/s':>12} {'input only s':>13}")
+        for name, source in [("InputSource", InputSource), ("input()", PromptSource)]:
+            elapsed = time_source(f.name, source, cook)
+            input_only = time_source(f.name, source, read_all)
+            print(
+                f"{name:<14} {elapsed:>9.2f} {count / elapsed:>12.0f}"
+                f" {input_only:>13.3f}"
+            )
+    finally:
+        os.unlink(f.name)
+
+
+if __name__ == "__main__":
+    main()
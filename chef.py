@@ -1,20 +1,47 @@
+import argparse
+import asyncio
+import bisect
+import collections
+import concurrent.futures
+import copy
+import hashlib
+import io
+import itertools
+import json
+import linecache
+import marshal
+import os
+import random
 import re
-from dataclasses import dataclass
+import signal
+import time
+import warnings
+from array import array
+from dataclasses import dataclass, field
+from enum import IntEnum
 import sys
 
 """
 CHEF INTERPRETER WRITTEN IN PYTHON, FOR MORE INFORMATION ON HOW THE LANGUAGE WORKS, CONSULT THE README FILE
 """
 
+__version__ = "0.2.0"
+
 
 @dataclass
 class Ingredient:
     name: str
-    value: float
+    value: int
     measure: str
     measure_type: str
     ingredient_type: str  # dry or liquid
 
+    # Much cheaper than copy.copy, which goes through __reduce_ex__
+    def copy(self):
+        return Ingredient(
+            self.name, self.value, self.measure, self.measure_type, self.ingredient_type
+        )
+
 
 @dataclass
 class Recipe:
@@ -28,225 +55,1335 @@ class Recipe:
     auxiliary_recipes: list[str]
 
 
+class Stack:
+    """
+    Operations shared by every kind of mixing bowl and baking dish.
+
+    Sous-chefs work on copies of the mixing bowls and baking dishes of the
+    calling chef. Instead of copying every stack on every call, a snapshot
+    shares its contents with the original, and the contents are only copied
+    by the first one that writes to them (see own).
+    """
+
+    def snapshot(self):
+        self.owners[0] += 1
+        return copy.copy(self)
+
+    # Make sure the contents are not shared before modifying them
+    def own(self):
+        if self.owners[0] > 1:
+            self.owners[0] -= 1
+            self.owners = [1]
+            self.copy_contents()
+
+    # Give up the contents, leaving the stack empty
+    def release(self):
+        self.owners[0] -= 1
+        self.owners = [1]
+        self.clear_contents()
+
+
+class IngredientStack(Stack):
+    """
+    Stack of Ingredient records, the top of the stack is the end of the list.
+    """
+
+    def __len__(self):
+        return len(self.ingredients)
+
+    def copy_contents(self):
+        self.ingredients = [i.copy() for i in self.ingredients]
+
+    def clear_contents(self):
+        self.ingredients = []
+
+    def push(self, ingredient, slot, value, ingredient_type):
+        self.own()
+        self.ingredients.append(
+            Ingredient(
+                ingredient["ingredient_name"],
+                value,
+                ingredient["measure"],
+                ingredient["measure_type"],
+                ingredient_type,
+            )
+        )
+
+    def push_value(self, name, value, ingredient_type):
+        self.own()
+        self.ingredients.append(Ingredient(name, value, "", "", ingredient_type))
+
+    def pop(self):
+        self.own()
+        return self.ingredients.pop().value
+
+    def top(self):
+        return self.ingredients[-1].value
+
+    def set_top(self, value):
+        self.own()
+        self.ingredients[-1].value = value
+
+    def liquefy(self):
+        self.own()
+        for ingredient in self.ingredients:
+            ingredient.ingredient_type = "liquid"
+
+    # Roll the top ingredient n places down (to the bottom if the stack is
+    # not that deep). Only the n ingredients above it are moved.
+    def stir(self, n):
+        self.own()
+        ingredient = self.ingredients.pop()
+        self.ingredients.insert(max(len(self.ingredients) - n, 0), ingredient)
+
+    # Shuffle with a random.Random, see Execution
+    def shuffle(self, rng):
+        self.own()
+        rng.shuffle(self.ingredients)
+
+    # Put copies of the contents of another stack on top of this one
+    def extend(self, other):
+        ingredients = [i.copy() for i in other.ingredients]
+        self.own()
+        self.ingredients.extend(ingredients)
+
+    # (value, is liquid) of every ingredient, from the top to the bottom
+    def serving_order(self):
+        for ingredient in reversed(self.ingredients):
+            yield ingredient.value, ingredient.ingredient_type == "liquid"
+
+
+class CompactStack(Stack):
+    """
+    Array backed stack: the values are kept in an array of 64 bit integers,
+    next to a byte per element telling whether it is liquid and the slot of
+    the ingredient it came from (-1 for "dry ingredients"), the names can be
+    found through the slots. Pouring copies whole arrays at once. The first
+    value that does not fit in 64 bits turns the values into a list of
+    Python integers, until the stack is emptied.
+    """
+
+    def __len__(self):
+        return len(self.values)
+
+    def copy_contents(self):
+        self.values = self.values[:]
+        self.liquid = bytearray(self.liquid)
+        self.slots = array("i", self.slots)
+
+    def clear_contents(self):
+        self.values = array("q")
+        self.liquid = bytearray()
+        self.slots = array("i")
+
+    # Keep the values as Python integers from now on
+    def promote(self):
+        if isinstance(self.values, array):
+            self.values = self.values.tolist()
+
+    def append_value(self, value):
+        try:
+            self.values.append(value)
+        except OverflowError:
+            self.promote()
+            self.values.append(value)
+
+    def push(self, ingredient, slot, value, ingredient_type):
+        self.own()
+        self.append_value(value)
+        self.liquid.append(ingredient_type == "liquid")
+        self.slots.append(slot)
+
+    def push_value(self, name, value, ingredient_type):
+        self.own()
+        self.append_value(value)
+        self.liquid.append(ingredient_type == "liquid")
+        self.slots.append(-1)
+
+    def pop(self):
+        self.own()
+        self.liquid.pop()
+        self.slots.pop()
+        return self.values.pop()
+
+    def top(self):
+        return self.values[-1]
+
+    def set_top(self, value):
+        self.own()
+        try:
+            self.values[-1] = value
+        except OverflowError:
+            self.promote()
+            self.values[-1] = value
+
+    def liquefy(self):
+        self.own()
+        self.liquid[:] = b"\x01" * len(self.liquid)
+
+    def stir(self, n):
+        self.own()
+        value = self.values.pop()
+        liquid = self.liquid.pop()
+        slot = self.slots.pop()
+        index = max(len(self.values) - n, 0)
+        self.values.insert(index, value)
+        self.liquid.insert(index, liquid)
+        self.slots.insert(index, slot)
+
+    # Same order as IngredientStack.shuffle with the same random.Random: the
+    # swaps of random.shuffle, made in place in the three arrays. This copies
+    # the loop of CPython's random.shuffle, private _randbelow included, so a
+    # seeded Mix serves the same on both kinds of stacks; test_shuffle.py
+    # catches a Python release that changes it
+    def shuffle(self, rng):
+        self.own()
+        values, liquid, slots = self.values, self.liquid, self.slots
+        randbelow = rng._randbelow
+        for i in range(len(values) - 1, 0, -1):
+            j = randbelow(i + 1)
+            values[i], values[j] = values[j], values[i]
+            liquid[i], liquid[j] = liquid[j], liquid[i]
+            slots[i], slots[j] = slots[j], slots[i]
+
+    # Put copies of the contents of another stack on top of this one
+    def extend(self, other):
+        values, liquid, slots = other.values, other.liquid, other.slots
+        self.own()
+        length = len(self.values)
+        try:
+            self.values.extend(values)
+        except OverflowError:
+            # the values that did fit were appended already
+            del self.values[length:]
+            self.promote()
+            self.values.extend(values)
+        self.liquid.extend(liquid)
+        self.slots.extend(slots)
+
+    # (value, is liquid) of every ingredient, from the top to the bottom
+    def serving_order(self):
+        return zip(reversed(self.values), map(bool, reversed(self.liquid)))
+
+
+@dataclass
+class MixingBowl(IngredientStack):
+    name: str
+    ingredients: list[Ingredient] = field(default_factory=list)  # this acts as a stack
+    # number of bowls sharing the ingredients list
+    owners: list[int] = field(default_factory=lambda: [1], repr=False)
+
+
 @dataclass
-class MixingBowl:
+class BakingDish(IngredientStack):
     name: str
-    ingredients: list[Ingredient]  # this acts as a stack
+    ingredients: list[Ingredient] = field(default_factory=list)  # this acts as a stack
+    # number of dishes sharing the ingredients list
+    owners: list[int] = field(default_factory=lambda: [1], repr=False)
 
 
 @dataclass
-class BakingDish:
+class CompactMixingBowl(CompactStack):
     name: str
-    ingredients: list[Ingredient]  # this acts as a stack
+    values: array = field(default_factory=lambda: array("q"))
+    liquid: bytearray = field(default_factory=bytearray)
+    slots: array = field(default_factory=lambda: array("i"))
+    # number of bowls sharing the arrays
+    owners: list[int] = field(default_factory=lambda: [1], repr=False)
+
+
+@dataclass
+class CompactBakingDish(CompactStack):
+    name: str
+    values: array = field(default_factory=lambda: array("q"))
+    liquid: bytearray = field(default_factory=bytearray)
+    slots: array = field(default_factory=lambda: array("i"))
+    # number of dishes sharing the arrays
+    owners: list[int] = field(default_factory=lambda: [1], repr=False)
+
+
+class Opcode(IntEnum):
+    TAKE = 1
+    PUT = 2
+    FOLD = 3
+    ADD = 4
+    REMOVE = 5
+    COMBINE = 6
+    DIVIDE = 7
+    ADD_DRY = 8
+    LIQUEFY = 9
+    LIQUEFY_CONTENTS = 10
+    STIR = 11
+    STIR_INGREDIENT = 12
+    MIX = 13
+    CLEAN = 14
+    POUR = 15
+    LOOP_START = 16
+    LOOP_END = 17
+    SET_ASIDE = 18
+    SERVE_WITH = 19
+    REFRIGERATE = 20
+
+
+@dataclass
+class Instruction:
+    opcode: Opcode
+    ingredient: int  # slot of the ingredient in Chef.ingr, or None
+    mixing_bowl: int  # number of the mixing bowl, None if not given
+    baking_dish: int  # number of the baking dish, None if not given
+    argument: object  # minutes, hours, recipe name... depending on the opcode
+    line: int  # index of the instruction in Chef.method
+    text: str
+
+    # A copy of the instruction, a number of lines further in the method
+    def moved(self, lines):
+        return Instruction(
+            self.opcode,
+            self.ingredient,
+            self.mixing_bowl,
+            self.baking_dish,
+            self.argument,
+            self.line + lines,
+            self.text,
+        )
+
+
+################################################################################
+# Grammar of the method instructions, the order matters: the first pattern that
+# matches wins, so the more specific ones go first
+################################################################################
+MIXING_BOWL = r"(?:the )?(?:(?P<bowl>[1-9]\d*)(?:st|nd|rd|th) )?mixing bowl"
+BAKING_DISH = r"(?:the )?(?:(?P<dish>[1-9]\d*)(?:st|nd|rd|th) )?baking dish"
+
+INSTRUCTION_PATTERNS = [
+    (Opcode.TAKE, r"Take (?P<ingredient>.+?) from (?:the )?refrigerator"),
+    (Opcode.PUT, rf"Put (?P<ingredient>.+?) into {MIXING_BOWL}"),
+    (Opcode.FOLD, rf"Fold (?P<ingredient>.+?) into {MIXING_BOWL}"),
+    (Opcode.ADD_DRY, rf"Add dry ingredients(?: to {MIXING_BOWL})?"),
+    (Opcode.ADD, rf"Add (?P<ingredient>.+?)(?: to {MIXING_BOWL})?"),
+    (Opcode.REMOVE, rf"Remove (?P<ingredient>.+?)(?: from {MIXING_BOWL})?"),
+    (Opcode.COMBINE, rf"Combine (?P<ingredient>.+?)(?: into {MIXING_BOWL})?"),
+    (Opcode.DIVIDE, rf"Divide (?P<ingredient>.+?)(?: (?:into|to) {MIXING_BOWL})?"),
+    (Opcode.LIQUEFY_CONTENTS, rf"Liqu[ei]fy contents of {MIXING_BOWL}"),
+    (Opcode.LIQUEFY, r"Liqu[ei]fy (?P<ingredient>.+?)"),
+    (Opcode.STIR, rf"Stir(?: {MIXING_BOWL})? for (?P<number>\d+) minutes?"),
+    (Opcode.STIR_INGREDIENT, rf"Stir (?P<ingredient>.+?) into {MIXING_BOWL}"),
+    (Opcode.MIX, rf"Mix(?: {MIXING_BOWL})? well"),
+    (Opcode.CLEAN, rf"Clean {MIXING_BOWL}"),
+    (Opcode.POUR, rf"Pour contents of {MIXING_BOWL} into {BAKING_DISH}"),
+    (Opcode.SET_ASIDE, r"Set aside"),
+    (Opcode.SERVE_WITH, r"Serve with (?P<recipe>.+?)"),
+    (Opcode.REFRIGERATE, r"Refrigerate(?: for (?P<number>\d+) hours?)?"),
+    (Opcode.LOOP_END, r"\S+(?: the (?P<ingredient>.+?))? until (?P<verbed>\S+)"),
+    (Opcode.LOOP_START, r"(?P<verb>\S+) the (?P<ingredient>.+?)"),
+]
+# INSTRUCTION_PATTERNS compiled, anchored at both ends
+COMPILED_PATTERNS = [
+    (opcode, re.compile(f"^{pattern}$")) for opcode, pattern in INSTRUCTION_PATTERNS
+]
+
+
+@dataclass
+class Section:
+    text: str
+    offset: int  # offset of the first character of the section in the script
+    line: int  # line number of the first line of the section, starting at 1
+
+
+def scan_sections(script):
+    """
+    Split a script into its sections (blocks of text separated by one or more
+    blank lines) in a single pass. The script can be a string or any text
+    stream (an open file for example), which is read line by line.
+    """
+    if isinstance(script, str):
+        yield from scan_string_sections(script)
+        return
+
+    lines = []
+    offset = 0
+    start = 0
+    start_line = 1
+    for number, line in enumerate(script, 1):
+        if line.strip() == "":
+            if lines:
+                yield Section("\n".join(lines), start, start_line)
+                lines = []
+        else:
+            if not lines:
+                start = offset
+                start_line = number
+            lines.append(line.rstrip("\r\n"))
+        offset += len(line)
+
+    if lines:
+        yield Section("\n".join(lines), start, start_line)
+
+
+# Runs of lines that are not blank
+SECTION = re.compile(r"(?m)(?:^.*\S.*(?:\n|\Z))+")
+
+
+# scan_sections for a string, the sections are found by a regex instead of
+# walking the script line by line
+def scan_string_sections(script):
+    position = 0
+    line = 1
+    for match in SECTION.finditer(script):
+        start = match.start()
+        line += script.count("\n", position, start)
+        position = start
+        text = match.group()
+        if text.endswith("\n"):
+            text = text[:-1]
+        if "\r" in text:
+            text = "\n".join(part.rstrip("\r") for part in text.split("\n"))
+        yield Section(text, start, line)
+
+
+def outline_sections(sections):
+    """
+    Tell what every section of a script is, as (kind, section) pairs, raising
+    ValueError if a required section is missing. The kinds are "title",
+    "comment", "ingredients", "cooking", "pre-heat", "method", "serves", and
+    "auxiliary title", "auxiliary ingredients" and "auxiliary method" for the
+    auxiliary recipes.
+    """
+    ############################################################################
+    # the first line of the script should be the title of the recipe
+    ############################################################################
+    title = next(sections, None)
+    if title is None or not is_title(title.text):
+        raise ValueError("Invalid script format, please provide a valid recipe")
+    yield "title", title
+
+    ############################################################################
+    # the next thing we could have is a comment or the ingredients
+    ############################################################################
+    section = next(sections, None)
+    if section is not None and not starts_with(section, "Ingredients"):
+        yield "comment", section
+        section = next(sections, None)
+
+    ############################################################################
+    # now we can parse the ingredients
+    ############################################################################
+    if section is None or not starts_with(section, "Ingredients"):
+        raise ValueError(
+            "Invalid script format, please provide a valid recipe (no ingredients)"
+        )
+    yield "ingredients", section
+
+    ############################################################################
+    # now we can parse the method, note that we can also have before the method
+    # the cook time and oven temperature, so we need to check for that
+    ############################################################################
+    section = next(sections, None)
+    if section is not None and starts_with(section, "Cooking"):
+        yield "cooking", section
+        section = next(sections, None)
+    if section is not None and starts_with(section, "Pre-heat"):
+        yield "pre-heat", section
+        section = next(sections, None)
+
+    if section is None or not starts_with(section, "Method"):
+        raise ValueError(
+            "Invalid script format, please provide a valid recipe (no method)"
+        )
+    yield "method", section
+
+    ############################################################################
+    # Parse the serves
+    ############################################################################
+    section = next(sections, None)
+    if section is None or not starts_with(section, "Serves"):
+        raise ValueError(
+            "Invalid script format, please provide a valid recipe (no serves)"
+        )
+    yield "serves", section
+
+    ############################################################################
+    # Parse auxiliary recipes (if any)
+    ############################################################################
+    """
+    auxiliary recipes are optional, and consists of 3 elements:
+    - the name of the recipe 
+    - the ingredients 
+    - the method
+    """
+    for recipe_name in sections:
+        yield "auxiliary title", recipe_name
+
+        # get the ingredients
+        ingredients = next(sections, None)
+        if ingredients is None:
+            raise ValueError(
+                "Invalid script format, please provide a valid recipe (no ingredients)"
+            )
+        yield "auxiliary ingredients", ingredients
+
+        # get the Method
+        method = next(sections, None)
+        if method is None:
+            raise ValueError(
+                "Invalid script format, please provide a valid recipe (no method)"
+            )
+        yield "auxiliary method", method
+
+
+# The auxiliary recipes of an outline (see outline_sections), kept unparsed
+def collect_auxiliary_recipes(outline):
+    recipes = []
+    parts = []
+    for kind, section in outline:
+        if kind.startswith("auxiliary"):
+            parts.append(section.text)
+        if kind == "auxiliary method":
+            recipes.append(Recipe(parts[0], parts[1], parts[2], "", "", "", "", []))
+            parts = []
+    return recipes
+
+
+# Runs of lines that are not blank, in a cookbook read as bytes
+BINARY_SECTION = re.compile(rb"(?m)(?:^.*\S.*(?:\n|\Z))+")
+
+# Keyword of a section, other sections are titles or comments
+SECTION_KEYWORD = re.compile(rb"\s*(Ingredients|Cooking|Pre-heat|Method|Serves)")
+
+# Number of bytes scan_cookbook reads at once
+COOKBOOK_CHUNK_SIZE = 1 << 20
+
+
+def scan_cookbook(stream, chunk_size=COOKBOOK_CHUNK_SIZE):
+    """
+    Find the recipes of a cookbook (a file of independent recipes, each one
+    followed by its auxiliary recipes) in a single pass over a binary stream,
+    read in chunks. Yields (title, start, end) for every recipe, start and
+    end being byte offsets in the stream. A title starts a new recipe, rather
+    than an auxiliary recipe of the previous one, if a Serves section follows
+    its method.
+    """
+    recipe = None  # (title, start) of the recipe being scanned
+    block = None  # (title, start) of the last recipe or auxiliary recipe
+    previous = None  # kind of the previous section
+    in_section = False  # the previous chunk ended inside a section
+    offset = 0  # offset of the chunk in the stream
+    rest = b""  # last line of the previous chunk, if it was not complete
+    while True:
+        data = stream.read(chunk_size)
+        chunk = rest + data
+        if data:
+            # only scan complete lines
+            end = chunk.rfind(b"\n") + 1
+            chunk, rest = chunk[:end], chunk[end:]
+        section_end = 0
+        for match in BINARY_SECTION.finditer(chunk):
+            start, section_end = match.span()
+            if start == 0 and in_section:
+                continue  # the section started in the previous chunk
+            keyword = SECTION_KEYWORD.match(chunk, start)
+            if keyword is not None:
+                kind = keyword.group(1)
+            elif previous in (None, b"Method", b"Serves"):
+                kind = b"title"
+                line_end = chunk.find(b"\n", start, section_end)
+                if line_end < 0:
+                    line_end = section_end
+                title = chunk[start:line_end].decode("utf-8").strip()
+                block = (title, offset + start)
+                if recipe is None:
+                    recipe = block
+            else:
+                kind = b"comment"
+            if kind == b"Serves" and block is not recipe:
+                yield recipe[0], recipe[1], block[1]
+                recipe = block
+            previous = kind
+        if chunk:
+            in_section = section_end == len(chunk)
+        offset += len(chunk)
+        if not data:
+            break
+
+    if recipe is not None:
+        yield recipe[0], recipe[1], offset
+
+
+def starts_with(section, keyword):
+    return section.text.split(None, 1)[0].startswith(keyword)
+
+
+def is_title(text):
+    return "\n" not in text and text.rstrip().endswith(".")
+
+
+def is_loop(words):
+    sentence = " ".join(words).strip().rstrip(".").strip()
+    return any(
+        pattern.match(sentence)
+        for opcode, pattern in COMPILED_PATTERNS
+        if opcode in (Opcode.LOOP_START, Opcode.LOOP_END)
+    )
+
+
+# Verbs the method instructions start with, loops can use any other verb
+METHOD_VERBS = set(
+    [
+        "Take",
+        "Put",
+        "Fold",
+        "Add",
+        "Remove",
+        "Combine",
+        "Divide",
+        "Liquefy",
+        "Liquify",
+        "Stir",
+        "Mix",
+        "Clean",
+        "Pour",
+        "Serve",
+        "Refrigerate",
+        "Set",
+    ]
+)
+
+
+# The instruction lines of a method section
+def method_lines(method):
+    return [line for line in method.split("\n") if line != "Method." and line != ""]
+
+
+def check_method_line(line):
+    words = line.split(" ")
+    # loops can use any verb ("Sift the flour."), a bare "Refrigerate." ends
+    # the sentence with its verb
+    if words[0].rstrip(".") not in METHOD_VERBS and not is_loop(words):
+        raise ValueError(
+            "Invalid instruction format, instruction must be a valid instruction",
+            words[0],
+        )
+
+
+# Instructions whose argument is a jump target set by link_loops
+LOOP_OPCODES = {Opcode.LOOP_START, Opcode.LOOP_END, Opcode.SET_ASIDE}
+
+# Instructions working on a mixing bowl
+MIXING_BOWL_OPCODES = {
+    Opcode.PUT,
+    Opcode.FOLD,
+    Opcode.ADD,
+    Opcode.REMOVE,
+    Opcode.COMBINE,
+    Opcode.DIVIDE,
+    Opcode.ADD_DRY,
+    Opcode.LIQUEFY_CONTENTS,
+    Opcode.STIR,
+    Opcode.STIR_INGREDIENT,
+    Opcode.MIX,
+    Opcode.CLEAN,
+    Opcode.POUR,
+}
+
+# Instructions failing on an empty mixing bowl
+NON_EMPTY_OPCODES = {
+    Opcode.FOLD,
+    Opcode.ADD,
+    Opcode.REMOVE,
+    Opcode.COMBINE,
+    Opcode.DIVIDE,
+    Opcode.STIR,
+    Opcode.STIR_INGREDIENT,
+    Opcode.POUR,
+}
+
+
+def stack_usage(instructions):
+    """
+    Highest mixing bowl and baking dish numbers the instructions use (a
+    mixing bowl or baking dish without a number is the first one).
+    """
+    mixing_bowls = baking_dishes = 0
+    for instruction in instructions:
+        if instruction.opcode in MIXING_BOWL_OPCODES:
+            mixing_bowls = max(mixing_bowls, instruction.mixing_bowl or 1)
+        if instruction.opcode == Opcode.POUR:
+            baking_dishes = max(baking_dishes, instruction.baking_dish or 1)
+    return mixing_bowls, baking_dishes
+
+
+def link_loops(instructions):
+    """
+    Match every loop start with its loop end and store the jump targets in the
+    instructions: a loop start points to its loop end, a loop end to its loop
+    start and "Set aside" to the end of the innermost loop it appears in.
+    """
+    open_loops = []
+    set_asides = []  # "Set aside" instructions of every open loop
+    for index, instruction in enumerate(instructions):
+        if instruction.opcode == Opcode.LOOP_START:
+            open_loops.append(index)
+            set_asides.append([])
+        elif instruction.opcode == Opcode.SET_ASIDE:
+            if not open_loops:
+                raise ValueError(
+                    "Set aside can only be used inside a loop", instruction.text
+                )
+            set_asides[-1].append(instruction)
+        elif instruction.opcode == Opcode.LOOP_END:
+            if not open_loops:
+                raise ValueError(
+                    "Loop end without a matching loop start", instruction.text
+                )
+            start = open_loops.pop()
+            instructions[start].argument = index
+            instruction.argument = start
+            for set_aside in set_asides.pop():
+                set_aside.argument = index
+
+    if open_loops:
+        raise ValueError(
+            "Loop start without a matching loop end", instructions[open_loops[-1]].text
+        )
+
+
+# Instructions that never raise an error
+INFALLIBLE_OPCODES = {
+    Opcode.PUT,
+    Opcode.ADD_DRY,
+    Opcode.LIQUEFY,
+    Opcode.LIQUEFY_CONTENTS,
+    Opcode.CLEAN,
+}
+
+
+# Instructions whose outcome only depends on the state of the execution: no
+# input, no randomness, no sous-chef and no jump
+FOLDABLE_OPCODES = {
+    Opcode.PUT,
+    Opcode.FOLD,
+    Opcode.ADD,
+    Opcode.REMOVE,
+    Opcode.COMBINE,
+    Opcode.DIVIDE,
+    Opcode.ADD_DRY,
+    Opcode.LIQUEFY,
+    Opcode.LIQUEFY_CONTENTS,
+    Opcode.STIR,
+    Opcode.STIR_INGREDIENT,
+    Opcode.CLEAN,
+    Opcode.POUR,
+}
+
+
+def fold_prefix(program, compact=False):
+    """
+    Constant folding of the method: the longest run of foldable instructions
+    (see FOLDABLE_OPCODES) at its start, stopping before the first one that
+    fails, is executed once and for all. Returns the number of instructions
+    folded and the Execution they left behind (None if there are none), that
+    executions starting from scratch copy instead of running them again, see
+    Execution.start. The result is kept in program.code.
+    """
+    key = ("prefix", compact)
+    if key not in program.code:
+        # the execution folding the prefix must not fold it itself
+        program.code[key] = (0, None)
+        length = 0
+        for instruction in program.instructions:
+            if instruction.opcode not in FOLDABLE_OPCODES:
+                break
+            length += 1
+        while length > 0:
+            execution = Execution(program, compact)
+            execution.start(io.StringIO(), None)
+            handlers = execution.handlers()
+            try:
+                for index, instruction in enumerate(program.instructions[:length]):
+                    handlers[instruction.opcode](instruction)
+            except ValueError:
+                # left for the executions to fail on
+                length = index
+                continue
+            program.code[key] = (length, execution)
+            break
+    return program.code[key]
+
+
+class Bytecode(IntEnum):
+    """Opcodes of the VirtualMachine, see compile_bytecode"""
+
+    PUT = 1
+    PUT_RUN = 2
+    PUT_ADD = 3
+    PUT_COMBINE = 4
+    FOLD = 5
+    ADD = 6
+    REMOVE = 7
+    COMBINE = 8
+    DIVIDE = 9
+    ADD_DRY = 10
+    TAKE = 11
+    LIQUEFY = 12
+    LIQUEFY_CONTENTS = 13
+    LIQUEFY_POUR = 14
+    STIR = 15
+    STIR_INGREDIENT = 16
+    MIX = 17
+    CLEAN = 18
+    POUR = 19
+    LOOP_START = 20
+    LOOP_END = 21
+    JUMP = 22
+    SERVE_WITH = 23
+    REFRIGERATE = 24
+    SELECT_BOWL = 25
+    CHECK_BOWL = 26
+    SELECT_DISH = 27
+    CHECK_DISH = 28
+
+
+def compile_bytecode(instructions, check_bowls=True, check_dishes=True, start=0):
+    """
+    Compile instructions for the VirtualMachine into a flat list of tuples:
+    an opcode (see Bytecode) followed by its operands. Mixing bowls and
+    baking dishes are indexes from 0, jump targets are indexes in the list.
+    A peephole pass fuses common sequences into superinstructions, never
+    across a jump target:
+
+    - runs of Put into the same mixing bowl (PUT_RUN);
+    - Put followed by Add or Combine on the same mixing bowl, which pushes
+      the result directly (PUT_ADD, PUT_COMBINE);
+    - "Liquefy contents" followed by Pour of the same mixing bowl
+      (LIQUEFY_POUR).
+
+    The rule against using a mixing bowl without a number after numbered
+    ones (see Execution.prepare_mixing_bowls) is kept by SELECT_BOWL and
+    CHECK_BOWL, left out where the previous instructions already tell the
+    outcome, and entirely if check_bowls is False. The same goes for the
+    baking dishes. A SELECT_BOWL is also left out if another one follows it
+    in straight-line code, with only instructions that cannot fail between.
+
+    Dead code is eliminated: Put, "Add dry ingredients", "Liquefy contents"
+    and Clean are left out when the mixing bowl is cleaned later with only
+    instructions that cannot fail or jump, and do not use that mixing bowl,
+    between. The instructions before start are left out too (see
+    fold_prefix), execution starts with the first operation.
+    """
+    targets = {start}
+    for index, instruction in enumerate(instructions):
+        if instruction.opcode == Opcode.LOOP_START:
+            targets.add(index)
+            targets.add(instruction.argument + 1)
+        elif instruction.opcode == Opcode.SET_ASIDE:
+            targets.add(instruction.argument + 1)
+
+    code = []
+    starts = []  # index in code of every instruction
+    bowl = dish = None  # last numbered mixing bowl and baking dish, if known
+    select = None  # index of a SELECT_BOWL nothing depended on yet
+    for index, instruction in enumerate(instructions):
+        if index < start:
+            starts.append(0)
+            continue
+        opcode = instruction.opcode
+        slot = instruction.ingredient
+        if index in targets:
+            bowl = dish = select = None
+        starts.append(len(code))
+
+        if check_bowls and opcode in MIXING_BOWL_OPCODES:
+            if instruction.mixing_bowl is None:
+                if bowl != 1:
+                    code.append((Bytecode.CHECK_BOWL,))
+                    bowl = 1
+                    select = None
+            elif instruction.mixing_bowl != bowl:
+                bowl = instruction.mixing_bowl
+                if select is not None:
+                    code[select] = None
+                select = len(code)
+                code.append((Bytecode.SELECT_BOWL, bowl))
+        if check_dishes and opcode == Opcode.POUR:
+            if instruction.baking_dish is None:
+                if dish != 1:
+                    code.append((Bytecode.CHECK_DISH,))
+                    dish = 1
+            elif instruction.baking_dish != dish:
+                dish = instruction.baking_dish
+                code.append((Bytecode.SELECT_DISH, dish))
+
+        mixing_bowl = (instruction.mixing_bowl or 1) - 1
+        baking_dish = (instruction.baking_dish or 1) - 1
+        previous = None
+        if index not in targets and code and starts[-1] == len(code):
+            previous = code[-1]
+            if previous[-1] != mixing_bowl or previous[0] not in (
+                Bytecode.PUT,
+                Bytecode.PUT_RUN,
+                Bytecode.LIQUEFY_CONTENTS,
+            ):
+                previous = None
+
+        if opcode == Opcode.PUT:
+            if previous is None or previous[0] == Bytecode.LIQUEFY_CONTENTS:
+                code.append((Bytecode.PUT, slot, mixing_bowl))
+            elif previous[0] == Bytecode.PUT:
+                code[-1] = (Bytecode.PUT_RUN, [previous[1], slot], mixing_bowl)
+                starts[-1] = len(code) - 1
+            else:
+                previous[1].append(slot)
+                starts[-1] = len(code) - 1
+        elif (
+            opcode in (Opcode.ADD, Opcode.COMBINE)
+            and previous is not None
+            and previous[0] != Bytecode.LIQUEFY_CONTENTS
+        ):
+            if previous[0] == Bytecode.PUT:
+                code.pop()
+                put = previous[1]
+            else:
+                put = previous[1].pop()
+                if len(previous[1]) == 1:
+                    code[-1] = (Bytecode.PUT, previous[1][0], mixing_bowl)
+            fused = Bytecode.PUT_ADD if opcode == Opcode.ADD else Bytecode.PUT_COMBINE
+            code.append((fused, put, slot, mixing_bowl))
+            starts[-1] = len(code) - 1
+        elif (
+            opcode == Opcode.POUR
+            and previous is not None
+            and previous[0] == Bytecode.LIQUEFY_CONTENTS
+        ):
+            code[-1] = (Bytecode.LIQUEFY_POUR, baking_dish, mixing_bowl)
+            starts[-1] = len(code) - 1
+        elif opcode == Opcode.POUR:
+            code.append((Bytecode.POUR, baking_dish, mixing_bowl))
+        elif opcode in (Opcode.LOOP_START, Opcode.LOOP_END):
+            # jump targets are instruction indexes until all are compiled
+            target = instruction.argument
+            if opcode == Opcode.LOOP_START:
+                code.append((Bytecode.LOOP_START, slot, target + 1))
+            else:
+                code.append((Bytecode.LOOP_END, slot, target))
+        elif opcode == Opcode.SET_ASIDE:
+            code.append((Bytecode.JUMP, instruction.argument + 1))
+        elif opcode in (Opcode.STIR, Opcode.SERVE_WITH, Opcode.REFRIGERATE):
+            code.append((Bytecode[opcode.name], instruction.argument, mixing_bowl))
+        elif opcode in (Opcode.TAKE, Opcode.LIQUEFY):
+            code.append((Bytecode[opcode.name], slot))
+        else:
+            code.append((Bytecode[opcode.name], slot, mixing_bowl))
+        if opcode not in INFALLIBLE_OPCODES:
+            select = None
+
+    # mixing bowls cleaned before anything can see their contents, walking
+    # backwards
+    cleaned = set()
+    for index in range(len(code) - 1, -1, -1):
+        operation = code[index]
+        if operation is None or operation[0] in (
+            Bytecode.LIQUEFY,
+            Bytecode.SELECT_BOWL,
+            Bytecode.SELECT_DISH,
+        ):
+            continue
+        if operation[0] in (
+            Bytecode.PUT,
+            Bytecode.PUT_RUN,
+            Bytecode.PUT_ADD,
+            Bytecode.PUT_COMBINE,
+            Bytecode.ADD_DRY,
+            Bytecode.LIQUEFY_CONTENTS,
+            Bytecode.CLEAN,
+        ):
+            if operation[-1] in cleaned:
+                code[index] = None
+            elif operation[0] == Bytecode.CLEAN:
+                cleaned.add(operation[-1])
+        else:
+            cleaned.clear()
+
+    # drop the operations left out
+    indexes = []
+    kept = []
+    for operation in code:
+        indexes.append(len(kept))
+        if operation is not None:
+            kept.append(operation)
+    indexes.append(len(kept))
+    code = kept
+    starts = [indexes[start] for start in starts]
+
+    starts.append(len(code))
+    for index, operation in enumerate(code):
+        if operation[0] in (Bytecode.LOOP_START, Bytecode.LOOP_END):
+            code[index] = (operation[0], operation[1], starts[operation[2]])
+        elif operation[0] == Bytecode.JUMP:
+            code[index] = (Bytecode.JUMP, starts[operation[1]])
+
+    # plain integers compare faster than the enum members in the dispatch loop
+    return [(int(operation[0]), *operation[1:]) for operation in code]
+
+
+def transpile(program, check_bowls=True, check_dishes=True, start=0):
+    """
+    Python source of a function cook(execution) running the program, for
+    PythonExecution. It is generated from the bytecode (see compile_bytecode,
+    check_bowls, check_dishes and start mean the same): the loops become while
+    loops and "Set aside" a break. The ingredients are local variables (v0,
+    v1... by slot), written back to the execution when the function returns
+    or fails, and so are the mixing bowls (b0, b1...) and baking dishes (d0,
+    d1...).
+    """
+    code = compile_bytecode(program.instructions, check_bowls, check_dishes, start)
+    used = set()  # slots of the ingredients read or changed
+    assigned = set()  # slots of the ingredients changed
+    bowls = set()
+    dishes = set()
+    # the sum of the dry ingredients is only kept up to date if needed
+    track_dry = any(operation[0] == Bytecode.ADD_DRY for operation in code)
+
+    body = []
+    depth = 2
+    loops = []  # length of the body when every open loop started
+
+    def emit(line):
+        body.append("    " * depth + line)
+
+    def ingredient(slot):
+        used.add(slot)
+        return f"v{slot}"
+
+    def bowl(index):
+        bowls.add(index)
+        return f"b{index}"
+
+    def assign(slot, expression):
+        assigned.add(slot)
+        if track_dry:
+            emit(f"value = {expression}")
+            emit(f"if types[{slot}] == 'dry':")
+            emit(f"    dry += value - {ingredient(slot)}")
+            expression = "value"
+        emit(f"{ingredient(slot)} = {expression}")
+
+    def check_not_empty(index):
+        emit(f"if len({bowl(index)}) == 0:")
+        emit(f"    raise ValueError({f'Mixing bowl {index + 1} is empty'!r})")
+
+    def push(index, slot, value):
+        emit(f"{bowl(index)}.push(ingredients[{slot}], {slot}, {value}, types[{slot}])")
+
+    for op, *operands in code:
+        if op == Bytecode.PUT:
+            push(operands[1], operands[0], ingredient(operands[0]))
+        elif op == Bytecode.PUT_RUN:
+            for slot in operands[0]:
+                push(operands[1], slot, ingredient(slot))
+        elif op in (Bytecode.PUT_ADD, Bytecode.PUT_COMBINE):
+            operator = "+" if op == Bytecode.PUT_ADD else "*"
+            value = f"{ingredient(operands[0])} {operator} {ingredient(operands[1])}"
+            push(operands[2], operands[0], value)
+        elif op == Bytecode.LOOP_START:
+            emit(f"while {ingredient(operands[0])} != 0:")
+            depth += 1
+            loops.append(len(body))
+        elif op == Bytecode.LOOP_END:
+            if operands[0] is not None:
+                assign(operands[0], f"{ingredient(operands[0])} - 1")
+            if loops.pop() == len(body):
+                emit("pass")
+            depth -= 1
+        elif op == Bytecode.JUMP:
+            emit("break")
+        elif op == Bytecode.FOLD:
+            check_not_empty(operands[1])
+            assign(operands[0], f"{bowl(operands[1])}.pop()")
+        elif op in (Bytecode.ADD, Bytecode.REMOVE, Bytecode.COMBINE, Bytecode.DIVIDE):
+            slot, index = operands
+            check_not_empty(index)
+            if op == Bytecode.DIVIDE:
+                name = program.ingredients[slot]["ingredient_name"]
+                emit(f"if {ingredient(slot)} == 0:")
+                message = f"Cannot divide by {name}, its value is 0"
+                emit(f"    raise ValueError({message!r})")
+            operator = {
+                Bytecode.ADD: "+",
+                Bytecode.REMOVE: "-",
+                Bytecode.COMBINE: "*",
+                Bytecode.DIVIDE: "//",
+            }[op]
+            top = f"{bowl(index)}.top() {operator} {ingredient(slot)}"
+            emit(f"{bowl(index)}.set_top({top})")
+        elif op == Bytecode.ADD_DRY:
+            emit(f"{bowl(operands[1])}.push_value('dry ingredients', dry, 'dry')")
+        elif op == Bytecode.TAKE:
+            emit("value = execution.input.read_number()")
+            emit("if value is None:")
+            emit(f"    execution.store_taken({operands[0]}, value)")
+            assign(operands[0], "value")
+        elif op == Bytecode.LIQUEFY:
+            slot = operands[0]
+            if track_dry:
+                emit(f"if types[{slot}] == 'dry':")
+                emit(f"    dry -= {ingredient(slot)}")
+            # the execution's dry_total is stale, it is summed up at the end
+            emit(f"types[{slot}] = 'liquid'")
+            used.add(slot)
+            assigned.add(slot)
+        elif op == Bytecode.LIQUEFY_CONTENTS:
+            emit(f"{bowl(operands[1])}.liquefy()")
+        elif op in (Bytecode.POUR, Bytecode.LIQUEFY_POUR):
+            dish, index = operands
+            if op == Bytecode.LIQUEFY_POUR:
+                emit(f"{bowl(index)}.liquefy()")
+            check_not_empty(index)
+            dishes.add(dish)
+            emit(f"d{dish}.extend({bowl(index)})")
+        elif op == Bytecode.STIR:
+            emit(f"execution.stir({operands[1] + 1}, {operands[0]})")
+        elif op == Bytecode.STIR_INGREDIENT:
+            emit(f"execution.stir({operands[1] + 1}, {ingredient(operands[0])})")
+        elif op == Bytecode.MIX:
+            emit(f"execution.mix({operands[1] + 1})")
+        elif op == Bytecode.CLEAN:
+            emit(f"{bowl(operands[1])}.release()")
+        elif op == Bytecode.SERVE_WITH:
+            emit(f"execution.serve_with({operands[0]!r})")
+        elif op == Bytecode.REFRIGERATE:
+            emit(f"execution.refrigerate({operands[0]!r})")
+            emit("return")
+        elif op == Bytecode.SELECT_BOWL:
+            emit(f"execution.number_of_mixing_bowls = {operands[0]}")
+        elif op == Bytecode.CHECK_BOWL:
+            emit("execution.prepare_mixing_bowls(None, None)")
+        elif op == Bytecode.SELECT_DISH:
+            emit(f"execution.number_of_baking_dishes = {operands[0]}")
+        elif op == Bytecode.CHECK_DISH:
+            emit("execution.prepare_baking_dishes(None, None)")
+
+    lines = [
+        # repr, so that no character of the title can end the comment
+        f"# {program.name!r}",
+        "def cook(execution):",
+        "    values = execution.values",
+        "    types = execution.ingredient_types",
+        "    ingredients = execution.program.ingredients",
+    ]
+    lines += [
+        f"    b{index} = execution.mixing_bowls[{index}]" for index in sorted(bowls)
+    ]
+    lines += [
+        f"    d{index} = execution.baking_dishes[{index}]" for index in sorted(dishes)
+    ]
+    lines += [f"    v{slot} = values[{slot}]" for slot in sorted(used)]
+    if track_dry:
+        lines.append("    dry = execution.dry_total")
+    lines.append("    try:")
+    lines += body or ["        pass"]
+    lines.append("    finally:")
+    for slot in sorted(assigned):
+        lines.append(f"        values[{slot}] = v{slot}")
+    if assigned:
+        lines += [
+            f"        execution.touched.update({sorted(assigned)})",
+            "        execution.dry_total = sum(",
+            "            value for value, kind in zip(values, types) if kind == 'dry'",
+            "        )",
+        ]
+    else:
+        lines.append("        pass")
+    return "\n".join(lines) + "\n"
+
+
+# Name used to look up an auxiliary recipe ("Serve with caramel sauce.")
+def recipe_key(name):
+    return name.strip().rstrip(".").strip().lower()
+
+
+@dataclass
+class Diagnostic:
+    """An error found by Chef.analyze"""
+
+    recipe: str  # name of the recipe, None if the script is not a recipe
+    line: int  # line number in the script, None if it is not a single line
+    message: str
+
+    def __str__(self):
+        location = "" if self.line is None else f"line {self.line}: "
+        recipe = "" if self.recipe is None else f" ({self.recipe})"
+        return f"{location}{self.message}{recipe}"
+
+
+class RecipeError(ValueError):
+    """A recipe rejected by Chef.analyze, with every error found in it"""
+
+    def __init__(self, diagnostics):
+        super().__init__("\n".join(str(diagnostic) for diagnostic in diagnostics))
+        self.diagnostics = diagnostics
+
+
+# Number of characters Chef.serve buffers before writing to its sink
+SERVE_CHUNK_SIZE = 1 << 16
+
+# Number of instructions an async execution runs before letting other tasks
+# run, see Execution.run_async
+ASYNC_SLICE_SIZE = 1000
+
+# Number of characters the input sources of "Take" read at once
+INPUT_CHUNK_SIZE = 1 << 16
+
+
+def parse_ordinal(ordinal):
+    if ordinal is None:
+        return None
+    return int(ordinal)
 
 
 class Chef:
-    def __init__(self, script):
+    def __init__(self, script, compact=False, backend="interpreter", seed=None):
         self.script = script
         self.original_script = script
-        self.mixing_bowls = []
-        self.number_of_mixing_bowls = 1
-        self.baking_dishes = []
-        self.number_of_baking_dishes = 1
+        self.compact = compact  # see Execution
+        self.backend = backend  # see BACKENDS
+        self.seed = seed  # see Execution
         self.recipe_name = None
         self.comment = None
         self.original_ingr = None
         self.ingr = None
-        self.ingredients_names = []
+        self.ingredient_slots = {}  # ingredient name -> index in self.ingr
         self.original_method = None
         self.method = None
+        self.instructions = None
         self.cook_time = None
         self.oven_temp = None
         self.serves = None
+        self.number_of_diners = None  # baking dishes served at the end
         self.auxiliary_recipes = []
+        self.compiled_recipes = {}  # auxiliary recipe name -> compiled Program
+        self.program = None
+        self.execution = None
+        self.sections = []  # (kind, Section) pairs, see outline_sections
 
     # LEXICAL ANALYSIS
     def parse_script(self):
-        ############################################################################
-        # the first line of the script should be the title of the recipe
-        ############################################################################
-        self.recipe_name = re.match("(.*?)\.\n\n", self.script)
-        if self.recipe_name is None:
-            raise ValueError("Invalid script format, please provide a valid recipe")
-
-        self.script = re.sub(self.recipe_name.group(), "", self.script)
-        # print(f"Recipe: {self.recipe_name.group()}")
-
-        ############################################################################
-        # the next thing we could have is a comment or the ingredients
-        ############################################################################
-        self.comment = re.match("(.*?)\n\n", self.script, re.DOTALL)
-
-        if self.comment is not None:
-            first_line = self.comment.group().split(" ")[0]
-            if "Ingredients" in first_line:
-                self.original_ingr = self.comment
-                self.comment = None
-            else:
-                # print("Comment: ", self.comment.group())
-                self.script = re.sub(re.escape(self.comment.group()), "", self.script)
-
-        ############################################################################
-        # now we can parse the ingredients
-        ############################################################################
-        if self.original_ingr is None:
-            self.original_ingr = re.match("(.*?)\n\n", self.script, re.DOTALL)
-            if self.original_ingr is None:
-                raise ValueError(
-                    "Invalid script format, please provide a valid recipe (no ingredients)"
-                )
-            first_line = self.original_ingr.group().split(" ")[0]
-            if "Ingredients" not in first_line:
-                raise ValueError(
-                    "Invalid script format, please provide a valid recipe (no ingredients)"
-                )
-
-        self.script = re.sub(re.escape(self.original_ingr.group()), "", self.script)
-        # print(f"Ingredients: {self.original_ingr.group()}")
-
-        self.parse_ingredients(self.original_ingr.group())
-
-        ############################################################################
-        # now we can parse the method, note that we can also have before the method
-        # the cook time and oven temperature, so we need to check for that
-        ############################################################################
-        method = re.match("(.*?)\n\n", self.script, re.DOTALL)
-
-        if method is not None:
-            first_line = method.group().split(" ")[0]
-            if "Method" in first_line:
-                self.original_method = method
-                method = None
-            elif "Cooking" in first_line:
-                self.cook_time = method
-                method = None
-            elif "Pre-heat" in first_line:
-                self.oven_temp = method
-                method = None
-            else:
-                raise ValueError(
-                    "Invalid script format, please provide a valid recipe (no method)"
-                )
-
-        if self.cook_time is not None:
-            # print("Cooking Time: ", self.cook_time.group())
-            self.script = re.sub(re.escape(self.cook_time.group()), "", self.script)
-
-            method = re.match("(.*?)\n\n", self.script, re.DOTALL)
-            if method is not None:
-                first_line = method.group().split(" ")[0]
-                if "Method" in first_line:
-                    self.original_method = method
-                    method = None
-                elif "Pre-heat" in first_line:
-                    self.oven_temp = method
-                    method = None
-                else:
-                    raise ValueError(
-                        "Invalid script format, please provide a valid recipe (no method)"
-                    )
-
-        if self.oven_temp is not None:
-            # print("Oven Temperature: ", self.oven_temp.group())
-            self.script = re.sub(re.escape(self.oven_temp.group()), "", self.script)
-
-        if self.original_method is None:
-            self.original_method = re.match("(.*?)\n\n", self.script, re.DOTALL)
-            if self.original_method is None:
-                raise ValueError(
-                    "Invalid script format, please provide a valid recipe (no method)"
-                )
-            first_line = self.original_method.group().split(" ")[0]
-            if "Method" not in first_line:
-                raise ValueError(
-                    "Invalid script format, please provide a valid recipe (no method)"
-                )
-
-        self.script = re.sub(re.escape(self.original_method.group()), "", self.script)
-        # print(f"Method: {self.original_method.group()}")
-
-        self.parse_method(self.original_method.group())
-
-        ############################################################################
-        # Parse the serves
-        ############################################################################
-        serves = re.match("(.*?)\n\n", self.script, re.DOTALL)
-
-        if serves is not None:
-            first_line = serves.group().split(" ")[0]
-            if "Serves" in first_line:
-                self.serves = serves
-            else:
+        """
+        Walk the script once, section by section (sections are separated by
+        blank lines), and dispatch every section to its parser. The sections
+        are kept, so that edits can be re-parsed incrementally (see
+        apply_edit).
+        """
+        self.sections = list(outline_sections(scan_sections(self.script)))
+        for kind, section in self.sections:
+            self.parse_section(kind, section)
+        self.auxiliary_recipes = collect_auxiliary_recipes(self.sections)
+        self.program = self.build_program()
+
+    def parse_section(self, kind, section):
+        if kind == "title":
+            self.recipe_name = section.text
+        elif kind == "comment":
+            self.comment = section.text
+        elif kind == "ingredients":
+            self.original_ingr = section.text
+            self.parse_ingredients(section.text)
+        elif kind == "cooking":
+            self.cook_time = section.text
+        elif kind == "pre-heat":
+            self.oven_temp = section.text
+        elif kind == "method":
+            self.original_method = section.text
+            self.parse_method(section.text)
+            self.instructions = self.compile_method(self.method)
+        elif kind == "serves":
+            self.serves = section.text
+            serves = re.match(r"Serves (\d+)", section.text)
+            if serves is None:
                 raise ValueError(
                     "Invalid script format, please provide a valid recipe (no serves)"
                 )
-        else:
-            raise ValueError(
-                "Invalid script format, please provide a valid recipe (no serves)"
-            )
-
-        # print("Serves: ", self.serves.group())
-        self.script = re.sub(re.escape(self.serves.group()), "", self.script)
-
-        ############################################################################
-        # Parse auxiliary recipes (if any)
-        ############################################################################
-        aux = re.match("(.*?)\n\n", self.script, re.DOTALL)
+            self.number_of_diners = int(serves.group(1))
+        # auxiliary recipes are kept unparsed, see collect_auxiliary_recipes
 
+    def apply_edit(self, start, end, replacement):
         """
-        auxiliary recipes are optional, and consists of 3 elements:
-        - the name of the recipe 
-        - the ingredients 
-        - the method
+        Replace script[start:end] with replacement and re-parse incrementally,
+        for editors: only the sections around the edit are scanned again, the
+        ingredients and the method are only parsed again if they changed, and
+        only the method lines that changed are compiled again. Returns the new
+        Program. If the edit makes the script invalid, ValueError is raised and
+        the chef is left as it was.
         """
-        if aux is None:
-            # print("No auxiliary recipes")
-            pass
-        else:
-            while True:
-                # get the name of the recipe
-                recipe_name = re.match("(.*?)\n\n", self.script, re.DOTALL)
-                if recipe_name is None:
-                    break
-                # print("Auxiliary Recipe: ", recipe_name.group())
-                self.script = re.sub(re.escape(recipe_name.group()), "", self.script)
-
-                # get the ingredients
-                ingredients = re.match("(.*?)\n\n", self.script, re.DOTALL)
-                if ingredients is None:
-                    raise ValueError(
-                        "Invalid script format, please provide a valid recipe (no ingredients)"
+        if not isinstance(self.script, str) or self.program is None:
+            raise ValueError("Only a parsed script string can be edited")
+        if not 0 <= start <= end <= len(self.script):
+            raise ValueError(f"Invalid edit range {start}:{end}")
+
+        script = self.script[:start] + replacement + self.script[end:]
+        old = [section for _, section in self.sections]
+        offsets = [section.offset for section in old]
+
+        # The edit can only reach the section it starts in (or follows) and
+        # the sections up to the one it ends in. One untouched section on each
+        # side is scanned again too, so that the scan starts and stops on
+        # section boundaries even when the edit adds or removes blank lines.
+        before = bisect.bisect_right(offsets, start) - 2
+        after = bisect.bisect_right(offsets, end)
+        first = max(before, 0)
+        region_start = old[before].offset if before >= 0 else 0
+        region_line = old[before].line if before >= 0 else 1
+        region_end = old[after + 1].offset if after + 1 < len(old) else len(self.script)
+
+        shift = len(replacement) - (end - start)
+        line_shift = replacement.count("\n") - self.script.count("\n", start, end)
+        rescanned = [
+            Section(
+                section.text,
+                section.offset + region_start,
+                section.line + region_line - 1,
+            )
+            for section in scan_sections(script[region_start : region_end + shift])
+        ]
+        following = [
+            Section(section.text, section.offset + shift, section.line + line_shift)
+            for section in old[after + 1 :]
+        ]
+        outline = list(outline_sections(iter(old[:first] + rescanned + following)))
+
+        # Parse into a copy, so that nothing changes if the new script is invalid
+        chef = copy.copy(self)
+        chef.script = script
+        chef.sections = outline
+        chef.comment = chef.cook_time = chef.oven_temp = None
+        for kind, section in outline:
+            if kind == "ingredients":
+                if section.text == self.original_ingr:
+                    continue
+                chef.ingredient_slots = {}
+            elif kind == "method" and all(
+                chef.ingredient_slots.get(name) == slot
+                for name, slot in self.ingredient_slots.items()
+            ):
+                # no ingredient moved, the unchanged lines compile the same
+                if section.text != self.original_method:
+                    chef.original_method = section.text
+                    chef.method = method_lines(section.text)
+                    chef.instructions = chef.recompile_method(
+                        self.method, self.instructions
                     )
-                # print("Ingredients: ", ingredients.group())
-                self.script = re.sub(re.escape(ingredients.group()), "", self.script)
+                continue
+            chef.parse_section(kind, section)
 
-                # print("Script", self.script)
+        chef.auxiliary_recipes = collect_auxiliary_recipes(outline)
+        if chef.auxiliary_recipes != self.auxiliary_recipes:
+            chef.compiled_recipes = {}
+        chef.execution = None
+        chef.program = chef.build_program()
 
-                # get the Method
-                method = re.match("(.*?)\n\n", self.script, re.DOTALL)
-                if method is None:
-                    raise ValueError(
-                        "Invalid script format, please provide a valid recipe (no method)"
-                    )
-                # print("Method: ", method.group())
-                self.script = re.sub(re.escape(method.group()), "", self.script)
-
-                # TODO: parse auxiliary recipe
-
-                self.auxiliary_recipes.append(
-                    Recipe(
-                        recipe_name.group(),
-                        ingredients.group(),
-                        method.group(),
-                        "",
-                        "",
-                        "",
-                        "",
-                        [],
-                    )
-                )
+        self.__dict__.update(chef.__dict__)
+        return self.program
 
-    def parse_ingredients(self, ingredients):
+    def parse_ingredients(self, ingredients, errors=None):
         """
         example list
 
@@ -263,6 +1400,9 @@ class Chef:
             ml | l | dash[es] : These always indicate liquid measures.
             cup[s] | teaspoon[s] | tablespoon[s] : These indicate measures which may be either dry or liquid.
         4. The ingredient-name is any string of characters. (Required)
+
+        Invalid lines raise ValueError, unless an errors list is given: then
+        (line index in the section, message) pairs are added to it instead.
         """
 
         ingredients = ingredients.split("\n")
@@ -293,30 +1433,28 @@ class Chef:
 
         parsed_ingredients = []
 
-        for ingredient in ingredients:
+        for row, ingredient in enumerate(ingredients):
             if ingredient == "Ingredients." or ingredient == "":
                 continue
 
             ingredient = ingredient.split(" ")
             initial_value = ingredient[0]
             if not initial_value.isdigit():
-                raise ValueError(
-                    "Invalid ingredient format, initial value must be a number"
-                )
-            measure = ingredient[1]
+                message = "Invalid ingredient format, initial value must be a number"
+                if errors is None:
+                    raise ValueError(message)
+                errors.append((row, message))
+                continue
+            measure = ingredient[1] if len(ingredient) > 1 else ""
             if measure not in dry_measures.union(liquid_measures).union(
                 general_measures
             ):
                 measure = None
+                measure_type = None
                 ingredient_name = " ".join(ingredient[1:])
-                self.ingredients_names.append(ingredient_name)
-                if ingredient_name == "" or ingredient_name in measure_types:
-                    raise ValueError(
-                        "Invalid ingredient format, ingredient name must be provided"
-                    )
                 ingredient_type = "dry"
             else:
-                measure_type = ingredient[2]
+                measure_type = ingredient[2] if len(ingredient) > 2 else ""
                 if measure in dry_measures:
                     ingredient_type = "dry"
                 if measure in liquid_measures:
@@ -326,14 +1464,22 @@ class Chef:
                 if measure_type not in measure_types:
                     measure_type = None
                     ingredient_name = " ".join(ingredient[2:])
-                    self.ingredients_names.append(ingredient_name)
                 else:
                     ingredient_name = " ".join(ingredient[3:])
-                    self.ingredients_names.append(ingredient_name)
 
+            if ingredient_name == "" or ingredient_name in measure_types:
+                message = "Invalid ingredient format, ingredient name must be provided"
+                if errors is None:
+                    raise ValueError(message)
+                errors.append((row, message))
+                continue
+
+            # if an ingredient is repeated, the new value is used
+            self.ingredient_slots[ingredient_name] = len(parsed_ingredients)
             parsed_ingredients.append(
                 {
                     "initial_value": initial_value,
+                    "value": int(initial_value),  # current value while cooking
                     "measure": measure,
                     "measure_type": measure_type,
                     "ingredient_name": ingredient_name,
@@ -350,51 +1496,488 @@ class Chef:
         Method.
         method-instruction.
         """
-        instruction_set = set(
-            [
-                "Take",
-                "Put",
-                "Fold",
-                "Add",
-                "Remove",
-                "Combine",
-                "Divide",
-                "Liquefy",
-                "Liquify",
-                "Stir",
-                "Mix",
-                "Clean",
-                "Pour",
-                "Serve",
-                "Refrigerate",
-                "Verb",
-                "Set",
-            ]
+        parsed_instructions = []
+        for instruction in method_lines(method):
+            check_method_line(instruction)
+            parsed_instructions.append(instruction)
+
+        self.method = parsed_instructions
+
+    def parse_auxiliary_recipe(self, recipe):
+        """
+        Parse and compile an auxiliary recipe into a Program. The Program shares
+        the auxiliary recipes (and their compiled cache) of this chef, so
+        auxiliary recipes can call each other and themselves.
+        """
+        self.recipe_name = recipe.name
+        self.original_ingr = recipe.ingredients
+        self.parse_ingredients(recipe.ingredients)
+        self.original_method = recipe.method
+        self.parse_method(recipe.method)
+        self.instructions = self.compile_method(self.method)
+        self.program = self.build_program()
+        return self.program
+
+    def check_ingredient_is_valid(self, ingredient):
+        if ingredient not in self.ingredient_slots:
+            raise ValueError(
+                f"Ingredient {ingredient} not found in the list of ingredients"
+            )
+
+    def compile_method(self, method):
+        """
+        Turn every method line into an Instruction record once, so that the
+        executor only has to dispatch on the opcode instead of trying every
+        instruction regex on every step.
+        """
+        instructions = []
+        for line, text in enumerate(method):
+            instructions.append(self.compile_instruction(text, line))
+        link_loops(instructions)
+        return instructions
+
+    def recompile_method(self, previous_method, previous_instructions):
+        """
+        Check and compile the method, reusing the instructions of a previous
+        version of it for the lines both versions share at their start and at
+        their end. The loops are only linked again if the changed lines have
+        loop instructions, otherwise the jump targets are just moved.
+        """
+        method = self.method
+        limit = min(len(method), len(previous_method))
+        prefix = 0
+        while prefix < limit and method[prefix] == previous_method[prefix]:
+            prefix += 1
+        suffix = 0
+        while (
+            suffix < limit - prefix
+            and method[-1 - suffix] == previous_method[-1 - suffix]
+        ):
+            suffix += 1
+
+        instructions = previous_instructions[:prefix]
+        for line in range(prefix, len(method) - suffix):
+            check_method_line(method[line])
+            instructions.append(self.compile_instruction(method[line], line))
+
+        boundary = len(previous_method) - suffix  # first line of the old suffix
+        shift = len(method) - len(previous_method)
+        relink = any(
+            instruction.opcode in LOOP_OPCODES
+            for instruction in itertools.chain(
+                previous_instructions[prefix:boundary], instructions[prefix:]
+            )
         )
+        if relink:
+            # link again, on copies of the loop instructions
+            for index in range(prefix):
+                if instructions[index].opcode in LOOP_OPCODES:
+                    instructions[index] = instructions[index].moved(0)
+            for instruction in previous_instructions[boundary:]:
+                if shift or instruction.opcode in LOOP_OPCODES:
+                    instruction = instruction.moved(shift)
+                instructions.append(instruction)
+            link_loops(instructions)
+            return instructions
+
+        if shift:
+            for index in range(prefix):
+                instruction = instructions[index]
+                if (
+                    instruction.opcode in LOOP_OPCODES
+                    and instruction.argument >= boundary
+                ):
+                    instructions[index] = instruction.moved(0)
+                    instructions[index].argument += shift
+        for instruction in previous_instructions[boundary:]:
+            if shift:
+                instruction = instruction.moved(shift)
+                if (
+                    instruction.opcode in LOOP_OPCODES
+                    and instruction.argument >= boundary
+                ):
+                    instruction.argument += shift
+            instructions.append(instruction)
+        return instructions
+
+    def compile_instruction(self, text, line):
+        sentence = text.strip().rstrip(".").strip()
+        for opcode, pattern in COMPILED_PATTERNS:
+            match = pattern.match(sentence)
+            if match is None:
+                continue
 
-        instructions = method.split("\n")
+            groups = match.groupdict()
+            ingredient = None
+            if groups.get("ingredient") is not None:
+                ingredient = self.resolve_ingredient(groups["ingredient"])
+
+            argument = None
+            if groups.get("number") is not None:
+                argument = int(groups["number"])
+            elif groups.get("recipe") is not None:
+                argument = groups["recipe"]
+
+            return Instruction(
+                opcode,
+                ingredient,
+                parse_ordinal(groups.get("bowl")),
+                parse_ordinal(groups.get("dish")),
+                argument,
+                line,
+                text,
+            )
 
-        parsed_instructions = []
+        raise ValueError(
+            "Invalid instruction format, instruction must be a valid instruction",
+            text,
+        )
+
+    def resolve_ingredient(self, name):
+        self.check_ingredient_is_valid(name)
+        return self.ingredient_slots[name]
+
+    def build_program(self):
+        mixing_bowls, baking_dishes = stack_usage(self.instructions)
+        return Program(
+            self.recipe_name,
+            self.ingr,
+            self.ingredient_slots,
+            self.method,
+            self.instructions,
+            self.number_of_diners,
+            self.auxiliary_recipes,
+            self.compiled_recipes,
+            mixing_bowls,
+            baking_dishes,
+        )
+
+    def analyze(self):
+        """
+        Static analysis of the script, to reject bad recipes before cooking.
+        Unlike parse_script, it does not stop at the first error. It parses
+        and compiles the main recipe and every auxiliary recipe, and collects
+        every error with its line. It then checks what can be known before
+        cooking:
+
+        - every "Serve with" names an existing recipe;
+        - every loop is closed;
+        - no mixing bowl or baking dish is used without a number after other
+          ones were used with a number;
+        - no ingredient is taken from a mixing bowl that is certainly empty.
+
+        The last two checks cover the instructions before the first loop or
+        "Serve with" of every recipe, since the rest depends on the input.
+        Returns the list of Diagnostic. If it is empty, self.program is the
+        compiled main recipe and the auxiliary recipes are compiled too.
+        """
+        try:
+            self.sections = list(outline_sections(scan_sections(self.script)))
+        except ValueError as error:
+            return [Diagnostic(None, None, error.args[0])]
+
+        diagnostics = []
+        self.auxiliary_recipes = collect_auxiliary_recipes(self.sections)
+        recipe_keys = {recipe_key(recipe.name) for recipe in self.auxiliary_recipes}
+        sections = {}
+        auxiliary_sections = []
+        for kind, section in self.sections:
+            if kind.startswith("auxiliary"):
+                auxiliary_sections.append(section)
+            else:
+                sections[kind] = section
+        for kind in ("title", "comment", "cooking", "pre-heat", "serves"):
+            if kind in sections:
+                try:
+                    self.parse_section(kind, sections[kind])
+                except ValueError as error:
+                    diagnostics.append(
+                        Diagnostic(self.recipe_name, sections[kind].line, error.args[0])
+                    )
+        self.check_recipe(
+            sections["ingredients"], sections["method"], recipe_keys, diagnostics
+        )
+        main_recipe_ok = not diagnostics
+
+        for index in range(0, len(auxiliary_sections), 3):
+            title, ingredients, method = auxiliary_sections[index : index + 3]
+            sous_chef = Chef(None)
+            sous_chef.recipe_name = title.text
+            sous_chef.auxiliary_recipes = self.auxiliary_recipes
+            sous_chef.compiled_recipes = self.compiled_recipes
+            errors = len(diagnostics)
+            sous_chef.check_recipe(
+                ingredients, method, recipe_keys, diagnostics, auxiliary=True
+            )
+            # the first recipe of a name is the one served
+            key = recipe_key(title.text)
+            if len(diagnostics) == errors and key not in self.compiled_recipes:
+                self.compiled_recipes[key] = sous_chef.build_program()
+
+        if main_recipe_ok:
+            self.program = self.build_program()
+        return diagnostics
+
+    def check_recipe(
+        self, ingredients, method, recipe_keys, diagnostics, auxiliary=False
+    ):
+        """
+        Parse and compile a recipe for analyze, adding a Diagnostic for every
+        error. Lines that fail to compile are None in self.instructions.
+        """
 
-        for instruction in instructions:
-            if instruction == "Method." or instruction == "":
+        def report(line, message):
+            diagnostics.append(Diagnostic(self.recipe_name, line, message))
+
+        errors = len(diagnostics)
+        ingredient_errors = []
+        self.original_ingr = ingredients.text
+        self.parse_ingredients(ingredients.text, ingredient_errors)
+        for row, message in ingredient_errors:
+            report(ingredients.line + row, message)
+
+        self.original_method = method.text
+        self.method = []
+        lines = []  # line of every method instruction in the script
+        for row, text in enumerate(method.text.split("\n")):
+            if text != "Method." and text != "":
+                self.method.append(text)
+                lines.append(method.line + row)
+
+        self.instructions = []
+        for index, text in enumerate(self.method):
+            try:
+                check_method_line(text)
+                self.instructions.append(self.compile_instruction(text, index))
+            except ValueError as error:
+                report(lines[index], error.args[0])
+                self.instructions.append(None)
+
+        open_loops = []
+        for index, instruction in enumerate(self.instructions):
+            if instruction is None:
+                continue
+            if instruction.opcode == Opcode.LOOP_START:
+                open_loops.append(index)
+            elif instruction.opcode == Opcode.LOOP_END:
+                if open_loops:
+                    open_loops.pop()
+                else:
+                    report(lines[index], "Loop end without a matching loop start")
+            elif instruction.opcode == Opcode.SET_ASIDE and not open_loops:
+                report(lines[index], "Set aside can only be used inside a loop")
+            elif instruction.opcode == Opcode.SERVE_WITH:
+                if recipe_key(instruction.argument) not in recipe_keys:
+                    report(
+                        lines[index],
+                        f"Auxiliary recipe {instruction.argument} not found",
+                    )
+        for index in open_loops:
+            report(lines[index], "Loop start without a matching loop end")
+        if len(diagnostics) == errors:
+            link_loops(self.instructions)
+
+        # Straight-line start of the method: the state of the stacks is known
+        # there (the mixing bowls of an auxiliary recipe come from its caller)
+        numbered_bowl = numbered_dish = 0  # last number used, 0 if none yet
+        depths = {}  # mixing bowl number -> number of ingredients, if known
+        for index, instruction in enumerate(self.instructions):
+            if instruction is None:
+                continue
+            opcode = instruction.opcode
+            if opcode in LOOP_OPCODES or opcode in (
+                Opcode.SERVE_WITH,
+                Opcode.REFRIGERATE,
+            ):
+                break
+            if opcode not in MIXING_BOWL_OPCODES:
                 continue
 
-            instruction = instruction.split(" ")
-            verb = instruction[0]
-            if verb not in instruction_set:
-                raise ValueError(
-                    "Invalid instruction format, instruction must be a valid instruction",
-                    verb,
+            if instruction.mixing_bowl is not None:
+                numbered_bowl = instruction.mixing_bowl
+            elif numbered_bowl > 1:
+                report(
+                    lines[index],
+                    "A mixing bowl may not be used without a number if other "
+                    "mixing bowls have been used with a number.",
                 )
+            if opcode == Opcode.POUR:
+                if instruction.baking_dish is not None:
+                    numbered_dish = instruction.baking_dish
+                elif numbered_dish > 1:
+                    report(
+                        lines[index],
+                        "A baking dish may not be used without a number if other "
+                        "baking dishes have been used with a number.",
+                    )
 
-            parsed_instructions.append(" ".join(instruction))
+            number = instruction.mixing_bowl or 1
+            depth = depths.get(number, None if auxiliary else 0)
+            if opcode in NON_EMPTY_OPCODES and depth == 0:
+                report(lines[index], f"Mixing bowl {number} is empty")
+                break  # cooking stops here
+            if opcode in (Opcode.PUT, Opcode.ADD_DRY) and depth is not None:
+                depths[number] = depth + 1
+            elif opcode == Opcode.FOLD and depth is not None:
+                depths[number] = depth - 1
+            elif opcode == Opcode.CLEAN:
+                depths[number] = 0
+
+        diagnostics[errors:] = sorted(
+            diagnostics[errors:], key=lambda diagnostic: diagnostic.line
+        )
 
-        self.method = parsed_instructions
+    def execute_script(self, sink=None, source=None):
+        if self.execution is None:
+            self.execution = BACKENDS[self.backend](
+                self.program, compact=self.compact, seed=self.seed
+            )
+        self.execution.run(sink, source=source)
 
-    # DO NOT IMPLEMENT THIS FUNCTION FOR NOW
-    def parse_auxiliary_recipe(self, recipe):
-        pass
+    async def execute_script_async(self, sink=None, source=None, **limits):
+        if self.execution is None:
+            self.execution = BACKENDS[self.backend](
+                self.program, compact=self.compact, seed=self.seed
+            )
+        await self.execution.run_async(sink, source, **limits)
+
+    def serve(self, sink=None, diners=None):
+        return self.execution.serve(sink, diners)
+
+    @property
+    def mixing_bowls(self):
+        return self.execution.mixing_bowls
+
+    @property
+    def baking_dishes(self):
+        return self.execution.baking_dishes
+
+    @property
+    def refrigerated(self):
+        return self.execution.refrigerated
+
+
+@dataclass(frozen=True)
+class Program:
+    """
+    A parsed and compiled recipe. Nothing in it changes while cooking, so one
+    Program can be executed any number of times, see Execution.
+    """
+
+    name: str
+    ingredients: list  # ingredient declarations, see Chef.parse_ingredients
+    ingredient_slots: dict  # ingredient name -> index in ingredients
+    method: list[str]
+    instructions: list[Instruction]
+    number_of_diners: int
+    auxiliary_recipes: list[Recipe]
+    # auxiliary recipe name -> Program, shared by all the recipes of a script
+    compiled_recipes: dict = field(default_factory=dict, compare=False, repr=False)
+    # highest mixing bowl and baking dish numbers used, see stack_usage
+    mixing_bowls: int = 0
+    baking_dishes: int = 0
+    # code compiled from the instructions by other backends (see VirtualMachine)
+    # and the constant prefix of the method (see fold_prefix)
+    code: dict = field(default_factory=dict, compare=False, repr=False)
+
+    # Compiled auxiliary recipe, every recipe is compiled only once
+    def auxiliary_program(self, name):
+        key = recipe_key(name)
+        if key not in self.compiled_recipes:
+            for recipe in self.auxiliary_recipes:
+                if recipe_key(recipe.name) == key:
+                    sous_chef = Chef(None)
+                    sous_chef.auxiliary_recipes = self.auxiliary_recipes
+                    sous_chef.compiled_recipes = self.compiled_recipes
+                    program = sous_chef.parse_auxiliary_recipe(recipe)
+                    self.compiled_recipes[key] = program
+                    break
+            else:
+                raise ValueError(f"Auxiliary recipe {name} not found")
+        return self.compiled_recipes[key]
+
+
+class Execution:
+    """
+    State of one run of a Program: the current values of the ingredients and
+    the mixing bowls and baking dishes. Running an execution again resets it
+    first, which only restores the ingredients the previous run touched, so
+    a single Program can be run many times cheaply.
+
+    "Mix the mixing bowl well" shuffles with a random.Random seeded with
+    seed when the execution starts, shared with the sous-chefs: with a seed,
+    every run of the same program mixes the same way, whatever the backend
+    or the stacks.
+    """
+
+    def __init__(self, program, compact=False, seed=None):
+        self.program = program
+        # compact mixing bowls and baking dishes keep their values in arrays
+        self.compact = compact
+        if compact:
+            self.mixing_bowl_class = CompactMixingBowl
+            self.baking_dish_class = CompactBakingDish
+        else:
+            self.mixing_bowl_class = MixingBowl
+            self.baking_dish_class = BakingDish
+        self.values = [i["value"] for i in program.ingredients]
+        self.ingredient_types = [i["ingredient_type"] for i in program.ingredients]
+        self.touched = set()  # slots of the ingredients changed by this run
+        # sum of the values of the dry ingredients, kept up to date by
+        # set_value and set_ingredient_type for "Add dry ingredients"
+        self.dry_total = sum(
+            value
+            for value, ingredient_type in zip(self.values, self.ingredient_types)
+            if ingredient_type == "dry"
+        )
+        self.mixing_bowls = []
+        self.number_of_mixing_bowls = 1
+        self.baking_dishes = []
+        self.number_of_baking_dishes = 1
+        self.output = None  # where "Refrigerate for N hours" serves the dishes
+        self.input = None  # where "Take" reads from, see InputSource
+        self.refrigerated = False  # the recipe ended with Refrigerate
+        self.profiler = None
+        self.started = False
+        self.resume = 0  # index of the first instruction to run, see start
+        self.seed = seed
+        self.random = None  # random.Random of Mix
+
+    # Go back to the state before the first run
+    def reset(self):
+        touched, self.touched = self.touched, set()
+        for slot in touched:
+            ingredient = self.program.ingredients[slot]
+            self.set_ingredient_type(slot, ingredient["ingredient_type"])
+            self.set_value(slot, ingredient["value"])
+        self.touched.clear()
+        for stack in self.mixing_bowls + self.baking_dishes:
+            stack.release()
+        self.mixing_bowls = []
+        self.number_of_mixing_bowls = 1
+        self.baking_dishes = []
+        self.number_of_baking_dishes = 1
+        self.output = None
+        self.input = None
+        self.refrigerated = False
+        self.started = False
+        self.resume = 0
+        self.random = None
+
+    # Change the current value of an ingredient
+    def set_value(self, slot, value):
+        if self.ingredient_types[slot] == "dry":
+            self.dry_total += value - self.values[slot]
+        self.values[slot] = value
+        self.touched.add(slot)
+
+    def set_ingredient_type(self, slot, ingredient_type):
+        if self.ingredient_types[slot] == "dry":
+            self.dry_total -= self.values[slot]
+        if ingredient_type == "dry":
+            self.dry_total += self.values[slot]
+        self.ingredient_types[slot] = ingredient_type
+        self.touched.add(slot)
 
     def prepare_mixing_bowls(self, instruction, mixing_bowl_number):
         # check if there are any more mixing bowls
@@ -406,7 +1989,7 @@ class Chef:
             else:
                 mixing_bowl_number = 1
                 if len(self.mixing_bowls) == 0:
-                    self.mixing_bowls.append(MixingBowl("Mixing Bowl 1", []))
+                    self.mixing_bowls.append(self.mixing_bowl_class("Mixing Bowl 1"))
                     return mixing_bowl_number
 
         # check that we provide with enough mixing bowls
@@ -415,7 +1998,9 @@ class Chef:
             mixing_bowl_number = self.number_of_mixing_bowls
             if self.number_of_mixing_bowls > len(self.mixing_bowls):
                 for i in range(len(self.mixing_bowls), self.number_of_mixing_bowls):
-                    self.mixing_bowls.append(MixingBowl(f"Mixing Bowl {i+1}", []))
+                    self.mixing_bowls.append(
+                        self.mixing_bowl_class(f"Mixing Bowl {i+1}")
+                    )
 
         return mixing_bowl_number
 
@@ -429,7 +2014,7 @@ class Chef:
             else:
                 baking_dish_number = 1
                 if len(self.baking_dishes) == 0:
-                    self.baking_dishes.append(BakingDish("Baking Dish 1", []))
+                    self.baking_dishes.append(self.baking_dish_class("Baking Dish 1"))
                     return baking_dish_number
 
         # check that we provide with enough baking dishes
@@ -438,401 +2023,1394 @@ class Chef:
             baking_dish_number = self.number_of_baking_dishes
             if self.number_of_baking_dishes > len(self.baking_dishes):
                 for i in range(len(self.baking_dishes), self.number_of_baking_dishes):
-                    self.baking_dishes.append(BakingDish(f"Baking Dish {i+1}", []))
+                    self.baking_dishes.append(
+                        self.baking_dish_class(f"Baking Dish {i+1}")
+                    )
 
         return baking_dish_number
 
-    def check_ingredient_is_valid(self, ingredient):
-        if ingredient not in self.ingredients_names:
-            raise ValueError(
-                f"Ingredient {ingredient} not found in the list of ingredients"
-            )
-
-    def execute_script(self):
-        # Execute the instructions
-        for instruction in self.method:
-            ############################################################################
-            # PUT INGREDIENT INTO MIXING BOWL
-            ############################################################################
-            put = re.search(
-                "^Put ?([a-zA-Z ]+) into (?:the )?(?:([1-9]\d*)(?:st|nd|rd|th) )?mixing bowl",
-                instruction,
-            )
-            if put is not None:
-                mixing_bowl_number = self.prepare_mixing_bowls(put, put.group(2))
-
-                self.check_ingredient_is_valid(put.group(1))
-
-                # Searh for the ingredient value in the list of ingredients
-                for ingredient in self.ingr:
-                    if ingredient["ingredient_name"] == put.group(1):
-                        # put the ingredient in the mixing bowl that corresponds to the number
-                        self.put(ingredient, mixing_bowl_number)
-
-            ############################################################################
-            # FOLD INGREDIENT INTO MIXING BOWL
-            ############################################################################
-            fold = re.search(
-                "Fold ([a-zA-Z ]+) into (?:the )?(?:(1st|2nd|3rd|[0-9]+th) )?mixing bowl",
-                instruction,
-            )
-            if fold is not None:
-                mixing_bowl_number = self.prepare_mixing_bowls(fold, fold.group(2))
-
-                self.check_ingredient_is_valid(fold.group(1))
-
-                # Searh for the ingredient value in the list of ingredients
-                for ingredient in self.ingr:
-                    if ingredient["ingredient_name"] == fold.group(1):
-                        # fold the ingredient in the mixing bowl that corresponds to the number
-                        self.fold(ingredient, mixing_bowl_number)
-
-            ############################################################################
-            # ADD INGREDIENT INTO MIXING BOWL
-            ############################################################################
-            add = re.search(
-                "Add ([a-zA-Z ]+?) to (?:the )?(?:(1st|2nd|3rd|[0-9]+th) )?mixing bowl",
-                instruction,
-            )
-            if add is not None:
-                mixing_bowl_number = self.prepare_mixing_bowls(add, add.group(2))
-
-                self.check_ingredient_is_valid(add.group(1))
-
-                # Searh for the ingredient value in the list of ingredients
-                for ingredient in self.ingr:
-                    if ingredient["ingredient_name"] == add.group(1):
-                        # add the ingredient in the mixing bowl that corresponds to the number
-                        self.add(ingredient, mixing_bowl_number)
-
-            ############################################################################
-            # REMOVE INGREDIENT FROM MIXING BOWL
-            ############################################################################
-            remove = re.search(
-                "Remove ([a-zA-Z ]+?) from (?:the )?(?:(1st|2nd|3rd|[0-9]+th) )?mixing bowl",
-                instruction,
+    def run(self, sink=None, profiler=None, source=None):
+        """
+        Execute the compiled instructions. "Refrigerate for N hours" serves the
+        first N baking dishes to the sink (stdout by default). Refrigerate
+        ends the execution early and sets self.refrigerated, in which case the
+        dishes should not be served again. With a Profiler, the instructions
+        are executed by an instrumented copy of the dispatch loop. "Take ...
+        from refrigerator" reads its numbers from the source, an InputSource
+        reading the standard input by default.
+        """
+        self.start(sink, profiler, source)
+        if profiler is None:
+            self.dispatch(self.handlers())
+        else:
+            self.dispatch_profiled(self.handlers(), profiler)
+
+    async def run_async(
+        self,
+        sink=None,
+        source=None,
+        budget=None,
+        timeout=None,
+        slice_size=ASYNC_SLICE_SIZE,
+    ):
+        """
+        Execute the compiled instructions as a coroutine, letting the other
+        tasks of the event loop run every slice_size instructions, so that
+        many executions can share one event loop. "Take ... from refrigerator"
+        awaits its numbers from the source (see AsyncInputSource). The
+        execution, sous-chefs included, may run at most budget instructions
+        (RuntimeError) for at most timeout seconds (TimeoutError).
+        """
+        self.start(sink, None)
+        quota = Quota(budget, timeout)
+        await self.dispatch_async(self.handlers(), source, quota, slice_size)
+
+    def start(self, sink, profiler, source=None):
+        if self.started:
+            self.reset()
+        self.started = True
+        self.output = sink if sink is not None else sys.stdout
+        self.profiler = profiler
+        self.input = source if source is not None else InputSource()
+        if self.random is None:
+            self.random = random.Random(self.seed)
+
+        # starting from scratch, the constant prefix of the method is copied
+        # instead of executed (profiled runs execute every instruction)
+        if (
+            profiler is None
+            and not self.mixing_bowls
+            and not self.baking_dishes
+            and self.number_of_mixing_bowls == 1
+            and self.number_of_baking_dishes == 1
+        ):
+            self.resume, folded = fold_prefix(self.program, self.compact)
+            if folded is not None:
+                self.values = folded.values[:]
+                self.ingredient_types = folded.ingredient_types[:]
+                self.touched = set(folded.touched)
+                self.dry_total = folded.dry_total
+                self.mixing_bowls = [bowl.snapshot() for bowl in folded.mixing_bowls]
+                self.number_of_mixing_bowls = folded.number_of_mixing_bowls
+                self.baking_dishes = [dish.snapshot() for dish in folded.baking_dishes]
+                self.number_of_baking_dishes = folded.number_of_baking_dishes
+
+        # every mixing bowl and baking dish the recipe uses is there from the
+        # start (a sous-chef adds them to the ones it was given)
+        for number in range(len(self.mixing_bowls), self.program.mixing_bowls):
+            self.mixing_bowls.append(
+                self.mixing_bowl_class(f"Mixing Bowl {number + 1}")
             )
-            if remove is not None:
-                mixing_bowl_number = self.prepare_mixing_bowls(remove, remove.group(2))
-
-                self.check_ingredient_is_valid(remove.group(1))
-
-                # Searh for the ingredient value in the list of ingredients
-                for ingredient in self.ingr:
-                    if ingredient["ingredient_name"] == remove.group(1):
-                        # remove the ingredient in the mixing bowl that corresponds to the number
-                        self.remove(ingredient, mixing_bowl_number)
-
-            ############################################################################
-            # COMBINE INGREDIENT IN MIXING BOWL
-            ############################################################################
-            combine = re.search(
-                "Combine ([a-zA-Z ]+?) into (?:the )?(?:(1st|2nd|3rd|[0-9]+th) )?mixing bowl",
-                instruction,
+        for number in range(len(self.baking_dishes), self.program.baking_dishes):
+            self.baking_dishes.append(
+                self.baking_dish_class(f"Baking Dish {number + 1}")
             )
-            if combine is not None:
-                mixing_bowl_number = self.prepare_mixing_bowls(
-                    combine, combine.group(2)
+
+    def handlers(self):
+        return {
+            Opcode.TAKE: self.execute_take,
+            Opcode.PUT: self.execute_put,
+            Opcode.FOLD: self.execute_fold,
+            Opcode.ADD: self.execute_add,
+            Opcode.REMOVE: self.execute_remove,
+            Opcode.COMBINE: self.execute_combine,
+            Opcode.DIVIDE: self.execute_divide,
+            Opcode.ADD_DRY: self.execute_add_dry,
+            Opcode.LIQUEFY: self.execute_liquefy,
+            Opcode.LIQUEFY_CONTENTS: self.execute_liquefy_contents,
+            Opcode.STIR: self.execute_stir,
+            Opcode.STIR_INGREDIENT: self.execute_stir_ingredient,
+            Opcode.MIX: self.execute_mix,
+            Opcode.CLEAN: self.execute_clean,
+            Opcode.POUR: self.execute_pour,
+            Opcode.LOOP_START: self.execute_loop_start,
+            Opcode.LOOP_END: self.execute_loop_end,
+            Opcode.SET_ASIDE: self.execute_set_aside,
+            Opcode.SERVE_WITH: self.execute_serve_with,
+            Opcode.REFRIGERATE: self.execute_refrigerate,
+        }
+
+    def dispatch(self, handlers):
+        # handlers return the index of the next instruction when they jump
+        instructions = self.program.instructions
+        pc = self.resume
+        while pc < len(instructions):
+            instruction = instructions[pc]
+            jump = handlers[instruction.opcode](instruction)
+            pc = pc + 1 if jump is None else jump
+
+    # Same as dispatch, timing every instruction and measuring the stacks it used
+    def dispatch_profiled(self, handlers, profiler):
+        clock = time.perf_counter
+        recipe = self.program.name
+        instructions = self.program.instructions
+        started = clock()
+        pc = self.resume
+        while pc < len(instructions):
+            instruction = instructions[pc]
+            start = clock()
+            jump = handlers[instruction.opcode](instruction)
+            profiler.record_instruction(recipe, instruction, clock() - start)
+            profiler.record_depths(recipe, instruction, self)
+            pc = pc + 1 if jump is None else jump
+        profiler.record_recipe(recipe, clock() - started)
+
+    # Same as dispatch, handing over to the event loop between slices, and
+    # awaiting the input of Take and the sous-chefs of "Serve with"
+    async def dispatch_async(self, handlers, source, quota, slice_size):
+        instructions = self.program.instructions
+        pc = self.resume
+        count = limit = 0
+        while pc < len(instructions):
+            if count >= limit:
+                quota.spend(count)
+                await asyncio.sleep(0)
+                limit = quota.allowance(slice_size)
+                count = 0
+
+            instruction = instructions[pc]
+            if instruction.opcode == Opcode.TAKE:
+                await self.take_async(instruction.ingredient, source)
+                jump = None
+            elif instruction.opcode == Opcode.SERVE_WITH:
+                quota.spend(count)
+                count = limit = 0
+                await self.serve_with_async(
+                    instruction.argument, source, quota, slice_size
                 )
+                jump = None
+            else:
+                jump = handlers[instruction.opcode](instruction)
+            pc = pc + 1 if jump is None else jump
+            count += 1
+        quota.spend(count)
 
-                self.check_ingredient_is_valid(combine.group(1))
+    def execute_take(self, instruction):
+        self.take(instruction.ingredient)
 
-                # Searh for the ingredient value in the list of ingredients
-                for ingredient in self.ingr:
-                    if ingredient["ingredient_name"] == combine.group(1):
-                        # combine the ingredient in the mixing bowl that corresponds to the number
-                        self.combine(ingredient, mixing_bowl_number)
+    def execute_put(self, instruction):
+        mixing_bowl_number = self.prepare_mixing_bowls(
+            instruction, instruction.mixing_bowl
+        )
+        self.put(instruction.ingredient, mixing_bowl_number)
 
-            ############################################################################
-            # STIR INGREDIENT IN MIXING BOWL
-            ############################################################################
-            stir = re.search(
-                "Stir ([a-zA-Z ]+?) into (?:the )?(?:(1st|2nd|3rd|[0-9]+th) )?mixing bowl",
-                instruction,
-            )
-            if stir is not None:
-                mixing_bowl_number = self.prepare_mixing_bowls(stir, stir.group(2))
-
-                self.check_ingredient_is_valid(stir.group(1))
-
-                # Searh for the ingredient value in the list of ingredients
-                for ingredient in self.ingr:
-                    if ingredient["ingredient_name"] == stir.group(1):
-                        # stir the ingredient in the mixing bowl that corresponds to the number
-                        self.stir(mixing_bowl_number, ingredient["initial_value"])
-
-            ############################################################################
-            # DIVIDE INGREDIENT IN MIXING BOWL
-            ############################################################################
-            divide = re.search(
-                "Divide ([a-zA-Z ]+?) to (?:the )?(?:(1st|2nd|3rd|[0-9]+th) )?mixing bowl",
-                instruction,
-            )
-            if divide is not None:
-                mixing_bowl_number = self.prepare_mixing_bowls(divide, divide.group(2))
-
-                self.check_ingredient_is_valid(divide.group(1))
-
-                # Searh for the ingredient value in the list of ingredients
-                for ingredient in self.ingr:
-                    if ingredient["ingredient_name"] == divide.group(1):
-                        # divide the ingredient in the mixing bowl that corresponds to the number
-                        self.divide(ingredient, mixing_bowl_number)
-
-            ############################################################################
-            # LIQUEFY INGREDIENT IN MIXING BOWL
-            ############################################################################
-            liquefy = re.search(
-                "Liquefy contents of the (1st|2nd|3rd|[0-9]+th)? ?mixing bowl",
-                instruction,
-            )
-            if liquefy is not None:
-                mixing_bowl_number = self.prepare_mixing_bowls(
-                    liquefy, liquefy.group(1)
-                )
-                self.liquefy_all_ingredients(mixing_bowl_number)
-
-            ############################################################################
-            # LIQUIFY INGREDIENT IN MIXING BOWL
-            ############################################################################
-            liquify = re.search(
-                "Liquify contents of the (1st|2nd|3rd|[0-9]+th)? ?mixing bowl",
-                instruction,
-            )
-            if liquify is not None:
-                mixing_bowl_number = self.prepare_mixing_bowls(
-                    liquify, liquify.group(1)
-                )
-                self.liquefy_all_ingredients(mixing_bowl_number)
+    def execute_fold(self, instruction):
+        mixing_bowl_number = self.prepare_mixing_bowls(
+            instruction, instruction.mixing_bowl
+        )
+        self.fold(instruction.ingredient, mixing_bowl_number)
 
-            ############################################################################
-            # CLEAN MIXING BOWL
-            ############################################################################
-            clean = re.search(
-                "Clean the (1st|2nd|3rd|[0-9]+th)? ?mixing bowl", instruction
-            )
-            if clean is not None:
-                mixing_bowl_number = self.prepare_mixing_bowls(clean, clean.group(1))
-                self.clean(mixing_bowl_number)
-
-            ############################################################################
-            # MIX INGREDIENT IN MIXING BOWL
-            ############################################################################
-            mix = re.search(
-                "Mix the (1st|2nd|3rd|[0-9]+th)? ?mixing bowl well", instruction
-            )
-            if mix is not None:
-                mixing_bowl_number = self.prepare_mixing_bowls(mix, mix.group(1))
-                self.mix(mixing_bowl_number)
-
-            ############################################################################
-            # TAKE INGREDIENT FROM FRIDGE
-            ############################################################################
-            fridge = re.search("Take ([a-zA-Z]+) from refrigerator", instruction)
-            if fridge is not None:
-                pass
-
-            ############################################################################
-            # POUR INGREDIENT FROM MIXING BOWL
-            ############################################################################
-            pour = re.search(
-                "Pour contents of the (?:the )?(?:([1-9]\d*)(?:st|nd|rd|th) )?mixing bowl into the (?:the )?(?:([1-9]\d*)(?:st|nd|rd|th) )?baking dish",
-                instruction,
-            )
-            if pour is not None:
-                mixing_bowl_number = self.prepare_mixing_bowls(pour, pour.group(1))
-                baking_dish_number = self.prepare_baking_dishes(pour, pour.group(2))
-                self.pour(mixing_bowl_number, baking_dish_number)
-
-            ############################################################################
-            # REFREGERATE INGREDIENT IN MIXING BOWL
-            ############################################################################
-            refrigerate = re.search("Refrigerate (?:for ([0-9]+))? hours", instruction)
-            if refrigerate is not None:
-                self.refrigerate()
-
-            ############################################################################
-            # ADD DRY INGREDIENT TO MIXING BOWL
-            ############################################################################
-            adddry = re.search(
-                "Add dry ingredients(?: to the (1st|2nd|3rd|[0-9]+th) mixing bowl)?",
-                instruction,
-            )
-            if adddry is not None:
-                mixing_bowl_number = self.prepare_mixing_bowls(adddry)
-                self.add_dry_ingredients(mixing_bowl_number)
+    def execute_add(self, instruction):
+        mixing_bowl_number = self.prepare_mixing_bowls(
+            instruction, instruction.mixing_bowl
+        )
+        self.add(instruction.ingredient, mixing_bowl_number)
 
-            ############################################################################
-            # VERB INGREDIENT IN MIXING BOWL
-            ############################################################################
-            verb = re.search("([a-zA-Z]+) the ([a-zA-Z ]+) ?(?!until)", instruction)
-            if verb is not None:
-                pass
+    def execute_remove(self, instruction):
+        mixing_bowl_number = self.prepare_mixing_bowls(
+            instruction, instruction.mixing_bowl
+        )
+        self.remove(instruction.ingredient, mixing_bowl_number)
+
+    def execute_combine(self, instruction):
+        mixing_bowl_number = self.prepare_mixing_bowls(
+            instruction, instruction.mixing_bowl
+        )
+        self.combine(instruction.ingredient, mixing_bowl_number)
+
+    def execute_divide(self, instruction):
+        mixing_bowl_number = self.prepare_mixing_bowls(
+            instruction, instruction.mixing_bowl
+        )
+        self.divide(instruction.ingredient, mixing_bowl_number)
+
+    def execute_add_dry(self, instruction):
+        mixing_bowl_number = self.prepare_mixing_bowls(
+            instruction, instruction.mixing_bowl
+        )
+        self.add_dry_ingredients(mixing_bowl_number)
+
+    def execute_liquefy(self, instruction):
+        self.liquefy_single_ingredient(instruction.ingredient)
+
+    def execute_liquefy_contents(self, instruction):
+        mixing_bowl_number = self.prepare_mixing_bowls(
+            instruction, instruction.mixing_bowl
+        )
+        self.liquefy_all_ingredients(mixing_bowl_number)
+
+    def execute_stir(self, instruction):
+        mixing_bowl_number = self.prepare_mixing_bowls(
+            instruction, instruction.mixing_bowl
+        )
+        self.stir(mixing_bowl_number, instruction.argument)
+
+    def execute_stir_ingredient(self, instruction):
+        mixing_bowl_number = self.prepare_mixing_bowls(
+            instruction, instruction.mixing_bowl
+        )
+        self.stir(mixing_bowl_number, self.values[instruction.ingredient])
+
+    def execute_mix(self, instruction):
+        mixing_bowl_number = self.prepare_mixing_bowls(
+            instruction, instruction.mixing_bowl
+        )
+        self.mix(mixing_bowl_number)
+
+    def execute_clean(self, instruction):
+        mixing_bowl_number = self.prepare_mixing_bowls(
+            instruction, instruction.mixing_bowl
+        )
+        self.clean(mixing_bowl_number)
+
+    def execute_pour(self, instruction):
+        mixing_bowl_number = self.prepare_mixing_bowls(
+            instruction, instruction.mixing_bowl
+        )
+        baking_dish_number = self.prepare_baking_dishes(
+            instruction, instruction.baking_dish
+        )
+        self.pour(mixing_bowl_number, baking_dish_number)
+
+    # Loops
+    # "Verb the ingredient" checks the value of the ingredient, if it is 0 the
+    # execution continues after the matching "Verb [the ingredient] until verbed",
+    # which decrements its (optional) ingredient and jumps back to the loop start.
+    # "Set aside" jumps right after the end of the innermost loop. All the jump
+    # targets are resolved at compile time by link_loops.
+    def execute_loop_start(self, instruction):
+        if self.values[instruction.ingredient] == 0:
+            return instruction.argument + 1
+
+    def execute_loop_end(self, instruction):
+        if instruction.ingredient is not None:
+            slot = instruction.ingredient
+            self.set_value(slot, self.values[slot] - 1)
+        return instruction.argument
+
+    def execute_set_aside(self, instruction):
+        return instruction.argument + 1
+
+    def execute_serve_with(self, instruction):
+        self.serve_with(instruction.argument)
+
+    def execute_refrigerate(self, instruction):
+        self.refrigerate(instruction.argument)
+        return len(self.program.instructions)
 
     # Add the ingredient to the top of the mixing bowl
-    def put(self, ingredient, mixing_bowl_number):
-        self.mixing_bowls[mixing_bowl_number - 1].ingredients.append(
-            Ingredient(
-                ingredient["ingredient_name"],
-                ingredient["initial_value"],
-                ingredient["measure"],
-                ingredient["measure_type"],
-                ingredient["ingredient_type"],
-            )
+    def put(self, slot, mixing_bowl_number):
+        self.mixing_bowls[mixing_bowl_number - 1].push(
+            self.program.ingredients[slot],
+            slot,
+            self.values[slot],
+            self.ingredient_types[slot],
         )
 
-    # Remove the top ingredient from the mixing bowl and place the new ingredient on top
-    def fold(self, ingredient, mixing_bowl_number):
-        if len(self.mixing_bowls[mixing_bowl_number - 1].ingredients) == 0:
+    # Remove the top ingredient from the mixing bowl and place its value in the ingredient
+    def fold(self, slot, mixing_bowl_number):
+        if len(self.mixing_bowls[mixing_bowl_number - 1]) == 0:
             raise ValueError(f"Mixing bowl {mixing_bowl_number} is empty")
-        self.mixing_bowls[mixing_bowl_number - 1].ingredients.pop()
-        self.mixing_bowls[mixing_bowl_number - 1].ingredients.append(
-            Ingredient(
-                ingredient["ingredient_name"],
-                ingredient["initial_value"],
-                ingredient["measure"],
-                ingredient["measure_type"],
-                ingredient["ingredient_type"],
-            )
-        )
+        self.set_value(slot, self.mixing_bowls[mixing_bowl_number - 1].pop())
 
     # Take value from stdin and overwrite the ingredients value
-    def take(self, ingredient):
-        pass
+    def take(self, slot):
+        self.store_taken(slot, self.input.read_number())
+
+    async def take_async(self, slot, source):
+        if source is None:
+            raise ValueError("Take needs an input source")
+        self.store_taken(slot, await source.read_number())
+
+    def store_taken(self, slot, value):
+        if value is None:
+            name = self.program.ingredients[slot]["ingredient_name"]
+            raise ValueError(f"No more input to take {name} from the refrigerator")
+        self.set_value(slot, value)
 
     # Add the ingredient value to the value of the ingredient at the top of the mixing bowl
-    def add(self, ingredient, mixing_bowl_number):
-        if len(self.mixing_bowls[mixing_bowl_number - 1].ingredients) == 0:
+    def add(self, slot, mixing_bowl_number):
+        if len(self.mixing_bowls[mixing_bowl_number - 1]) == 0:
             raise ValueError(f"Mixing bowl {mixing_bowl_number} is empty")
-        self.mixing_bowls[mixing_bowl_number - 1].ingredients[-1].value += ingredient[
-            "initial_value"
-        ]
+        bowl = self.mixing_bowls[mixing_bowl_number - 1]
+        bowl.set_top(bowl.top() + self.values[slot])
 
     # Remove the ingredient value from the value of the ingredient at the top of the mixing bowl
-    def remove(self, ingredient, mixing_bowl_number):
-        if len(self.mixing_bowls[mixing_bowl_number - 1].ingredients) == 0:
+    def remove(self, slot, mixing_bowl_number):
+        if len(self.mixing_bowls[mixing_bowl_number - 1]) == 0:
             raise ValueError(f"Mixing bowl {mixing_bowl_number} is empty")
-        self.mixing_bowls[mixing_bowl_number - 1].ingredients[-1].value -= ingredient[
-            "initial_value"
-        ]
+        bowl = self.mixing_bowls[mixing_bowl_number - 1]
+        bowl.set_top(bowl.top() - self.values[slot])
 
     # Multiply the ingredient value by the value of the ingredient at the top of the mixing bowl
-    def combine(self, ingredient, mixing_bowl_number):
-        if len(self.mixing_bowls[mixing_bowl_number - 1].ingredients) == 0:
+    def combine(self, slot, mixing_bowl_number):
+        if len(self.mixing_bowls[mixing_bowl_number - 1]) == 0:
             raise ValueError(f"Mixing bowl {mixing_bowl_number} is empty")
-        self.mixing_bowls[mixing_bowl_number - 1].ingredients[-1].value *= ingredient[
-            "initial_value"
-        ]
+        bowl = self.mixing_bowls[mixing_bowl_number - 1]
+        bowl.set_top(bowl.top() * self.values[slot])
 
     # Divide the ingredient value by the value of the ingredient at the top of the mixing bowl
-    def divide(self, ingredient, mixing_bowl_number):
-        if len(self.mixing_bowls[mixing_bowl_number - 1].ingredients) == 0:
+    def divide(self, slot, mixing_bowl_number):
+        if len(self.mixing_bowls[mixing_bowl_number - 1]) == 0:
             raise ValueError(f"Mixing bowl {mixing_bowl_number} is empty")
-        self.mixing_bowls[mixing_bowl_number - 1].ingredients[-1].value /= ingredient[
-            "initial_value"
-        ]
+        bowl = self.mixing_bowls[mixing_bowl_number - 1]
+        if self.values[slot] == 0:
+            name = self.program.ingredients[slot]["ingredient_name"]
+            raise ValueError(f"Cannot divide by {name}, its value is 0")
+        bowl.set_top(bowl.top() // self.values[slot])
 
     # Sum all the values of the dry ingredients and add the sum to the top of the mixing bowl
     # as a new ingredient called "dry ingredients"
     def add_dry_ingredients(self, mixing_bowl_number):
-        # sum all the dry ingredients
-        sum = 0
-        for ingredient in self.ingredients:
-            if ingredient["ingredient_type"] == "dry":
-                sum += ingredient["initial_value"]
-
-        # add the sum to the top of the mixing bowl
-        self.mixing_bowls[mixing_bowl_number - 1].ingredients.append(
-            Ingredient(
-                "dry ingredients",
-                sum,
-                "",
-                "",
-                "dry",
-            )
+        # add the sum of all the dry ingredients to the top of the mixing bowl
+        self.mixing_bowls[mixing_bowl_number - 1].push_value(
+            "dry ingredients", self.dry_total, "dry"
         )
 
     # turn the ingredient outside the mixing bowl into a liquid
-    def liquefy_single_ingredient(self, ingredient):
-        # search for the ingredient in the mixing bowl
-        for ingr in self.ingredients:
-            if ingr["ingredient_name"] == ingredient:
-                ingr["ingredient_type"] = "liquid"
-                return
+    def liquefy_single_ingredient(self, slot):
+        self.set_ingredient_type(slot, "liquid")
 
     # turn all the ingredients inside the mixing bowl into a liquid
     def liquefy_all_ingredients(self, mixing_bowl_number):
-        for ingredient in self.mixing_bowls[mixing_bowl_number - 1].ingredients:
-            ingredient.ingredient_type = "liquid"
+        self.mixing_bowls[mixing_bowl_number - 1].liquefy()
 
     # move the top element to n positions down the stack, if n > len(stack) then the element is moved to the bottom
     def stir(self, mixing_bowl_number, n):
-        if len(self.mixing_bowls[mixing_bowl_number - 1].ingredients) == 0:
+        if len(self.mixing_bowls[mixing_bowl_number - 1]) == 0:
             raise ValueError(f"Mixing bowl {mixing_bowl_number} is empty")
-        ingredient = self.mixing_bowls[mixing_bowl_number - 1].ingredients.pop()
-        n = n % len(self.mixing_bowls[mixing_bowl_number - 1].ingredients)
-        self.mixing_bowls[mixing_bowl_number - 1].ingredients.insert(n, ingredient)
+        self.mixing_bowls[mixing_bowl_number - 1].stir(n)
 
     # randomize the order of the ingredients in the mixing bowl
     def mix(self, mixing_bowl_number):
-        random.shuffle(self.mixing_bowls[mixing_bowl_number - 1].ingredients)
+        self.mixing_bowls[mixing_bowl_number - 1].shuffle(self.random)
 
     # remove all the ingredients from the mixing bowl
     def clean(self, mixing_bowl_number):
-        self.mixing_bowls[mixing_bowl_number - 1].ingredients = []
+        self.mixing_bowls[mixing_bowl_number - 1].release()
 
     # Copy the elements from the mixing bowl to the baking dish, if the baking dish is not empty, the elements are added to the top
     def pour(self, mixing_bowl_number, baking_dish_number):
-        if len(self.mixing_bowls[mixing_bowl_number - 1].ingredients) == 0:
+        if len(self.mixing_bowls[mixing_bowl_number - 1]) == 0:
             raise ValueError(f"Mixing bowl {mixing_bowl_number} is empty")
         if baking_dish_number > len(self.baking_dishes):
             self.baking_dishes.append(
-                BakingDish(f"Baking Dish {baking_dish_number}", [])
+                self.baking_dish_class(f"Baking Dish {baking_dish_number}")
             )
-        for ingredient in self.mixing_bowls[mixing_bowl_number - 1].ingredients:
-            self.baking_dishes[baking_dish_number - 1].ingredients.append(ingredient)
-
-    # For loop
-    # it starts with the keyword Verb the, followed by an ingredient, the loop checks the value of the ingredient
-    # it the value is not 0, the loop executes the instructions inside the loop, if the value is 0, the loop is skipped
-    # the loop ends with the keyword Verb [the ingredient] until verbed, the ingredient could be any, but
-    # if the ingredient matches with the ingredient on "Verb the ingredient", the value of this ingredient is decremented by 1
-    # Watchout for the instruction Set aside, this instruction is used to break the loop
-    def verb_loop(self, ingredient1, ingredient2, instructions):
-        pass
+        self.baking_dishes[baking_dish_number - 1].extend(
+            self.mixing_bowls[mixing_bowl_number - 1]
+        )
 
-    # Refrigerate means to end the execution of the program
-    def refrigerate(self):
-        print("Refrigerating...")
-        sys.exit()
+    # Invoke a sous-chef to prepare the auxiliary recipe with copies of our mixing bowls
+    # and baking dishes, then empty its first mixing bowl into our first mixing bowl
+    def serve_with(self, recipe_name):
+        sous_chef = self.sous_chef(recipe_name)
+        # the sous-chef takes from the same refrigerator
+        sous_chef.run(self.output, self.profiler, self.input)
+        self.take_over(sous_chef)
+
+    async def serve_with_async(self, recipe_name, source, quota, slice_size):
+        sous_chef = self.sous_chef(recipe_name)
+        sous_chef.start(self.output, None)
+        await sous_chef.dispatch_async(sous_chef.handlers(), source, quota, slice_size)
+        self.take_over(sous_chef)
+
+    def sous_chef(self, recipe_name):
+        program = self.program.auxiliary_program(recipe_name)
+
+        sous_chef = type(self)(program, compact=self.compact, seed=self.seed)
+        sous_chef.random = self.random
+        sous_chef.mixing_bowls = [bowl.snapshot() for bowl in self.mixing_bowls]
+        sous_chef.number_of_mixing_bowls = self.number_of_mixing_bowls
+        sous_chef.baking_dishes = [dish.snapshot() for dish in self.baking_dishes]
+        sous_chef.number_of_baking_dishes = self.number_of_baking_dishes
+        return sous_chef
+
+    def take_over(self, sous_chef):
+        # the sous-chef is done, so our stacks do not need to be copied on write
+        for stack in sous_chef.mixing_bowls[1:] + sous_chef.baking_dishes:
+            stack.release()
+
+        if sous_chef.mixing_bowls:
+            result = sous_chef.mixing_bowls[0]
+            if len(self.mixing_bowls) == 0:
+                self.mixing_bowls.append(self.mixing_bowl_class("Mixing Bowl 1"))
+            self.mixing_bowls[0].extend(result)
+            result.release()
+
+    # Refrigerate means to end the execution of the recipe (execute_script stops), if a
+    # number of hours is given the first number baking dishes are served before
+    def refrigerate(self, hours=None):
+        self.refrigerated = True
+        if hours is not None and self.baking_dishes:
+            self.serve(self.output, hours)
 
     # Serve the dish (print the recipe)
-    def serve(self):
-        output = ""
+    def serve(self, sink=None, diners=None):
+        """
+        Write the contents of the first `diners` baking dishes (by default the
+        number given by "Serves") to the sink, from the top of every dish to
+        its bottom. The dishes are left untouched. The sink can be any writable
+        text or binary stream, the output is written to it in chunks of
+        SERVE_CHUNK_SIZE characters. Without a sink the output is returned as
+        a string.
+        """
         if self.number_of_baking_dishes == 0 or len(self.baking_dishes) == 0:
             raise ValueError("No baking dishes found")
 
-        for i in range(0, self.number_of_baking_dishes):
-            self.baking_dishes[i].ingredients.reverse()
-            for ingredient in self.baking_dishes[i].ingredients:
-                value = ingredient.value
-                type = ingredient.ingredient_type
-                if type == "liquid":
+        if sink is None:
+            output = io.StringIO()
+            self.serve(output, diners)
+            return output.getvalue()
+
+        if diners is None:
+            diners = self.program.number_of_diners
+        if diners is None:
+            diners = self.number_of_baking_dishes
+
+        if isinstance(sink, (io.RawIOBase, io.BufferedIOBase)):
+
+            def write(text):
+                sink.write(text.encode("utf-8"))
+
+        else:
+            write = sink.write
+
+        chunk = []
+        size = 0
+        for dish in self.baking_dishes[:diners]:
+            for value, liquid in dish.serving_order():
+                if liquid:
                     value = chr(int(value))
-                output += str(value)
-        return output
+                else:
+                    value = str(value)
+                chunk.append(value)
+                size += len(value)
+                if size >= SERVE_CHUNK_SIZE:
+                    write("".join(chunk))
+                    chunk = []
+                    size = 0
+        write("".join(chunk))
+
+
+class VirtualMachine(Execution):
+    """
+    Execution running the program compiled to bytecode (see compile_bytecode)
+    in a single dispatch loop, instead of calling a handler per instruction.
+    It behaves exactly like Execution, errors included. Profiled and async
+    runs go through the instructions, like Execution.
+    """
+
+    def bytecode(self):
+        # the checks are only needed if a numbered mixing bowl (or baking dish)
+        # other than the first one can be in use
+        key = (
+            "bytecode",
+            self.number_of_mixing_bowls > 1 or self.program.mixing_bowls > 1,
+            self.number_of_baking_dishes > 1 or self.program.baking_dishes > 1,
+            self.resume,
+        )
+        if key not in self.program.code:
+            self.program.code[key] = compile_bytecode(
+                self.program.instructions, key[1], key[2], self.resume
+            )
+        return self.program.code[key]
+
+    def dispatch(self, handlers):
+        (
+            PUT,
+            PUT_RUN,
+            PUT_ADD,
+            PUT_COMBINE,
+            FOLD,
+            ADD,
+            REMOVE,
+            COMBINE,
+            DIVIDE,
+            ADD_DRY,
+            TAKE,
+            LIQUEFY,
+            LIQUEFY_CONTENTS,
+            LIQUEFY_POUR,
+            STIR,
+            STIR_INGREDIENT,
+            MIX,
+            CLEAN,
+            POUR,
+            LOOP_START,
+            LOOP_END,
+            JUMP,
+            SERVE_WITH,
+            REFRIGERATE,
+            SELECT_BOWL,
+            CHECK_BOWL,
+            SELECT_DISH,
+            CHECK_DISH,
+        ) = map(int, Bytecode)
+
+        code = self.bytecode()
+        ingredients = self.program.ingredients
+        values = self.values
+        types = self.ingredient_types
+        touched = self.touched
+        bowls = self.mixing_bowls
+        dishes = self.baking_dishes
+        end = len(code)
+        pc = 0
+        while pc < end:
+            operation = code[pc]
+            op = operation[0]
+            pc += 1
+            # the most frequent operations first
+            if op == PUT:
+                slot = operation[1]
+                bowls[operation[2]].push(
+                    ingredients[slot], slot, values[slot], types[slot]
+                )
+            elif op == LOOP_START:
+                if values[operation[1]] == 0:
+                    pc = operation[2]
+            elif op == LOOP_END:
+                slot = operation[1]
+                if slot is not None:
+                    # self.set_value(slot, values[slot] - 1), inlined
+                    values[slot] -= 1
+                    touched.add(slot)
+                    if types[slot] == "dry":
+                        self.dry_total -= 1
+                pc = operation[2]
+            elif op == PUT_RUN:
+                bowl = bowls[operation[2]]
+                for slot in operation[1]:
+                    bowl.push(ingredients[slot], slot, values[slot], types[slot])
+            elif op == PUT_ADD or op == PUT_COMBINE:
+                slot = operation[1]
+                if op == PUT_ADD:
+                    value = values[slot] + values[operation[2]]
+                else:
+                    value = values[slot] * values[operation[2]]
+                bowls[operation[3]].push(ingredients[slot], slot, value, types[slot])
+            elif op == FOLD:
+                bowl = bowls[operation[2]]
+                if len(bowl) == 0:
+                    raise ValueError(f"Mixing bowl {operation[2] + 1} is empty")
+                self.set_value(operation[1], bowl.pop())
+            elif op == ADD or op == REMOVE or op == COMBINE or op == DIVIDE:
+                bowl = bowls[operation[2]]
+                if len(bowl) == 0:
+                    raise ValueError(f"Mixing bowl {operation[2] + 1} is empty")
+                value = values[operation[1]]
+                if op == ADD:
+                    bowl.set_top(bowl.top() + value)
+                elif op == REMOVE:
+                    bowl.set_top(bowl.top() - value)
+                elif op == COMBINE:
+                    bowl.set_top(bowl.top() * value)
+                else:
+                    self.divide(operation[1], operation[2] + 1)
+            elif op == SELECT_BOWL:
+                self.number_of_mixing_bowls = operation[1]
+            elif op == CHECK_BOWL:
+                self.prepare_mixing_bowls(None, None)
+            elif op == SELECT_DISH:
+                self.number_of_baking_dishes = operation[1]
+            elif op == CHECK_DISH:
+                self.prepare_baking_dishes(None, None)
+            elif op == POUR or op == LIQUEFY_POUR:
+                bowl = bowls[operation[2]]
+                if op == LIQUEFY_POUR:
+                    bowl.liquefy()
+                if len(bowl) == 0:
+                    raise ValueError(f"Mixing bowl {operation[2] + 1} is empty")
+                dishes[operation[1]].extend(bowl)
+            elif op == LIQUEFY_CONTENTS:
+                bowls[operation[2]].liquefy()
+            elif op == LIQUEFY:
+                self.set_ingredient_type(operation[1], "liquid")
+            elif op == ADD_DRY:
+                bowls[operation[2]].push_value("dry ingredients", self.dry_total, "dry")
+            elif op == STIR:
+                self.stir(operation[2] + 1, operation[1])
+            elif op == STIR_INGREDIENT:
+                self.stir(operation[2] + 1, values[operation[1]])
+            elif op == TAKE:
+                self.take(operation[1])
+            elif op == MIX:
+                self.mix(operation[2] + 1)
+            elif op == CLEAN:
+                self.clean(operation[2] + 1)
+            elif op == JUMP:
+                pc = operation[1]
+            elif op == SERVE_WITH:
+                self.serve_with(operation[1])
+            elif op == REFRIGERATE:
+                self.refrigerate(operation[1])
+                return
+
+
+class PythonExecution(VirtualMachine):
+    """
+    Execution running the program transpiled to a Python function (see
+    transpile), compiled once per Program and kept with its bytecode. The
+    generated source is registered with linecache, so tracebacks and
+    debuggers show it, and can be printed with --emit-python. Programs too
+    deeply nested for the Python compiler run on the VirtualMachine, with a
+    RuntimeWarning.
+    """
+
+    def function(self):
+        key = (
+            "python",
+            self.number_of_mixing_bowls > 1 or self.program.mixing_bowls > 1,
+            self.number_of_baking_dishes > 1 or self.program.baking_dishes > 1,
+            self.resume,
+        )
+        if key not in self.program.code:
+            source = transpile(self.program, key[1], key[2], self.resume)
+            filename = f"<chef {self.program.name} {id(self.program):x}>"
+            try:
+                code = compile(source, filename, "exec")
+            except (SyntaxError, RecursionError) as e:
+                # more than 20 nested loops
+                warnings.warn(
+                    f"{self.program.name} could not be transpiled to Python"
+                    f" ({type(e).__name__}: {e}), it runs on the virtual machine",
+                    RuntimeWarning,
+                )
+                self.program.code[key] = None
+            else:
+                linecache.cache[filename] = (
+                    len(source),
+                    None,
+                    source.splitlines(True),
+                    filename,
+                )
+                namespace = {}
+                exec(code, namespace)
+                self.program.code[key] = namespace["cook"]
+        return self.program.code[key]
+
+    def dispatch(self, handlers):
+        function = self.function()
+        if function is None:
+            super().dispatch(handlers)
+        else:
+            function(self)
+
+
+# Executions of the programs, by the name given to --backend
+BACKENDS = {
+    "interpreter": Execution,
+    "vm": VirtualMachine,
+    "python": PythonExecution,
+}
+
+
+class Quota:
+    """
+    Instructions and time left to an async execution and its sous-chefs, see
+    Execution.run_async. No budget (or timeout) means no limit.
+    """
+
+    def __init__(self, budget=None, timeout=None):
+        self.budget = budget
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+
+    def spend(self, instructions):
+        if self.budget is not None:
+            self.budget -= instructions
+
+    # Number of instructions that can run before the quota is checked again
+    def allowance(self, slice_size):
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise TimeoutError("Execution timed out")
+        if self.budget is None:
+            return slice_size
+        if self.budget <= 0:
+            raise RuntimeError("Execution ran out of its instruction budget")
+        return min(slice_size, self.budget)
+
+
+class NumberTokens:
+    """
+    Whitespace separated integers, from chunks of text or bytes fed one at a
+    time. Every chunk is split at once, but the tokens are only turned into
+    numbers when they are taken. Base of the input sources of "Take".
+    """
+
+    def __init__(self):
+        self.tokens = iter(())  # tokens of the last chunk not taken yet
+        self.partial = None  # last token of the last chunk, may continue
+        self.done = False  # the last chunk (an empty one) was fed
+
+    def feed(self, chunk):
+        if not chunk:
+            self.done = True
+            tokens = [self.partial] if self.partial else []
+            self.partial = None
+        else:
+            if self.partial:
+                chunk = self.partial + chunk
+            tokens = chunk.split()
+            self.partial = None
+            if tokens and not chunk[-1:].isspace():
+                self.partial = tokens.pop()
+        self.tokens = iter(tokens)
+
+
+def invalid_number(token):
+    if isinstance(token, bytes):
+        token = token.decode("utf-8", "replace")
+    return ValueError(f"Invalid input for Take, {token} is not a number")
+
+
+class InputSource(NumberTokens):
+    """
+    Numbers for "Take ... from refrigerator": whitespace separated integers
+    read from a stream (standard input by default) in chunks of chunk_size
+    characters or bytes. The stream can be a text or binary file, a pipe, a
+    memory-mapped file... anything with a read(size) method. Any other
+    object with a read_number() method returning the next number (None at
+    the end) can be used as an input source too.
+    """
+
+    def __init__(self, stream=None, chunk_size=INPUT_CHUNK_SIZE):
+        super().__init__()
+        self.stream = stream
+        self.chunk_size = chunk_size
+
+    def read_number(self):
+        token = next(self.tokens, None)
+        while token is None and not self.done:
+            if self.stream is None:
+                # binary, the numbers do not have to be decoded
+                self.stream = getattr(sys.stdin, "buffer", sys.stdin)
+            # read1 returns what is available instead of waiting for a full
+            # chunk, numbers typed one by one are taken as they come
+            read = getattr(self.stream, "read1", self.stream.read)
+            self.feed(read(self.chunk_size))
+            token = next(self.tokens, None)
+        if token is None:
+            return None
+        try:
+            return int(token)
+        except ValueError:
+            raise invalid_number(token) from None
+
+
+class AsyncInputSource(NumberTokens):
+    """
+    Numbers for "Take ... from refrigerator" in async executions: whitespace
+    separated integers read from an asyncio.StreamReader, or anything with an
+    async read(size) method returning text or bytes (empty at the end).
+    """
+
+    def __init__(self, reader, chunk_size=INPUT_CHUNK_SIZE):
+        super().__init__()
+        self.reader = reader
+        self.chunk_size = chunk_size
+
+    async def read_number(self):
+        token = next(self.tokens, None)
+        while token is None and not self.done:
+            self.feed(await self.reader.read(self.chunk_size))
+            token = next(self.tokens, None)
+        if token is None:
+            return None
+        try:
+            return int(token)
+        except ValueError:
+            raise invalid_number(token) from None
+
+
+class Profiler:
+    """
+    Opt-in profile of executions (see Execution.run): how many times every
+    method line of every recipe was executed and the time spent in it (a
+    "Serve with" line includes the time of the sous-chef), the number of
+    calls and total time of every recipe, and the peak depth reached by every
+    mixing bowl and baking dish.
+    """
+
+    def __init__(self):
+        self.lines = {}  # (recipe, line) -> [count, seconds, text]
+        self.recipes = {}  # recipe -> [calls, seconds]
+        self.mixing_bowls = {}  # (recipe, mixing bowl number) -> peak depth
+        self.baking_dishes = {}  # (recipe, baking dish number) -> peak depth
+
+    def record_instruction(self, recipe, instruction, seconds):
+        stats = self.lines.get((recipe, instruction.line))
+        if stats is None:
+            stats = self.lines[recipe, instruction.line] = [0, 0.0, instruction.text]
+        stats[0] += 1
+        stats[1] += seconds
+
+    def record_depths(self, recipe, instruction, execution):
+        number = instruction.mixing_bowl or 1
+        if number <= len(execution.mixing_bowls):
+            depth = len(execution.mixing_bowls[number - 1])
+            if depth > self.mixing_bowls.get((recipe, number), 0):
+                self.mixing_bowls[recipe, number] = depth
+        number = instruction.baking_dish or 1
+        if number <= len(execution.baking_dishes):
+            depth = len(execution.baking_dishes[number - 1])
+            if depth > self.baking_dishes.get((recipe, number), 0):
+                self.baking_dishes[recipe, number] = depth
+
+    def record_recipe(self, recipe, seconds):
+        stats = self.recipes.setdefault(recipe, [0, 0.0])
+        stats[0] += 1
+        stats[1] += seconds
+
+    # Method lines, the hottest first
+    def hottest_lines(self):
+        return sorted(self.lines.items(), key=lambda item: item[1][1], reverse=True)
+
+    def report(self, sink):
+        sink.write(f"{'seconds':>10} {'count':>10}  line\n")
+        for (recipe, line), (count, seconds, text) in self.hottest_lines():
+            sink.write(f"{seconds:>10.6f} {count:>10}  {recipe} {line + 1}: {text}\n")
+
+        sink.write(f"\n{'seconds':>10} {'calls':>10}  recipe\n")
+        recipes = sorted(self.recipes.items(), key=lambda item: -item[1][1])
+        for recipe, (calls, seconds) in recipes:
+            sink.write(f"{seconds:>10.6f} {calls:>10}  {recipe}\n")
+
+        sink.write(f"\n{'peak':>10}  stack\n")
+        for (recipe, number), depth in sorted(self.mixing_bowls.items()):
+            sink.write(f"{depth:>10}  {recipe} mixing bowl {number}\n")
+        for (recipe, number), depth in sorted(self.baking_dishes.items()):
+            sink.write(f"{depth:>10}  {recipe} baking dish {number}\n")
+
+    def to_json(self):
+        return {
+            "lines": [
+                {
+                    "recipe": recipe,
+                    "line": line + 1,
+                    "text": text,
+                    "count": count,
+                    "seconds": seconds,
+                }
+                for (recipe, line), (count, seconds, text) in self.hottest_lines()
+            ],
+            "recipes": [
+                {"recipe": recipe, "calls": calls, "seconds": seconds}
+                for recipe, (calls, seconds) in self.recipes.items()
+            ],
+            "mixing_bowls": [
+                {"recipe": recipe, "number": number, "peak_depth": depth}
+                for (recipe, number), depth in self.mixing_bowls.items()
+            ],
+            "baking_dishes": [
+                {"recipe": recipe, "number": number, "peak_depth": depth}
+                for (recipe, number), depth in self.baking_dishes.items()
+            ],
+        }
+
+
+################################################################################
+# Compile cache: compiled programs are stored next to their recipes (like
+# __pycache__) in a compact binary form, keyed by a hash of the source text and
+# the interpreter version, so running a recipe again skips parsing entirely
+################################################################################
+CACHE_DIRECTORY = "__chefcache__"
+CACHE_MAGIC = b"CHEF"
+CACHE_CHECKSUM_SIZE = 32  # SHA-256 of the payload of a cache entry
+
+
+def source_digest(source):
+    return hashlib.sha256(f"{__version__}\0{source}".encode("utf-8")).digest()
+
+
+# Keys of the ingredient declarations, see Chef.parse_ingredients
+INGREDIENT_KEYS = {
+    "ingredient_name",
+    "value",
+    "measure",
+    "measure_type",
+    "ingredient_type",
+}
+
+
+def serialize_program(program):
+    return marshal.dumps(
+        (
+            program.name,
+            program.ingredients,
+            program.ingredient_slots,
+            program.method,
+            [
+                (
+                    int(i.opcode),
+                    i.ingredient,
+                    i.mixing_bowl,
+                    i.baking_dish,
+                    i.argument,
+                    i.line,
+                    i.text,
+                )
+                for i in program.instructions
+            ],
+            program.number_of_diners,
+            [
+                (
+                    r.name,
+                    r.ingredients,
+                    r.method,
+                    r.comment,
+                    r.cook_time,
+                    r.oven_temp,
+                    r.serves,
+                    r.auxiliary_recipes,
+                )
+                for r in program.auxiliary_recipes
+            ],
+            program.mixing_bowls,
+            program.baking_dishes,
+        )
+    )
+
+
+def deserialize_program(data):
+    (
+        name,
+        ingredients,
+        ingredient_slots,
+        method,
+        instructions,
+        number_of_diners,
+        auxiliary_recipes,
+        mixing_bowls,
+        baking_dishes,
+    ) = marshal.loads(data)
+    if not (
+        isinstance(name, str)
+        and isinstance(ingredients, list)
+        and all(
+            isinstance(ingredient, dict) and INGREDIENT_KEYS <= ingredient.keys()
+            for ingredient in ingredients
+        )
+        and isinstance(ingredient_slots, dict)
+        and isinstance(method, list)
+        and isinstance(instructions, list)
+        and isinstance(auxiliary_recipes, list)
+        and isinstance(mixing_bowls, int)
+        and isinstance(baking_dishes, int)
+    ):
+        raise ValueError("Compiled program has the wrong shape")
+    return Program(
+        name,
+        ingredients,
+        ingredient_slots,
+        method,
+        [Instruction(Opcode(opcode), *fields) for opcode, *fields in instructions],
+        number_of_diners,
+        [Recipe(*fields) for fields in auxiliary_recipes],
+        mixing_bowls=mixing_bowls,
+        baking_dishes=baking_dishes,
+    )
+
+
+def cache_path(path, digest):
+    directory = os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIRECTORY)
+    return os.path.join(directory, f"{digest.hex()}.chefc")
+
+
+def read_cache(path, digest):
+    """
+    Compiled program stored for the digest, or None if there is no entry or
+    the entry is stale or corrupt. An entry is the magic, the digest of the
+    source, the SHA-256 of the payload and the payload, the marshalled
+    program (see serialize_program).
+    """
+    try:
+        with open(cache_path(path, digest), "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+
+    header = CACHE_MAGIC + digest
+    if not data.startswith(header):
+        return None
+    checksum = data[len(header) : len(header) + CACHE_CHECKSUM_SIZE]
+    payload = data[len(header) + CACHE_CHECKSUM_SIZE :]
+    if hashlib.sha256(payload).digest() != checksum:
+        return None
+    try:
+        return deserialize_program(payload)
+    except Exception:
+        # whatever is wrong with the entry, it is rebuilt
+        return None
+
+
+def write_cache(path, digest, program):
+    filename = cache_path(path, digest)
+    try:
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        # write to a temporary file first so readers never see half an entry
+        temporary = f"{filename}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as f:
+            payload = serialize_program(program)
+            f.write(CACHE_MAGIC + digest + hashlib.sha256(payload).digest() + payload)
+        os.replace(temporary, filename)
+    except OSError:
+        # caching is an optimization, a read-only directory is not an error
+        pass
+
+
+def load_program(path, cache=True):
+    """
+    Parse and compile the recipe at path, going through the compile cache
+    unless cache is False. Stale or corrupt cache entries are rebuilt. The
+    recipe is analyzed first (see Chef.analyze), a recipe with errors raises
+    RecipeError listing all of them.
+    """
+    with open(path, "r") as f:
+        source = f.read()
+    return compile_recipe(source, path, cache)
+
+
+# load_program for a recipe read from path (or from a part of it)
+def compile_recipe(source, path, cache=True):
+    if cache:
+        digest = source_digest(source)
+        program = read_cache(path, digest)
+        if program is not None:
+            return program
+
+    chef = Chef(source)
+    diagnostics = chef.analyze()
+    if diagnostics:
+        raise RecipeError(diagnostics)
+
+    if cache:
+        write_cache(path, digest, chef.program)
+    return chef.program
+
+
+################################################################################
+# Cookbooks: files of many independent recipes, indexed in one pass and
+# compiled one recipe at a time, when a recipe is first asked for
+################################################################################
+class Cookbook:
+    """
+    A file of recipes, every recipe followed by its auxiliary recipes. Opening
+    a cookbook scans the file once, without loading it, to find where every
+    recipe starts and ends (see scan_cookbook). A recipe is read, compiled
+    (through the compile cache unless cache is False) and cooked only when
+    it is asked for by name. If several recipes have the same name the first
+    one is used.
+    """
+
+    def __init__(
+        self, path, compact=False, cache=True, backend="interpreter", seed=None
+    ):
+        self.path = path
+        self.compact = compact  # see Execution
+        self.backend = backend  # see BACKENDS
+        self.seed = seed  # see Execution
+        self.cache = cache
+        self.recipes = {}  # recipe name -> (title, start, end) in the file
+        self.programs = {}  # recipe name -> compiled Program
+        with open(path, "rb") as f:
+            for title, start, end in scan_cookbook(f):
+                self.recipes.setdefault(recipe_key(title), (title, start, end))
+
+    def __len__(self):
+        return len(self.recipes)
+
+    # Titles of the recipes, in the order of the file
+    def __iter__(self):
+        return (title for title, start, end in self.recipes.values())
+
+    def __contains__(self, name):
+        return recipe_key(name) in self.recipes
+
+    def source(self, name):
+        key = recipe_key(name)
+        if key not in self.recipes:
+            raise ValueError(f"Recipe {name} not found in the cookbook")
+        title, start, end = self.recipes[key]
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            return f.read(end - start).decode("utf-8")
+
+    def program(self, name):
+        key = recipe_key(name)
+        if key not in self.programs:
+            self.programs[key] = compile_recipe(
+                self.source(name), self.path, self.cache
+            )
+        return self.programs[key]
+
+    def cook(self, name, sink=None, source=None):
+        """
+        Cook a recipe and serve it to the sink (stdout by default), returns
+        the Execution. See Execution.run for the source.
+        """
+        sink = sink if sink is not None else sys.stdout
+        execution = BACKENDS[self.backend](
+            self.program(name), compact=self.compact, seed=self.seed
+        )
+        execution.run(sink, source=source)
+        if not execution.refrigerated:
+            execution.serve(sink)
+        return execution
+
+
+################################################################################
+# Batch mode: many recipes are compiled in this process (through the compile
+# cache) and their compiled programs are executed by a pool of processes
+################################################################################
+RECIPE_EXTENSIONS = (".chef", ".txt")
+
+
+def recipe_paths(paths, manifest=None):
+    """
+    Expand the recipe paths: directories are replaced by the recipes they
+    contain (sorted by name), and the manifest, if any, lists one recipe path
+    per line (relative to the manifest, blank lines and # comments ignored).
+    """
+    paths = list(paths)
+    if manifest is not None:
+        directory = os.path.dirname(os.path.abspath(manifest))
+        with open(manifest, "r") as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    paths.append(os.path.join(directory, line))
+
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith(RECIPE_EXTENSIONS):
+                    yield os.path.join(path, name)
+        else:
+            yield path
+
+
+def raise_timeout(signum, frame):
+    raise TimeoutError("Recipe took too long to cook")
+
+
+# Executed by the batch workers, returns the output of the recipe and an error message
+def run_compiled_program(
+    data, compact=False, timeout=None, backend="interpreter", seed=None
+):
+    alarm = timeout is not None and hasattr(signal, "setitimer")
+    if alarm:
+        signal.signal(signal.SIGALRM, raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+
+    output = io.StringIO()
+    try:
+        execution = BACKENDS[backend](
+            deserialize_program(data), compact=compact, seed=seed
+        )
+        execution.run(output)
+        if not execution.refrigerated:
+            execution.serve(output)
+        return output.getvalue(), None
+    except Exception as e:
+        return output.getvalue(), f"{type(e).__name__}: {e}"
+    finally:
+        if alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def run_batch(
+    paths,
+    sink,
+    workers=None,
+    timeout=None,
+    compact=False,
+    cache=True,
+    backend="interpreter",
+    seed=None,
+):
+    """
+    Cook every recipe in paths on a pool of `workers` processes and write their
+    outputs to the sink in the order of paths, each followed by a newline.
+    A recipe taking more than `timeout` seconds is stopped. Errors are
+    reported on stderr. Returns the number of recipes that failed. With a
+    seed, every recipe mixes the same way whichever worker cooks it.
+    """
+    workers = workers or os.cpu_count() or 1
+    failures = 0
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+
+        def submit(path):
+            try:
+                data = serialize_program(load_program(path, cache=cache))
+            except (OSError, ValueError) as e:
+                return path, None, f"{type(e).__name__}: {e}"
+            future = pool.submit(
+                run_compiled_program, data, compact, timeout, backend, seed
+            )
+            return path, future, None
+
+        # keep a bounded number of recipes in flight, so the outputs of a huge
+        # batch do not pile up in memory while waiting for a slow recipe
+        paths = iter(paths)
+        pending = collections.deque(
+            submit(path) for path in itertools.islice(paths, workers * 4)
+        )
+        while pending:
+            path, future, error = pending.popleft()
+            next_path = next(paths, None)
+            if next_path is not None:
+                pending.append(submit(next_path))
+
+            output = ""
+            if future is not None:
+                try:
+                    output, error = future.result(
+                        timeout=None if timeout is None else timeout + 1
+                    )
+                except concurrent.futures.TimeoutError:
+                    error = "TimeoutError: Recipe took too long to cook"
+
+            sink.write(output + "\n")
+            if error is not None:
+                failures += 1
+                print(f"{path}: {error}", file=sys.stderr)
+
+    return failures
 
 
 def main():
-    script = sys.argv[1]
-    with open(script, "r") as f:
-        script = f.read()
-
-    chef = Chef(script)
-    chef.parse_script()
-    chef.execute_script()
-    result = chef.serve()
-    print(result)
+    parser = argparse.ArgumentParser(description="Chef interpreter")
+    parser.add_argument(
+        "recipes",
+        nargs="*",
+        help="recipes to cook, several recipes or a directory run in batch mode",
+    )
+    parser.add_argument(
+        "--manifest", help="file listing the recipes to cook in batch mode"
+    )
+    parser.add_argument(
+        "--workers", type=int, help="number of worker processes in batch mode"
+    )
+    parser.add_argument(
+        "--timeout", type=float, help="seconds each recipe may run in batch mode"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help=f"do not read or write compiled recipes in {CACHE_DIRECTORY}",
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="use array backed mixing bowls and baking dishes",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=sorted(BACKENDS),
+        default="interpreter",
+        help="how the recipes are executed (vm: compiled to bytecode, python: "
+        "transpiled to Python)",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        help="seed of the random order of Mix, the same seed mixes the same way",
+    )
+    parser.add_argument(
+        "--input",
+        help="file to take the numbers from, instead of the standard input",
+    )
+    parser.add_argument(
+        "--recipe",
+        help="cook the recipe of this name from a cookbook of many recipes",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="report the errors of the recipes without cooking them",
+    )
+    parser.add_argument(
+        "--emit-python",
+        action="store_true",
+        help="print the recipe transpiled to Python by --backend python",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="print where the recipe spends its time on the standard error",
+    )
+    parser.add_argument(
+        "--profile-json", help="write the profile of the recipe to a JSON file"
+    )
+    args = parser.parse_args()
+
+    if not args.recipes and args.manifest is None:
+        parser.error("no recipe given")
+
+    batch = (
+        args.manifest is not None
+        or len(args.recipes) > 1
+        or os.path.isdir(args.recipes[0])
+    )
+    if batch and args.recipe is not None:
+        parser.error("--recipe needs a single cookbook")
+    if batch and args.emit_python:
+        parser.error("--emit-python needs a single recipe")
+
+    if args.check:
+        failures = 0
+        for path in recipe_paths(args.recipes, args.manifest):
+            with open(path, "r") as f:
+                diagnostics = Chef(f.read()).analyze()
+            for diagnostic in diagnostics:
+                print(f"{path}:{diagnostic}", file=sys.stderr)
+            failures += bool(diagnostics)
+        sys.exit(1 if failures else 0)
+
+    if batch:
+        failures = run_batch(
+            recipe_paths(args.recipes, args.manifest),
+            sys.stdout,
+            workers=args.workers,
+            timeout=args.timeout,
+            compact=args.compact,
+            cache=not args.no_cache,
+            backend=args.backend,
+            seed=args.seed,
+        )
+        sys.exit(1 if failures else 0)
+
+    profiler = None
+    if args.profile or args.profile_json:
+        profiler = Profiler()
+
+    if args.recipe is None:
+        program = load_program(args.recipes[0], cache=not args.no_cache)
+    else:
+        cookbook = Cookbook(args.recipes[0], cache=not args.no_cache)
+        program = cookbook.program(args.recipe)
+    if args.emit_python:
+        print(transpile(program))
+        for recipe in program.auxiliary_recipes:
+            print(transpile(program.auxiliary_program(recipe.name)))
+        return
+    execution = BACKENDS[args.backend](program, compact=args.compact, seed=args.seed)
+    if args.input is None:
+        execution.run(sys.stdout, profiler)
+    else:
+        with open(args.input, "rb") as f:
+            execution.run(sys.stdout, profiler, InputSource(f))
+    if not execution.refrigerated:
+        execution.serve(sys.stdout)
+    print()
+
+    if args.profile:
+        profiler.report(sys.stderr)
+    if args.profile_json:
+        with open(args.profile_json, "w") as f:
+            json.dump(profiler.to_json(), f, indent=2)
 
 
 if __name__ == "__main__":
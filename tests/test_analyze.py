@@ -0,0 +1,219 @@
+import pytest
+
+from chef import Chef, Diagnostic, RecipeError, compile_recipe
+from corpus import recipe
+
+SAUCE = (
+    "Caramel Sauce.\n\n"
+    "Ingredients.\n2 g sugar\n\n"
+    "Method.\nFold sugar into the mixing bowl.\nPut sugar into the mixing bowl.\n\n"
+)
+
+
+def line_of(source, text):
+    return source.split("\n").index(text) + 1
+
+
+def analyze(source):
+    return Chef(source).analyze()
+
+
+def test_clean_recipe():
+    source = recipe(
+        "Clean",
+        ["72 ml letter", "1 g counter"],
+        [
+            "Put letter into the mixing bowl.",
+            "Heat the counter.",
+            "Stir the mixing bowl for 1 minute.",
+            "Heat the counter until heated.",
+            "Serve with caramel sauce.",
+            "Pour contents of the mixing bowl into the baking dish.",
+        ],
+        auxiliary=SAUCE,
+    )
+    chef = Chef(source)
+    assert chef.analyze() == []
+    assert chef.program is not None
+    assert chef.program.name == "Clean."
+
+
+def test_auxiliary_recipe_never_served():
+    source = recipe(
+        "Unused Sauce",
+        ["72 ml letter"],
+        [
+            "Put letter into the mixing bowl.",
+            "Pour contents of the mixing bowl into the baking dish.",
+        ],
+        auxiliary=SAUCE,
+    )
+    assert analyze(source) == []
+
+
+def test_not_a_recipe():
+    assert analyze("nothing") == [
+        Diagnostic(None, None, "Invalid script format, please provide a valid recipe")
+    ]
+
+
+def test_invalid_ingredient():
+    source = recipe("Bad", ["1 g a", "12 ml"], ["Put a into the mixing bowl."])
+    assert analyze(source) == [
+        Diagnostic(
+            "Bad.",
+            line_of(source, "12 ml"),
+            "Invalid ingredient format, ingredient name must be provided",
+        )
+    ]
+
+
+def test_invalid_instruction():
+    source = recipe("Bad", ["1 g a"], ["Blah a into.", "Put a into the mixing bowl."])
+    assert analyze(source) == [
+        Diagnostic(
+            "Bad.",
+            line_of(source, "Blah a into."),
+            "Invalid instruction format, instruction must be a valid instruction",
+        )
+    ]
+
+
+def test_loops():
+    method = [
+        "Put a into the mixing bowl.",
+        "Set aside.",
+        "Heat the a until heated.",
+        "Stir the a.",
+    ]
+    source = recipe("Loops", ["1 g a"], method)
+    assert analyze(source) == [
+        Diagnostic(
+            "Loops.",
+            line_of(source, "Set aside."),
+            "Set aside can only be used inside a loop",
+        ),
+        Diagnostic(
+            "Loops.",
+            line_of(source, "Heat the a until heated."),
+            "Loop end without a matching loop start",
+        ),
+        Diagnostic(
+            "Loops.",
+            line_of(source, "Stir the a."),
+            "Loop start without a matching loop end",
+        ),
+    ]
+
+
+def test_missing_auxiliary_recipe():
+    source = recipe(
+        "Missing", ["1 g a"], ["Put a into the mixing bowl.", "Serve with sauce."]
+    )
+    assert analyze(source) == [
+        Diagnostic(
+            "Missing.",
+            line_of(source, "Serve with sauce."),
+            "Auxiliary recipe sauce not found",
+        )
+    ]
+
+
+def test_unnumbered_mixing_bowl_after_numbered():
+    method = ["Put a into the 2nd mixing bowl.", "Put a into the mixing bowl."]
+    source = recipe("Bowls", ["1 g a"], method)
+    assert analyze(source) == [
+        Diagnostic(
+            "Bowls.",
+            line_of(source, "Put a into the mixing bowl."),
+            "A mixing bowl may not be used without a number if other mixing "
+            "bowls have been used with a number.",
+        )
+    ]
+
+
+def test_unnumbered_baking_dish_after_numbered():
+    pour = "Pour contents of the 1st mixing bowl into the baking dish."
+    method = [
+        "Put a into the 1st mixing bowl.",
+        "Pour contents of the 1st mixing bowl into the 2nd baking dish.",
+        pour,
+    ]
+    source = recipe("Dishes", ["1 g a"], method)
+    assert analyze(source) == [
+        Diagnostic(
+            "Dishes.",
+            line_of(source, pour),
+            "A baking dish may not be used without a number if other baking "
+            "dishes have been used with a number.",
+        )
+    ]
+
+
+def test_certainly_empty_mixing_bowl():
+    method = [
+        "Put a into the mixing bowl.",
+        "Clean the mixing bowl.",
+        "Fold a into the mixing bowl.",
+        "Fold a into the mixing bowl.",
+    ]
+    source = recipe("Empty", ["1 g a"], method)
+    # only the first one, cooking stops there
+    assert analyze(source) == [
+        Diagnostic("Empty.", line_of(source, method[2]), "Mixing bowl 1 is empty")
+    ]
+
+
+def test_auxiliary_mixing_bowls_come_from_the_caller():
+    source = recipe(
+        "Caller",
+        ["1 g a"],
+        ["Put a into the mixing bowl.", "Serve with caramel sauce."],
+        auxiliary=SAUCE,
+    )
+    # the sauce folds from a mixing bowl it did not fill
+    assert analyze(source) == []
+
+
+def test_errors_of_auxiliary_recipes_are_reported():
+    sauce = SAUCE.replace("Put sugar", "Mash the sugar.\nPut sugar")
+    source = recipe(
+        "Caller",
+        ["1 g a"],
+        ["Put a into the mixing bowl.", "Serve with caramel sauce."],
+        auxiliary=sauce,
+    )
+    assert analyze(source) == [
+        Diagnostic(
+            "Caramel Sauce.",
+            line_of(source, "Mash the sugar."),
+            "Loop start without a matching loop end",
+        )
+    ]
+
+
+def test_every_error_is_reported_in_order():
+    source = recipe(
+        "Many",
+        ["1 g a", "12 ml"],
+        ["Fold a into the mixing bowl.", "Serve with sauce.", "Blah."],
+    )
+    diagnostics = analyze(source)
+    assert [diagnostic.line for diagnostic in diagnostics] == [
+        line_of(source, "12 ml"),
+        line_of(source, "Fold a into the mixing bowl."),
+        line_of(source, "Serve with sauce."),
+        line_of(source, "Blah."),
+    ]
+
+
+def test_recipe_error(tmp_path):
+    source = recipe("Bad", ["1 g a"], ["Fold a into the mixing bowl.", "Blah."])
+    with pytest.raises(RecipeError) as raised:
+        compile_recipe(source, str(tmp_path / "bad.chef"), cache=False)
+    assert len(raised.value.diagnostics) == 2
+    assert str(raised.value) == "\n".join(map(str, raised.value.diagnostics))
+    assert str(raised.value.diagnostics[0]) == (
+        f"line {line_of(source, 'Fold a into the mixing bowl.')}: "
+        "Mixing bowl 1 is empty (Bad.)"
+    )
@@ -0,0 +1,141 @@
+import asyncio
+import io
+
+import pytest
+
+from chef import BACKENDS, AsyncInputSource, Chef, Quota
+from corpus import recipe
+
+SAUCE = (
+    "Sauce.\n\n"
+    "Ingredients.\n2 g y\n\n"
+    "Method.\n" + "Put y into the mixing bowl.\n" * 5
+)
+# 4 instructions, and 5 more for the sous-chef
+TAKE = recipe(
+    "Async",
+    ["0 g x"],
+    [
+        "Take x from refrigerator.",
+        "Put x into the mixing bowl.",
+        "Serve with sauce.",
+        "Pour contents of the mixing bowl into the baking dish.",
+    ],
+    auxiliary=SAUCE,
+)
+FOREVER = recipe(
+    "Forever",
+    ["1 g counter"],
+    [
+        "Heat the counter.",
+        "Put counter into the mixing bowl.",
+        "Fold counter into the mixing bowl.",
+        "Heat until heated.",
+    ],
+)
+
+
+@pytest.fixture(params=sorted(BACKENDS))
+def backend(request):
+    return request.param
+
+
+def program(script):
+    chef = Chef(script)
+    chef.parse_script()
+    return chef.program
+
+
+def reader(data):
+    stream = asyncio.StreamReader()
+    stream.feed_data(data)
+    stream.feed_eof()
+    return stream
+
+
+def cook(backend, script, data=b"", **limits):
+    async def run():
+        execution = BACKENDS[backend](program(script))
+        await execution.run_async(
+            io.StringIO(), AsyncInputSource(reader(data)), **limits
+        )
+        return execution.serve()
+
+    return asyncio.run(run())
+
+
+def test_run_async(backend):
+    assert cook(backend, TAKE, b"7\n") == "2222277"
+
+
+@pytest.mark.parametrize("slice_size", [1, 3, 1000])
+def test_budget_covers_the_sous_chefs(backend, slice_size):
+    assert cook(backend, TAKE, b"7", budget=9, slice_size=slice_size) == "2222277"
+    with pytest.raises(RuntimeError, match="ran out of its instruction budget"):
+        cook(backend, TAKE, b"7", budget=8, slice_size=slice_size)
+
+
+def test_budget_stops_an_endless_recipe(backend):
+    with pytest.raises(RuntimeError, match="ran out of its instruction budget"):
+        cook(backend, FOREVER, budget=10_000)
+
+
+def test_timeout(backend):
+    with pytest.raises(TimeoutError, match="Execution timed out"):
+        cook(backend, FOREVER, timeout=0.05)
+
+
+def test_take_needs_a_source(backend):
+    async def run():
+        await BACKENDS[backend](program(TAKE)).run_async(io.StringIO())
+
+    with pytest.raises(ValueError, match="Take needs an input source"):
+        asyncio.run(run())
+
+
+def test_take_at_the_end_of_the_input(backend):
+    with pytest.raises(ValueError, match="No more input to take x"):
+        cook(backend, TAKE, b"  \n")
+
+
+def test_executions_share_the_event_loop(backend):
+    order = []
+
+    class Source:
+        def __init__(self, name):
+            self.name = name
+
+        async def read_number(self):
+            order.append(self.name)
+            return 7
+
+    async def run(name):
+        execution = BACKENDS[backend](program(TAKE))
+        # the endless recipes only end with their budget
+        forever = BACKENDS[backend](program(FOREVER))
+        with pytest.raises(RuntimeError):
+            await forever.run_async(io.StringIO(), budget=1000, slice_size=10)
+        order.append(name)
+        await execution.run_async(io.StringIO(), Source(name), slice_size=1)
+        return execution.serve()
+
+    async def main():
+        return await asyncio.gather(run("a"), run("b"))
+
+    assert asyncio.run(main()) == ["2222277", "2222277"]
+    # both endless recipes ran side by side before either one took its input
+    assert order[:2] == ["a", "b"]
+
+
+def test_quota():
+    quota = Quota()
+    assert quota.allowance(100) == 100
+    quota = Quota(budget=150)
+    assert quota.allowance(100) == 100
+    quota.spend(100)
+    assert quota.allowance(100) == 50
+    quota.spend(50)
+    with pytest.raises(RuntimeError):
+        quota.allowance(100)
+    with pytest.raises(TimeoutError):
+        Quota(timeout=-1).allowance(100)
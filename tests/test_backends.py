@@ -0,0 +1,87 @@
+import io
+import os
+import random
+
+import pytest
+
+from chef import BACKENDS, Chef, Execution, Profiler, PythonExecution
+from corpus import CORPUS, recipe
+from differential import cook, random_recipe
+
+EXAMPLES = os.path.join(os.path.dirname(__file__), "..", "examples")
+
+SOURCES = {
+    name: os.path.join(EXAMPLES, name)
+    for name in sorted(os.listdir(EXAMPLES))
+    if name.endswith((".chef", ".txt"))
+}
+
+
+def example(name):
+    with open(SOURCES[name]) as f:
+        return f.read()
+
+
+def compare(backend, compact, source, numbers=""):
+    # the reference is profiled, so it executes every instruction
+    chef = Chef(source)
+    chef.parse_script()
+    expected = cook(Execution, chef.program, compact, numbers, Profiler())
+    chef = Chef(source)
+    chef.parse_script()
+    assert cook(BACKENDS[backend], chef.program, compact, numbers) == expected
+
+
+@pytest.fixture(params=sorted(BACKENDS))
+def backend(request):
+    return request.param
+
+
+@pytest.fixture(params=[False, True], ids=["list", "compact"])
+def compact(request):
+    return request.param
+
+
+@pytest.mark.parametrize("name", sorted(SOURCES))
+def test_examples(backend, compact, name):
+    compare(backend, compact, example(name))
+
+
+@pytest.mark.parametrize("name", sorted(CORPUS))
+def test_corpus(backend, compact, name):
+    compare(backend, compact, CORPUS[name](1))
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_random_recipes(backend, compact, seed):
+    compare(backend, compact, *random_recipe(random.Random(seed)))
+
+
+def test_hello_world(backend):
+    chef = Chef(example("hello_world.txt"), backend=backend)
+    chef.parse_script()
+    for _ in range(2):
+        chef.execute_script(io.StringIO())
+        assert chef.serve() == "Hello world!"
+
+
+def test_factorial(backend):
+    chef = Chef(example("factorial.txt"), backend=backend)
+    chef.parse_script()
+    chef.execute_script(io.StringIO())
+    assert chef.serve() == "3628800"
+
+
+def test_too_deeply_nested_for_python_warns():
+    depth = 25
+    method = [f"Heat the oven {i}." for i in range(depth)]
+    method.append("Put letter into the mixing bowl.")
+    method += [f"Heat the oven {i} until heated." for i in reversed(range(depth))]
+    method.append("Pour contents of the mixing bowl into the baking dish.")
+    ingredients = [f"1 g oven {i}" for i in range(depth)] + ["72 ml letter"]
+    chef = Chef(recipe("Deep", ingredients, method))
+    chef.parse_script()
+    execution = PythonExecution(chef.program)
+    with pytest.warns(RuntimeWarning, match="virtual machine"):
+        execution.run(io.StringIO())
+    assert execution.serve() == "H"
@@ -0,0 +1,83 @@
+import io
+import os
+import shutil
+
+import pytest
+
+from chef import (
+    Chef,
+    recipe_paths,
+    run_batch,
+    run_compiled_program,
+    serialize_program,
+)
+from corpus import recipe
+
+EXAMPLES = os.path.join(os.path.dirname(__file__), "..", "examples")
+
+FOREVER = recipe(
+    "Forever",
+    ["1 g counter"],
+    [
+        "Heat the counter.",
+        "Put counter into the mixing bowl.",
+        "Fold counter into the mixing bowl.",
+        "Heat until heated.",
+    ],
+)
+
+
+@pytest.fixture
+def batch(tmp_path):
+    shutil.copy(os.path.join(EXAMPLES, "hello_world.txt"), tmp_path / "a.txt")
+    (tmp_path / "b.chef").write_text(FOREVER)
+    (tmp_path / "c.txt").write_text("Not a recipe")
+    shutil.copy(os.path.join(EXAMPLES, "factorial.txt"), tmp_path / "d.txt")
+    (tmp_path / "notes.md").write_text("not cooked")
+    return tmp_path
+
+
+def test_recipe_paths(batch):
+    manifest = batch / "manifest"
+    manifest.write_text("# the examples\nd.txt\n\n  a.txt  \n")
+    paths = list(recipe_paths([str(batch)], str(manifest)))
+    names = [os.path.relpath(path, batch) for path in paths]
+    # the recipes of the manifest come after the others
+    assert names == ["a.txt", "b.chef", "c.txt", "d.txt", "d.txt", "a.txt"]
+
+
+def test_run_batch(batch, capsys):
+    sink = io.StringIO()
+    paths = recipe_paths([str(batch)])
+    failures = run_batch(paths, sink, workers=2, timeout=0.5, cache=False)
+    assert failures == 2
+    # the outputs are in the order of the paths, failed recipes included
+    assert sink.getvalue() == "Hello world!\n\n\n3628800\n"
+    errors = capsys.readouterr().err.splitlines()
+    assert errors[0].endswith("b.chef: TimeoutError: Recipe took too long to cook")
+    assert errors[1].startswith(f"{batch / 'c.txt'}: RecipeError:")
+
+
+def test_run_batch_missing_recipe(tmp_path, capsys):
+    sink = io.StringIO()
+    assert run_batch([str(tmp_path / "missing.txt")], sink, workers=1) == 1
+    assert sink.getvalue() == "\n"
+    assert "FileNotFoundError" in capsys.readouterr().err
+
+
+def program_data(script):
+    chef = Chef(script)
+    chef.parse_script()
+    return serialize_program(chef.program)
+
+
+def test_run_compiled_program_timeout():
+    output, error = run_compiled_program(program_data(FOREVER), timeout=0.2)
+    assert (output, error) == ("", "TimeoutError: Recipe took too long to cook")
+
+
+def test_run_compiled_program_error():
+    script = recipe("Empty", ["1 g x"], ["Fold x into the mixing bowl."])
+    output, error = run_compiled_program(program_data(script))
+    assert output == ""
+    assert error == "ValueError: Mixing bowl 1 is empty"
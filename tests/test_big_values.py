@@ -0,0 +1,62 @@
+import io
+
+import pytest
+
+from chef import BACKENDS, Chef
+from corpus import recipe
+
+BIG = 10**30
+POUR = "Pour contents of the mixing bowl into the baking dish."
+
+
+@pytest.fixture(params=sorted(BACKENDS))
+def backend(request):
+    return request.param
+
+
+@pytest.fixture(params=[False, True], ids=["list", "compact"])
+def compact(request):
+    return request.param
+
+
+def cook(ingredients, method, backend, compact):
+    chef = Chef(recipe("Big", ingredients, method), compact=compact, backend=backend)
+    chef.parse_script()
+    chef.execute_script(io.StringIO())
+    return chef.serve()
+
+
+def test_values_grow_past_64_bits(backend, compact):
+    method = ["Put x into the mixing bowl."]
+    method += ["Combine x into the mixing bowl."] * 3
+    method += ["Add one to the mixing bowl.", POUR]
+    assert cook(["65536 g x", "1 g one"], method, backend, compact) == str(2**64 + 1)
+
+
+def test_big_ingredients(backend, compact):
+    method = [
+        "Put one into the mixing bowl.",
+        "Put big into the mixing bowl.",
+        "Remove big from the mixing bowl.",
+        "Remove big from the mixing bowl.",
+        "Put big into the mixing bowl.",
+        "Divide one into the mixing bowl.",
+        POUR,
+    ]
+    assert cook([f"{BIG} g big", "1 g one"], method, backend, compact) == (
+        f"{BIG}{-BIG}1"
+    )
+
+
+def test_division_rounds_down(backend, compact):
+    method = [
+        "Put big into the mixing bowl.",
+        "Divide three into the mixing bowl.",
+        "Put seven into the mixing bowl.",
+        "Remove seven from the mixing bowl.",
+        "Remove seven from the mixing bowl.",
+        "Divide three into the mixing bowl.",
+        POUR,
+    ]
+    served = cook([f"{BIG} g big", "3 g three", "7 g seven"], method, backend, compact)
+    assert served == f"-3{BIG // 3}"
@@ -0,0 +1,69 @@
+import io
+
+import pytest
+
+from chef import BACKENDS, Chef, InputSource
+from corpus import recipe
+
+INGREDIENTS = ["65 g a", "66 g b", "10 ml c", "0 g d"]
+
+
+@pytest.fixture(params=sorted(BACKENDS))
+def backend(request):
+    return request.param
+
+
+@pytest.fixture(params=[False, True], ids=["list", "compact"])
+def compact(request):
+    return request.param
+
+
+def cook(method, backend, compact, source=None):
+    chef = Chef(recipe("Bulk", INGREDIENTS, method), compact=compact, backend=backend)
+    chef.parse_script()
+    chef.execute_script(io.StringIO(), source)
+    return chef.serve()
+
+
+POUR = "Pour contents of the mixing bowl into the baking dish."
+
+
+def test_add_dry_ingredients(backend, compact):
+    # c is liquid, d is 0
+    method = ["Add dry ingredients to the mixing bowl.", POUR]
+    assert cook(method, backend, compact) == "131"
+
+
+def test_add_dry_follows_the_ingredients(backend, compact):
+    method = [
+        "Put a into the mixing bowl.",
+        "Fold d into the mixing bowl.",  # d = 65
+        "Liquefy b.",  # b is not dry anymore
+        "Take a from refrigerator.",  # a = 7
+        "Add dry ingredients.",
+        POUR,
+    ]
+    assert cook(method, backend, compact, InputSource(io.StringIO("7"))) == "72"
+
+
+def test_liquefy_contents(backend, compact):
+    method = [
+        "Put a into the mixing bowl.",
+        "Put b into the mixing bowl.",
+        "Liquefy contents of the mixing bowl.",
+        "Put a into the mixing bowl.",
+        POUR,
+    ]
+    assert cook(method, backend, compact) == "65BA"
+
+
+def test_pour_copies_the_bowl(backend, compact):
+    method = [
+        "Put a into the mixing bowl.",
+        "Put c into the mixing bowl.",
+        POUR,
+        "Put b into the mixing bowl.",
+        POUR,
+    ]
+    # the bowl is not emptied by pouring, the dish gets it twice
+    assert cook(method, backend, compact) == "66\n65\n65"
@@ -0,0 +1,129 @@
+import io
+
+import pytest
+
+from chef import BACKENDS, Bytecode, Chef, compile_bytecode
+from corpus import recipe
+
+INGREDIENTS = ["1 g a", "2 g b", "3 g c", "0 g zero", "2 g counter"]
+A, B, C, ZERO, COUNTER = range(5)
+
+
+def instructions(method):
+    chef = Chef(recipe("Bytecode", INGREDIENTS, method))
+    chef.parse_script()
+    return chef.instructions
+
+
+def compile_method(method):
+    return compile_bytecode(instructions(method), check_bowls=False, check_dishes=False)
+
+
+def test_put_run():
+    assert compile_method(
+        [
+            "Put a into the mixing bowl.",
+            "Put b into the mixing bowl.",
+            "Put c into the mixing bowl.",
+            "Put a into the 2nd mixing bowl.",
+        ]
+    ) == [(Bytecode.PUT_RUN, [A, B, C], 0), (Bytecode.PUT, A, 1)]
+
+
+@pytest.mark.parametrize(
+    "verb, fused", [("Add", Bytecode.PUT_ADD), ("Combine", Bytecode.PUT_COMBINE)]
+)
+def test_put_then_operate(verb, fused):
+    preposition = "to" if verb == "Add" else "into"
+    assert compile_method(
+        [
+            "Put a into the mixing bowl.",
+            "Put b into the mixing bowl.",
+            f"{verb} c {preposition} the mixing bowl.",
+        ]
+    ) == [(Bytecode.PUT, A, 0), (fused, B, C, 0)]
+
+
+def test_liquefy_pour():
+    assert compile_method(
+        [
+            "Put a into the 2nd mixing bowl.",
+            "Liquefy contents of the 2nd mixing bowl.",
+            "Pour contents of the 2nd mixing bowl into the 3rd baking dish.",
+        ]
+    ) == [(Bytecode.PUT, A, 1), (Bytecode.LIQUEFY_POUR, 2, 1)]
+
+
+def test_no_fusion_into_a_loop():
+    code = compile_method(
+        [
+            "Put a into the mixing bowl.",
+            "Heat the counter.",
+            "Put b into the mixing bowl.",
+            "Put c into the mixing bowl.",
+            "Heat the counter until heated.",
+            "Put a into the mixing bowl.",
+        ]
+    )
+    assert code == [
+        (Bytecode.PUT, A, 0),
+        (Bytecode.LOOP_START, COUNTER, 4),
+        (Bytecode.PUT_RUN, [B, C], 0),
+        (Bytecode.LOOP_END, COUNTER, 1),
+        (Bytecode.PUT, A, 0),
+    ]
+
+
+def test_dead_stores():
+    assert compile_method(
+        [
+            "Put a into the mixing bowl.",
+            "Liquefy a.",
+            "Put b into the 2nd mixing bowl.",
+            "Clean the mixing bowl.",
+        ]
+    ) == [(Bytecode.LIQUEFY, A), (Bytecode.PUT, B, 1), (Bytecode.CLEAN, None, 0)]
+
+
+def test_bowl_checks():
+    code = compile_bytecode(
+        instructions(
+            [
+                "Put a into the 2nd mixing bowl.",
+                "Put b into the 2nd mixing bowl.",
+                "Put c into the mixing bowl.",
+            ]
+        )
+    )
+    assert code == [
+        (Bytecode.SELECT_BOWL, 2),
+        (Bytecode.PUT_RUN, [A, B], 1),
+        (Bytecode.CHECK_BOWL,),
+        (Bytecode.PUT, C, 0),
+    ]
+
+
+# The virtual machine and the transpiled code fail like the interpreter
+@pytest.mark.parametrize(
+    "method",
+    [
+        ["Fold a into the mixing bowl."],
+        ["Put a into the mixing bowl.", "Divide zero into the mixing bowl."],
+        ["Put a into the 2nd mixing bowl.", "Put b into the mixing bowl."],
+        [
+            "Put a into the mixing bowl.",
+            "Pour contents of the mixing bowl into the 2nd baking dish.",
+            "Pour contents of the mixing bowl into the baking dish.",
+        ],
+        ["Stir the 3rd mixing bowl for 2 minutes."],
+    ],
+)
+def test_errors(method):
+    messages = set()
+    for backend in BACKENDS:
+        chef = Chef(recipe("Bytecode", INGREDIENTS, method), backend=backend)
+        chef.parse_script()
+        with pytest.raises(ValueError) as error:
+            chef.execute_script(io.StringIO())
+        messages.add(str(error.value))
+    assert len(messages) == 1
@@ -0,0 +1,108 @@
+import hashlib
+import marshal
+import os
+import shutil
+
+import pytest
+
+from chef import (
+    CACHE_DIRECTORY,
+    CACHE_MAGIC,
+    Execution,
+    RecipeError,
+    cache_path,
+    deserialize_program,
+    load_program,
+    serialize_program,
+    source_digest,
+)
+
+EXAMPLES = os.path.join(os.path.dirname(__file__), "..", "examples")
+
+
+@pytest.fixture
+def hello_world(tmp_path):
+    path = tmp_path / "hello_world.txt"
+    shutil.copy(os.path.join(EXAMPLES, "hello_world.txt"), path)
+    return str(path)
+
+
+def cook(program):
+    execution = Execution(program)
+    execution.run()
+    return execution.serve()
+
+
+def entry(path):
+    with open(path) as f:
+        return cache_path(path, source_digest(f.read()))
+
+
+def test_cached_program_is_reused(hello_world):
+    assert cook(load_program(hello_world)) == "Hello world!"
+    assert os.path.exists(entry(hello_world))
+    assert cook(load_program(hello_world)) == "Hello world!"
+
+
+def test_corrupt_payload_is_rebuilt(hello_world):
+    program = load_program(hello_world)
+    with open(entry(hello_world), "rb") as f:
+        data = bytearray(f.read())
+    # a byte of the payload, not of the header
+    data[data.rindex(b"Hello") + 1] ^= 0x02
+    with open(entry(hello_world), "wb") as f:
+        f.write(data)
+
+    assert load_program(hello_world) == program
+    with open(entry(hello_world), "rb") as f:
+        assert f.read() != bytes(data)
+
+
+def test_payload_of_the_wrong_shape_is_rebuilt(hello_world):
+    program = load_program(hello_world)
+    fields = list(marshal.loads(serialize_program(program)))
+    fields[1] = None  # ingredients
+    payload = marshal.dumps(tuple(fields))
+    with open(hello_world) as f:
+        digest = source_digest(f.read())
+    with open(entry(hello_world), "wb") as f:
+        f.write(CACHE_MAGIC + digest + hashlib.sha256(payload).digest() + payload)
+
+    assert cook(load_program(hello_world)) == "Hello world!"
+
+
+def test_round_trip_keeps_the_auxiliary_recipes(tmp_path):
+    path = tmp_path / "factorial.txt"
+    shutil.copy(os.path.join(EXAMPLES, "factorial.txt"), path)
+    program = load_program(str(path), cache=False)
+    copy = deserialize_program(serialize_program(program))
+    assert copy == program
+    assert cook(copy) == "3628800"
+
+
+def test_no_cache(hello_world):
+    assert cook(load_program(hello_world, cache=False)) == "Hello world!"
+    assert not os.path.exists(
+        os.path.join(os.path.dirname(hello_world), CACHE_DIRECTORY)
+    )
+
+
+def test_edited_source_gets_its_own_entry(hello_world):
+    load_program(hello_world)
+    with open(hello_world) as f:
+        source = f.read()
+    with open(hello_world, "w") as f:
+        f.write(source.replace("\n101 eggs\n", "\n97 eggs\n"))
+    assert cook(load_program(hello_world)) == "Hallo world!"
+    assert len(os.listdir(os.path.dirname(entry(hello_world)))) == 2
+
+
+def test_invalid_recipes_are_not_cached(tmp_path):
+    path = tmp_path / "invalid.txt"
+    path.write_text(
+        "Invalid.\n\nIngredients.\n1 g x\n\n"
+        "Method.\nFold y into the mixing bowl.\n\nServes 1.\n"
+    )
+    with pytest.raises(RecipeError):
+        load_program(str(path))
+    assert not os.path.exists(tmp_path / CACHE_DIRECTORY)
@@ -0,0 +1,86 @@
+import io
+import os
+
+import pytest
+
+from chef import Cookbook, scan_cookbook
+from corpus import recipe
+
+EXAMPLES = os.path.join(os.path.dirname(__file__), "..", "examples")
+
+
+def example(name):
+    with open(os.path.join(EXAMPLES, name)) as f:
+        return f.read().rstrip("\n") + "\n\n"
+
+
+ANSWER = recipe(
+    "Answer",
+    ["42 g answer"],
+    [
+        "Put answer into the mixing bowl.",
+        "Pour contents of the mixing bowl into the baking dish.",
+    ],
+)
+# Same name as ANSWER, a comment that could pass for a title
+OTHER_ANSWER = (
+    "answer.\n\nNot the answer.\n\nIngredients.\n1 g x\n\n"
+    "Method.\nPut x into the mixing bowl.\n"
+    "Pour contents of the mixing bowl into the baking dish.\n\nServes 1.\n\n"
+)
+RECIPES = [example("hello_world.txt"), example("factorial.txt"), ANSWER, OTHER_ANSWER]
+COOKBOOK = "".join(RECIPES)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 1 << 20])
+def test_scan_cookbook(chunk_size):
+    data = COOKBOOK.encode("utf-8")
+    found = list(scan_cookbook(io.BytesIO(data), chunk_size))
+    assert [title for title, _, _ in found] == [
+        "Hello World Souffle.",
+        "Factorial Pie.",
+        "Answer.",
+        "answer.",
+    ]
+    # the factorial recipe keeps its auxiliary recipe
+    assert [data[start:end].decode("utf-8") for _, start, end in found] == RECIPES
+
+
+def test_scan_an_empty_cookbook():
+    assert list(scan_cookbook(io.BytesIO(b"\n\n"))) == []
+
+
+@pytest.fixture
+def cookbook(tmp_path):
+    path = tmp_path / "cookbook.txt"
+    path.write_text(COOKBOOK)
+    return Cookbook(str(path), cache=False)
+
+
+def test_titles(cookbook):
+    # the first recipe of a name wins
+    assert len(cookbook) == 3
+    assert list(cookbook) == ["Hello World Souffle.", "Factorial Pie.", "Answer."]
+    assert "hello world souffle." in cookbook
+    assert "Pancakes." not in cookbook
+
+
+def test_cook(cookbook):
+    for name, served in [
+        ("Factorial Pie.", "3628800"),
+        ("ANSWER.", "42"),
+        ("Hello World Souffle.", "Hello world!"),
+    ]:
+        sink = io.StringIO()
+        cookbook.cook(name, sink)
+        assert sink.getvalue() == served
+
+
+def test_programs_are_compiled_once(cookbook):
+    assert cookbook.program("Answer.") is cookbook.program("answer.")
+    assert len(cookbook.programs) == 1
+
+
+def test_missing_recipe(cookbook):
+    with pytest.raises(ValueError, match="Recipe Pancakes. not found in the cookbook"):
+        cookbook.program("Pancakes.")
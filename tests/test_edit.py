@@ -0,0 +1,126 @@
+import io
+
+import pytest
+
+from chef import Chef, Execution
+from corpus import recipe
+
+SAUCE = "Sauce.\n\n" "Ingredients.\n2 g y\n\n" "Method.\nPut y into the mixing bowl.\n"
+SCRIPT = recipe(
+    "Edited",
+    ["72 ml x", "3 g counter"],
+    [
+        "Serve with sauce.",
+        "Put x into the mixing bowl.",
+        "Heat the counter.",
+        "Put counter into the mixing bowl.",
+        "Heat the counter until heated.",
+        "Pour contents of the mixing bowl into the baking dish.",
+    ],
+    auxiliary=SAUCE,
+)
+
+
+@pytest.fixture
+def chef():
+    chef = Chef(SCRIPT)
+    chef.parse_script()
+    return chef
+
+
+def cook(program):
+    execution = Execution(program)
+    execution.run(io.StringIO())
+    return execution.serve()
+
+
+# Apply the edit and check the result is what parsing the edited script from
+# scratch gives
+def edit(chef, old, new):
+    start = chef.script.index(old)
+    program = chef.apply_edit(start, start + len(old), new)
+    fresh = Chef(chef.script)
+    fresh.parse_script()
+    assert chef.script == SCRIPT.replace(old, new, 1)
+    assert program.instructions == fresh.program.instructions
+    assert program.method == fresh.program.method
+    assert program.ingredients == fresh.program.ingredients
+    assert program.ingredient_slots == fresh.program.ingredient_slots
+    assert [s.text for _, s in chef.sections] == [s.text for _, s in fresh.sections]
+    assert [s.offset for _, s in chef.sections] == [s.offset for _, s in fresh.sections]
+    assert [s.line for _, s in chef.sections] == [s.line for _, s in fresh.sections]
+    return cook(program)
+
+
+def test_edit_a_method_line(chef):
+    assert cook(chef.program) == "123H2"
+    assert edit(chef, "Put x into", "Put counter into") == "12332"
+
+
+def test_insert_method_lines(chef):
+    served = edit(
+        chef,
+        "Serve with sauce.\n",
+        "Serve with sauce.\nPut x into the mixing bowl.\nPut x into the mixing bowl.\n",
+    )
+    assert served == "123HHH2"
+
+
+def test_insert_a_loop(chef):
+    served = edit(
+        chef,
+        "Serve with sauce.\n",
+        "Serve with sauce.\nMix the x.\nPut x into the mixing bowl.\n"
+        "Set aside.\nMix until mixed.\n",
+    )
+    assert served == "123HH2"
+
+
+def test_remove_method_lines(chef):
+    served = edit(
+        chef,
+        "Heat the counter.\nPut counter into the mixing bowl.\n"
+        "Heat the counter until heated.\n",
+        "",
+    )
+    assert served == "H2"
+
+
+def test_edit_the_ingredients(chef):
+    assert edit(chef, "72 ml x", "73 ml x") == "123I2"
+
+
+def test_reorder_the_ingredients(chef):
+    # the ingredients move, the method is compiled again
+    assert edit(chef, "72 ml x\n3 g counter", "3 g counter\n72 ml x") == "123H2"
+
+
+def test_edit_the_auxiliary_recipe(chef):
+    cook(chef.program)
+    assert chef.compiled_recipes
+    assert edit(chef, "2 g y", "5 g y") == "123H5"
+
+
+def test_edit_the_title(chef):
+    edit(chef, "Edited.", "Edited again.")
+    assert chef.program.name == "Edited again."
+
+
+def test_blank_lines_between_sections(chef):
+    edit(chef, "\n\nMethod.", "\n\n\n  \n\nMethod.")
+
+
+def test_invalid_edit_leaves_the_chef_as_it_was(chef):
+    program = chef.program
+    start = SCRIPT.index("Put x into")
+    with pytest.raises(ValueError):
+        chef.apply_edit(start, start + 3, "Bake")
+    with pytest.raises(ValueError, match="Invalid edit range"):
+        chef.apply_edit(10, 5, "")
+    assert chef.program is program
+    assert chef.script == SCRIPT
+
+
+def test_edit_needs_a_parsed_script():
+    with pytest.raises(ValueError, match="Only a parsed script"):
+        Chef(SCRIPT).apply_edit(0, 0, "")
@@ -0,0 +1,100 @@
+import io
+
+import pytest
+
+from chef import BACKENDS, Chef, InputSource, Profiler, fold_prefix
+from corpus import recipe
+
+INGREDIENTS = ["1 g a", "2 g b", "3 g c", "2 g counter"]
+POUR = "Pour contents of the mixing bowl into the baking dish."
+
+
+def program(method):
+    chef = Chef(recipe("Folding", INGREDIENTS, method))
+    chef.parse_script()
+    return chef.program
+
+
+@pytest.mark.parametrize(
+    "rest",
+    [
+        ["Take a from refrigerator."],
+        ["Mix the mixing bowl well."],
+        ["Serve with sauce."],
+        ["Refrigerate."],
+        ["Heat the counter.", "Heat until heated."],
+    ],
+)
+def test_prefix_stops_before_instructions_with_effects(rest):
+    method = ["Put a into the mixing bowl.", "Add b to the mixing bowl."]
+    length, execution = fold_prefix(program(method + rest))
+    assert length == 2
+    assert [value for value, _ in execution.mixing_bowls[0].serving_order()] == [3]
+
+
+def test_prefix_stops_before_a_failure():
+    method = [
+        "Put a into the mixing bowl.",
+        "Fold b into the mixing bowl.",
+        "Fold c into the mixing bowl.",
+        POUR,
+    ]
+    length, execution = fold_prefix(program(method))
+    assert length == 2
+    assert execution.values[:2] == [1, 1]
+
+
+def test_nothing_to_fold():
+    assert fold_prefix(program(["Take a from refrigerator."])) == (0, None)
+
+
+def test_prefix_is_folded_once_per_kind_of_stack():
+    folded = program(["Put a into the mixing bowl.", POUR])
+    assert fold_prefix(folded) is fold_prefix(folded)
+    assert fold_prefix(folded, compact=True)[1] is not fold_prefix(folded)[1]
+
+
+# Add, Fold and Pour are folded, then the loop runs
+METHOD = [
+    "Put a into the mixing bowl.",
+    "Add b to the mixing bowl.",
+    "Fold c into the mixing bowl.",
+    "Put c into the mixing bowl.",
+    POUR,
+    "Take counter from refrigerator.",
+    "Heat the counter.",
+    "Put counter into the mixing bowl.",
+    "Heat the counter until heated.",
+    POUR,
+]
+
+
+@pytest.fixture(params=sorted(BACKENDS))
+def backend(request):
+    return request.param
+
+
+@pytest.mark.parametrize("compact", [False, True], ids=["list", "compact"])
+def test_folded_executions_start_after_the_prefix(backend, compact):
+    folded = program(METHOD)
+    for number in ("2", "3"):
+        execution = BACKENDS[backend](folded, compact)
+        execution.run(io.StringIO(), source=InputSource(io.StringIO(number)))
+        assert execution.resume == 5
+        expected = "".join(str(i) for i in range(1, int(number) + 1)) + "3" * 2
+        assert execution.serve() == expected
+
+    # the executions worked on copies of the folded state
+    length, state = fold_prefix(folded, compact)
+    assert length == 5
+    assert state.values == [1, 2, 3, 2]
+    assert [len(dish) for dish in state.baking_dishes] == [1]
+
+
+def test_profiled_executions_fold_nothing(backend):
+    execution = BACKENDS[backend](program(METHOD))
+    profiler = Profiler()
+    execution.run(io.StringIO(), profiler, InputSource(io.StringIO("2")))
+    assert execution.resume == 0
+    assert execution.serve() == "1233"
+    assert profiler.lines["Folding.", 0][0] == 1
@@ -0,0 +1,121 @@
+import io
+
+import pytest
+
+from chef import BACKENDS, Chef
+from corpus import recipe
+
+POUR = "Pour contents of the mixing bowl into the baking dish."
+
+
+@pytest.fixture(params=sorted(BACKENDS))
+def backend(request):
+    return request.param
+
+
+def cook(ingredients, method, backend):
+    chef = Chef(recipe("Loops", ingredients, method), backend=backend)
+    chef.parse_script()
+    chef.execute_script(io.StringIO())
+    return chef
+
+
+def test_loop_counts_down(backend):
+    chef = cook(
+        ["3 g counter"],
+        [
+            "Heat the counter.",
+            "Put counter into the mixing bowl.",
+            "Cool the counter until heated.",
+            POUR,
+        ],
+        backend,
+    )
+    assert chef.serve() == "123"
+
+
+def test_loop_over_zero_is_skipped(backend):
+    chef = cook(
+        ["0 g counter", "7 g seven"],
+        [
+            "Put seven into the mixing bowl.",
+            "Heat the counter.",
+            "Put counter into the mixing bowl.",
+            "Heat the counter until heated.",
+            POUR,
+        ],
+        backend,
+    )
+    assert chef.serve() == "7"
+
+
+def test_loop_end_without_ingredient_does_not_count(backend):
+    chef = cook(
+        ["3 g counter", "1 g one"],
+        [
+            "Heat the counter.",
+            "Put counter into the mixing bowl.",
+            "Remove one from the mixing bowl.",
+            "Fold counter into the mixing bowl.",
+            "Put counter into the mixing bowl.",
+            "Heat until heated.",
+            POUR,
+        ],
+        backend,
+    )
+    # the method itself counts the counter down to 0
+    assert chef.serve() == "012"
+
+
+def test_nested_loops(backend):
+    chef = cook(
+        ["2 g outer", "0 g inner", "3 g three", "1 g one"],
+        [
+            "Heat the outer.",
+            "Put three into the mixing bowl.",
+            "Fold inner into the mixing bowl.",
+            "Whisk the inner.",
+            "Put one into the mixing bowl.",
+            "Whisk the inner until whisked.",
+            "Heat the outer until heated.",
+            POUR,
+        ],
+        backend,
+    )
+    assert chef.serve() == "1" * 6
+
+
+def test_set_aside_leaves_the_innermost_loop(backend):
+    chef = cook(
+        ["2 g outer", "5 g inner", "1 g one"],
+        [
+            "Heat the outer.",
+            "Whisk the inner.",
+            "Put one into the mixing bowl.",
+            "Set aside.",
+            "Put inner into the mixing bowl.",
+            "Whisk the inner until whisked.",
+            "Heat the outer until heated.",
+            POUR,
+        ],
+        backend,
+    )
+    # the inner loop runs once per outer iteration and never counts down
+    assert chef.serve() == "11"
+
+
+@pytest.mark.parametrize(
+    "method, message",
+    [
+        (["Heat the counter."], "Loop start without a matching loop end"),
+        (["Heat the counter until heated."], "Loop end without a matching loop start"),
+        (["Set aside."], "Set aside can only be used inside a loop"),
+        (
+            ["Heat the counter.", "Whisk the counter.", "Heat until heated."],
+            "Loop start without a matching loop end",
+        ),
+    ],
+)
+def test_unbalanced_loops(method, message):
+    with pytest.raises(ValueError, match=message):
+        Chef(recipe("Loops", ["1 g counter"], method)).parse_script()
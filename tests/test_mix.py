@@ -0,0 +1,65 @@
+import io
+import random
+
+import pytest
+
+from chef import BACKENDS, Chef
+from corpus import recipe
+
+COUNT = 50
+INGREDIENTS = [f"{i} g n{i}" for i in range(COUNT)]
+FILL = [f"Put n{i} into the mixing bowl." for i in range(COUNT)]
+SAUCE = "Sauce.\n\n" "Ingredients.\n0 g x\n\n" "Method.\nMix well.\n"
+METHOD = FILL + [
+    "Mix the mixing bowl well.",
+    "Serve with sauce.",
+    "Pour contents of the mixing bowl into the baking dish.",
+]
+
+
+def served(seed, backend="interpreter", compact=False):
+    chef = Chef(
+        recipe("Mix", INGREDIENTS, METHOD, auxiliary=SAUCE),
+        compact=compact,
+        backend=backend,
+        seed=seed,
+    )
+    chef.parse_script()
+    chef.execute_script(io.StringIO())
+    return [value for value, _ in chef.baking_dishes[0].serving_order()]
+
+
+def test_mix_is_a_shuffle():
+    # the bowl, then the sous-chef's bowl on top of it
+    values = served(seed=None)
+    assert sorted(values[:COUNT]) == sorted(values[COUNT:]) == list(range(COUNT))
+
+
+@pytest.mark.parametrize("compact", [False, True], ids=["list", "compact"])
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+def test_seeded_mix_is_the_same_everywhere(backend, compact):
+    assert served(1, backend, compact) == served(1)
+
+
+def test_seeded_mix_is_the_same_on_every_run():
+    chef = Chef(recipe("Mix", INGREDIENTS, METHOD, auxiliary=SAUCE), seed=3)
+    chef.parse_script()
+    runs = set()
+    for _ in range(3):
+        chef.execute_script(io.StringIO())
+        runs.add(chef.serve())
+    assert len(runs) == 1
+
+
+def test_seeds_mix_differently():
+    assert served(1) != served(2)
+
+
+def test_sous_chefs_continue_the_same_random_sequence():
+    rng = random.Random(1)
+    bowl = list(range(COUNT))
+    rng.shuffle(bowl)
+    # the sous-chef mixes its copy of the mixed bowl with the next numbers
+    sauce = bowl[:]
+    rng.shuffle(sauce)
+    assert served(1) == list(reversed(bowl + sauce))
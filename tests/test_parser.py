@@ -0,0 +1,115 @@
+import io
+
+import pytest
+
+from chef import Chef, Section, outline_sections, scan_sections
+from corpus import recipe
+
+SCRIPT = (
+    "Pancakes.\n"
+    "\n"
+    "A comment\non two lines.\n"
+    "\n\n   \n"
+    "Ingredients.\n72 ml letter\n"
+    "\n"
+    "Cooking time: 5 minutes.\n"
+    "\n"
+    "Pre-heat oven to 180 degrees Celsius.\n"
+    "\n"
+    "Method.\nPut letter into the mixing bowl.\n"
+    "Pour contents of the mixing bowl into the baking dish.\n"
+    "\n"
+    "Serves 1."
+)
+
+
+def test_sections():
+    sections = list(scan_sections(SCRIPT))
+    assert [section.text for section in sections] == [
+        "Pancakes.",
+        "A comment\non two lines.",
+        "Ingredients.\n72 ml letter",
+        "Cooking time: 5 minutes.",
+        "Pre-heat oven to 180 degrees Celsius.",
+        "Method.\nPut letter into the mixing bowl.\n"
+        "Pour contents of the mixing bowl into the baking dish.",
+        "Serves 1.",
+    ]
+    for section in sections:
+        assert SCRIPT[section.offset :].startswith(section.text)
+        assert SCRIPT.count("\n", 0, section.offset) + 1 == section.line
+
+
+@pytest.mark.parametrize("newline", ["\n", "\r\n"])
+def test_stream_and_string_scan_alike(newline):
+    script = SCRIPT.replace("\n", newline)
+    stream = io.StringIO(script, newline="")
+    assert list(scan_sections(stream)) == list(scan_sections(script))
+
+
+def test_crlf_is_stripped():
+    sections = list(scan_sections("Title.\r\n\r\nIngredients.\r\n1 g x\r\n"))
+    assert sections == [Section("Title.", 0, 1), Section("Ingredients.\n1 g x", 10, 3)]
+
+
+def test_outline():
+    kinds = [kind for kind, _ in outline_sections(scan_sections(SCRIPT))]
+    assert kinds == [
+        "title",
+        "comment",
+        "ingredients",
+        "cooking",
+        "pre-heat",
+        "method",
+        "serves",
+    ]
+
+
+def test_parse_script():
+    chef = Chef(SCRIPT)
+    chef.parse_script()
+    assert chef.recipe_name == "Pancakes."
+    assert chef.comment == "A comment\non two lines."
+    assert chef.cook_time == "Cooking time: 5 minutes."
+    assert chef.oven_temp == "Pre-heat oven to 180 degrees Celsius."
+    assert chef.number_of_diners == 1
+    assert len(chef.instructions) == 2
+
+
+@pytest.mark.parametrize(
+    "script, message",
+    [
+        ("", "please provide a valid recipe$"),
+        ("Not a title\n\nIngredients.\n1 g x", "please provide a valid recipe$"),
+        ("Title.\n\nMethod.\nPut x into the mixing bowl.", r"\(no ingredients\)"),
+        ("Title.\n\nIngredients.\n1 g x\n\nServes 1.", r"\(no method\)"),
+        (
+            "Title.\n\nIngredients.\n1 g x\n\nMethod.\nPut x into the mixing bowl.",
+            r"\(no serves\)",
+        ),
+        (
+            recipe("Title", ["1 g x"], ["Put x into the mixing bowl."])
+            + "Sauce.\n\nIngredients.\n1 g y",
+            r"\(no method\)",
+        ),
+    ],
+)
+def test_missing_section(script, message):
+    with pytest.raises(ValueError, match=message):
+        Chef(script).parse_script()
+
+
+def test_auxiliary_recipes():
+    chef = Chef(
+        recipe(
+            "Title",
+            ["1 g x"],
+            ["Serve with sauce.", "Serve with gravy."],
+            auxiliary=(
+                "Sauce.\n\nIngredients.\n1 g y\n\nMethod.\nPut y into the mixing bowl.\n\n"
+                "Gravy.\n\nIngredients.\n2 g z\n\nMethod.\nPut z into the mixing bowl."
+            ),
+        )
+    )
+    chef.parse_script()
+    assert [recipe.name for recipe in chef.auxiliary_recipes] == ["Sauce.", "Gravy."]
@@ -0,0 +1,97 @@
+import io
+import json
+
+import pytest
+
+from chef import BACKENDS, Chef, Profiler
+from corpus import recipe
+
+SAUCE = (
+    "Sauce.\n\n" "Ingredients.\n1 g x\n\n" "Method.\nPut x into the 2nd mixing bowl.\n"
+)
+METHOD = [
+    "Heat the counter.",
+    "Put one into the mixing bowl.",
+    "Serve with sauce.",
+    "Heat the counter until heated.",
+    "Pour contents of the mixing bowl into the baking dish.",
+]
+
+
+@pytest.fixture(params=sorted(BACKENDS))
+def profiled(request):
+    chef = Chef(recipe("Profiled", ["3 g counter", "1 g one"], METHOD, auxiliary=SAUCE))
+    chef.parse_script()
+    profiler = Profiler()
+    execution = BACKENDS[request.param](chef.program)
+    execution.run(io.StringIO(), profiler)
+    # every "Serve with" puts the sous-chef's copy of the bowl on top of it
+    assert execution.serve() == "1" * 14
+    return profiler
+
+
+def test_counts(profiled):
+    counts = {key: stats[0] for key, stats in profiled.lines.items()}
+    assert counts == {
+        ("Profiled.", 0): 4,
+        ("Profiled.", 1): 3,
+        ("Profiled.", 2): 3,
+        ("Profiled.", 3): 3,
+        ("Profiled.", 4): 1,
+        ("Sauce.", 0): 3,
+    }
+    assert {recipe: calls for recipe, (calls, _) in profiled.recipes.items()} == {
+        "Profiled.": 1,
+        "Sauce.": 3,
+    }
+    assert profiled.mixing_bowls == {("Profiled.", 1): 14, ("Sauce.", 2): 1}
+    assert profiled.baking_dishes == {("Profiled.", 1): 14}
+
+
+def test_serve_with_includes_the_sous_chef(profiled):
+    serve_with = profiled.lines["Profiled.", 2][1]
+    assert serve_with >= profiled.lines["Sauce.", 0][1]
+    assert profiled.recipes["Profiled."][1] >= serve_with
+
+
+def test_report(profiled):
+    sink = io.StringIO()
+    profiled.report(sink)
+    lines, recipes, stacks = sink.getvalue().split("\n\n")
+    lines = lines.splitlines()
+    assert lines[0].split() == ["seconds", "count", "line"]
+    # the hottest lines first, the line numbers start at 1
+    seconds = [float(line.split()[0]) for line in lines[1:]]
+    assert seconds == sorted(seconds, reverse=True)
+    assert any(line.endswith(" 3  Profiled. 3: Serve with sauce.") for line in lines)
+    assert len(lines) == 7
+    assert recipes.splitlines()[1].split()[1:] == ["1", "Profiled."]
+    assert stacks.splitlines() == [
+        "      peak  stack",
+        "        14  Profiled. mixing bowl 1",
+        "         1  Sauce. mixing bowl 2",
+        "        14  Profiled. baking dish 1",
+    ]
+
+
+def test_to_json(profiled):
+    data = json.loads(json.dumps(profiled.to_json()))
+    assert [line["seconds"] for line in data["lines"]] == sorted(
+        (line["seconds"] for line in data["lines"]), reverse=True
+    )
+    assert {
+        "recipe": "Profiled.",
+        "line": 3,
+        "text": "Serve with sauce.",
+        "count": 3,
+        "seconds": profiled.lines["Profiled.", 2][1],
+    } in data["lines"]
+    assert {line["recipe"] for line in data["lines"]} == {"Profiled.", "Sauce."}
+    assert {(r["recipe"], r["calls"]) for r in data["recipes"]} == {
+        ("Profiled.", 1),
+        ("Sauce.", 3),
+    }
+    assert {"recipe": "Sauce.", "number": 2, "peak_depth": 1} in data["mixing_bowls"]
+    assert data["baking_dishes"] == [
+        {"recipe": "Profiled.", "number": 1, "peak_depth": 14}
+    ]
@@ -0,0 +1,82 @@
+import io
+
+import pytest
+
+from chef import BACKENDS, Chef, check_method_line
+from corpus import recipe
+
+METHOD = [
+    "Put one into the mixing bowl.",
+    "Pour contents of the mixing bowl into the baking dish.",
+    "Refrigerate.",
+    "Put two into the mixing bowl.",
+    "Pour contents of the mixing bowl into the baking dish.",
+]
+
+
+@pytest.mark.parametrize("compact", [False, True], ids=["list", "compact"])
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+def test_bare_refrigerate_stops_the_recipe(backend, compact):
+    chef = Chef(
+        recipe("Refrigerate", ["1 g one", "2 g two"], METHOD),
+        compact=compact,
+        backend=backend,
+    )
+    chef.parse_script()
+    output = io.StringIO()
+    chef.execute_script(output)
+    assert chef.refrigerated
+    # without a number of hours nothing is served by Refrigerate itself
+    assert output.getvalue() == ""
+    assert chef.serve() == "1"
+
+
+@pytest.mark.parametrize("line", ["Refrigerate.", "Refrigerate for 2 hours."])
+def test_refrigerate_is_a_method_line(line):
+    check_method_line(line)
+
+
+def test_unknown_verb_is_rejected():
+    with pytest.raises(ValueError, match="Invalid instruction format"):
+        check_method_line("Bake.")
+
+
+TWO_DISHES = [
+    "Put one into the 1st mixing bowl.",
+    "Put two into the 2nd mixing bowl.",
+    "Pour contents of the 1st mixing bowl into the 1st baking dish.",
+    "Pour contents of the 2nd mixing bowl into the 2nd baking dish.",
+]
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+@pytest.mark.parametrize("hours, served", [(1, "1"), (2, "12"), (5, "12")])
+def test_refrigerate_for_hours_serves_the_first_dishes(backend, hours, served):
+    chef = Chef(
+        recipe(
+            "Refrigerate",
+            ["1 g one", "2 g two"],
+            TWO_DISHES
+            + [f"Refrigerate for {hours} hours.", "Put one into the 1st mixing bowl."],
+        ),
+        backend=backend,
+    )
+    chef.parse_script()
+    output = io.StringIO()
+    chef.execute_script(output)
+    assert chef.refrigerated
+    assert output.getvalue() == served
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+@pytest.mark.parametrize("serves, served", [(1, "1"), (2, "12")])
+def test_serves_sets_the_number_of_dishes_served(backend, serves, served):
+    chef = Chef(
+        recipe("Serves", ["1 g one", "2 g two"], TWO_DISHES, serves=serves),
+        backend=backend,
+    )
+    chef.parse_script()
+    chef.execute_script(io.StringIO())
+    assert not chef.refrigerated
+    assert chef.serve() == served
+    assert chef.serve(diners=2) == "12"
@@ -0,0 +1,70 @@
+import dataclasses
+import io
+
+import pytest
+
+from chef import BACKENDS, Chef
+from corpus import recipe
+
+# Changes its ingredients and liquefies one, so a run that is not reset
+# properly serves something else
+METHOD = [
+    "Put letter into the mixing bowl.",
+    "Put counter into the mixing bowl.",
+    "Add counter to the mixing bowl.",
+    "Fold counter into the mixing bowl.",
+    "Liquefy letter.",
+    "Put letter into the mixing bowl.",
+    "Put counter into the mixing bowl.",
+    "Add dry ingredients to the mixing bowl.",
+    "Pour contents of the mixing bowl into the baking dish.",
+]
+
+
+@pytest.fixture(params=sorted(BACKENDS))
+def backend(request):
+    return request.param
+
+
+@pytest.fixture
+def program():
+    chef = Chef(recipe("Reuse", ["72 g letter", "1 g counter"], METHOD))
+    chef.parse_script()
+    return chef.program
+
+
+def run(execution):
+    execution.run(io.StringIO())
+    return execution.serve()
+
+
+@pytest.mark.parametrize("compact", [False, True], ids=["list", "compact"])
+def test_execution_runs_again_from_scratch(program, backend, compact):
+    execution = BACKENDS[backend](program, compact=compact)
+    first = run(execution)
+    assert first == "22H72"
+    assert run(execution) == first
+    assert execution.values == [72, 2]
+
+
+def test_executions_of_a_program_are_independent(program, backend):
+    first = BACKENDS[backend](program)
+    second = BACKENDS[backend](program)
+    assert run(first) == run(second)
+    assert program.ingredients[0]["value"] == 72
+    assert program.ingredients[0]["ingredient_type"] == "dry"
+
+
+def test_programs_are_immutable(program):
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        program.name = "Other"
+
+
+def test_chef_runs_again(backend):
+    chef = Chef(
+        recipe("Reuse", ["72 g letter", "1 g counter"], METHOD), backend=backend
+    )
+    chef.parse_script()
+    for _ in range(3):
+        chef.execute_script(io.StringIO())
+        assert chef.serve() == "22H72"
@@ -0,0 +1,77 @@
+import io
+
+import pytest
+
+import chef as chef_module
+from chef import BACKENDS, Chef
+from corpus import recipe
+
+
+@pytest.fixture(params=sorted(BACKENDS))
+def backend(request):
+    return request.param
+
+
+def cook(method, backend, ingredients=("955 ml e", "72 ml h", "42 g answer")):
+    chef = Chef(recipe("Serve", list(ingredients), method), backend=backend)
+    chef.parse_script()
+    chef.execute_script(io.StringIO())
+    return chef
+
+
+WORD = [
+    "Put e into the mixing bowl.",
+    "Put h into the mixing bowl.",
+    "Put answer into the mixing bowl.",
+    "Pour contents of the mixing bowl into the baking dish.",
+]
+
+
+def test_serve_returns_a_string_without_a_sink(backend):
+    assert cook(WORD, backend).serve() == "42Hλ"
+
+
+def test_serve_to_text_and_binary_sinks(backend):
+    chef = cook(WORD, backend)
+    text = io.StringIO()
+    chef.serve(text)
+    binary = io.BytesIO()
+    chef.serve(binary)
+    assert text.getvalue() == "42Hλ"
+    assert binary.getvalue() == "42Hλ".encode("utf-8")
+
+
+def test_serving_leaves_the_dishes_untouched(backend):
+    chef = cook(WORD, backend)
+    assert chef.serve() == chef.serve()
+    assert len(chef.baking_dishes[0]) == 3
+
+
+class CountingSink(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        return super().write(text)
+
+
+def test_serve_writes_in_chunks(backend, monkeypatch):
+    monkeypatch.setattr(chef_module, "SERVE_CHUNK_SIZE", 4)
+    chef = cook(
+        ["Put answer into the mixing bowl."] * 10
+        + ["Pour contents of the mixing bowl into the baking dish."],
+        backend,
+    )
+    sink = CountingSink()
+    chef.serve(sink)
+    assert sink.getvalue() == "42" * 10
+    # every other value fills a chunk, the last write is the (empty) rest
+    assert sink.writes == 6
+
+
+def test_serve_without_baking_dishes(backend):
+    chef = cook(["Put answer into the mixing bowl."], backend)
+    with pytest.raises(ValueError, match="No baking dishes found"):
+        chef.serve()
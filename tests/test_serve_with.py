@@ -0,0 +1,81 @@
+import io
+
+import pytest
+
+from chef import BACKENDS, Chef
+from corpus import recipe
+
+POUR = "Pour contents of the 1st mixing bowl into the 1st baking dish."
+
+# Doubles the top of the mixing bowl, and empties the second mixing bowl of
+# its copy of the bowls
+DOUBLE = (
+    "Double Sauce.\n\n"
+    "Ingredients.\n0 g top\n\n"
+    "Method.\n"
+    "Fold top into the 1st mixing bowl.\n"
+    "Put top into the 1st mixing bowl.\n"
+    "Add top to the 1st mixing bowl.\n"
+    "Clean the 2nd mixing bowl.\n"
+)
+
+
+@pytest.fixture(params=sorted(BACKENDS))
+def backend(request):
+    return request.param
+
+
+def cook(method, backend, auxiliary=DOUBLE):
+    chef = Chef(
+        recipe("Serve With", ["3 g three", "5 g five"], method, auxiliary=auxiliary),
+        backend=backend,
+    )
+    chef.parse_script()
+    chef.execute_script(io.StringIO())
+    return chef
+
+
+def test_result_goes_on_top_of_the_first_bowl(backend):
+    chef = cook(
+        [
+            "Put five into the 1st mixing bowl.",
+            "Put three into the 1st mixing bowl.",
+            "Put five into the 2nd mixing bowl.",
+            "Serve with double sauce.",
+            "Pour contents of the 2nd mixing bowl into the 2nd baking dish.",
+            "Pour contents of the 1st mixing bowl into the 1st baking dish.",
+        ],
+        backend,
+    )
+    # the sous-chef worked on copies: its bowl (5 6) is put on top of ours
+    # (5 3), and our second bowl was not cleaned
+    assert chef.serve(diners=1) == "6535"
+    assert chef.serve(diners=2) == "65355"
+
+
+def test_recipe_names_ignore_case(backend):
+    chef = cook(
+        ["Put three into the 1st mixing bowl.", "Serve with Double Sauce.", POUR],
+        backend,
+    )
+    assert chef.serve() == "63"
+
+
+def test_sous_chef_programs_are_compiled_once(backend):
+    chef = cook(
+        [
+            "Put three into the 1st mixing bowl.",
+            "Serve with double sauce.",
+            "Serve with double sauce.",
+            POUR,
+        ],
+        backend,
+    )
+    assert chef.serve() == "12363"
+    program = chef.program.auxiliary_program("double sauce")
+    assert chef.program.auxiliary_program("Double Sauce") is program
+
+
+def test_missing_recipe(backend):
+    with pytest.raises(ValueError, match="Auxiliary recipe gravy not found"):
+        cook(["Put three into the 1st mixing bowl.", "Serve with gravy."], backend)
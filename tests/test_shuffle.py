@@ -0,0 +1,37 @@
+import random
+
+import pytest
+
+from chef import CompactMixingBowl, MixingBowl
+
+
+def fill(bowl, count):
+    for value in range(count):
+        bowl.push(None, value, value, "dry" if value % 3 else "liquid")
+    return bowl
+
+
+@pytest.mark.parametrize("count", [0, 1, 2, 10, 1000])
+@pytest.mark.parametrize("seed", [0, 1, 42])
+def test_compact_shuffle_matches_random_shuffle(seed, count):
+    expected = list(range(count))
+    random.Random(seed).shuffle(expected)
+
+    bowl = fill(CompactMixingBowl("Mixing Bowl 1"), count)
+    bowl.shuffle(random.Random(seed))
+    assert list(bowl.values) == expected
+    # the liquid flags and slots move with their values
+    assert list(bowl.slots) == expected
+    assert list(bowl.liquid) == [value % 3 == 0 for value in expected]
+
+
+@pytest.mark.parametrize("seed", [0, 7])
+def test_both_stacks_shuffle_alike(seed):
+    compact = CompactMixingBowl("Mixing Bowl 1")
+    bowl = MixingBowl("Mixing Bowl 1")
+    for value in range(50):
+        compact.push_value(None, value, "dry")
+        bowl.push_value(None, value, "dry")
+    compact.shuffle(random.Random(seed))
+    bowl.shuffle(random.Random(seed))
+    assert [ingredient.value for ingredient in bowl.ingredients] == list(compact.values)
@@ -0,0 +1,89 @@
+from array import array
+
+import pytest
+
+from chef import CompactMixingBowl, MixingBowl
+
+BIG = 1 << 70
+
+
+@pytest.fixture(params=[MixingBowl, CompactMixingBowl], ids=["list", "compact"])
+def bowl_class(request):
+    return request.param
+
+
+def filled(bowl_class, values, ingredient_type="dry"):
+    bowl = bowl_class("Mixing Bowl 1")
+    for value in values:
+        bowl.push_value(None, value, ingredient_type)
+    return bowl
+
+
+def test_stack_operations(bowl_class):
+    bowl = filled(bowl_class, [1, 2, 3])
+    assert len(bowl) == 3
+    assert bowl.top() == 3
+    bowl.set_top(4)
+    assert bowl.pop() == 4
+    assert list(bowl.serving_order()) == [(2, False), (1, False)]
+
+
+def test_liquefy(bowl_class):
+    bowl = filled(bowl_class, [65, 66])
+    bowl.push_value(None, 67, "liquid")
+    assert [liquid for _, liquid in bowl.serving_order()] == [True, False, False]
+    bowl.liquefy()
+    assert [liquid for _, liquid in bowl.serving_order()] == [True, True, True]
+
+
+def test_snapshots_copy_on_write(bowl_class):
+    bowl = filled(bowl_class, [1, 2])
+    snapshot = bowl.snapshot()
+    snapshot.set_top(5)
+    snapshot.push_value(None, 6, "dry")
+    assert list(bowl.serving_order()) == [(2, False), (1, False)]
+
+    other = bowl.snapshot()
+    bowl.pop()
+    assert [value for value, _ in other.serving_order()] == [2, 1]
+    assert [value for value, _ in snapshot.serving_order()] == [6, 5, 1]
+
+
+def test_release_empties_only_the_released_stack(bowl_class):
+    bowl = filled(bowl_class, [1, 2])
+    snapshot = bowl.snapshot()
+    snapshot.release()
+    assert len(snapshot) == 0
+    assert len(bowl) == 2
+
+
+def test_extend_copies(bowl_class):
+    source = filled(bowl_class, [1, 2], "liquid")
+    bowl = filled(bowl_class, [0])
+    bowl.extend(source)
+    source.set_top(9)
+    assert list(bowl.serving_order()) == [(2, True), (1, True), (0, False)]
+
+
+def test_big_values(bowl_class):
+    bowl = filled(bowl_class, [1, BIG])
+    bowl.set_top(BIG * 2)
+    bowl.push_value(None, -BIG, "dry")
+    assert [value for value, _ in bowl.serving_order()] == [-BIG, BIG * 2, 1]
+
+
+def test_compact_stacks_promote_their_values():
+    bowl = filled(CompactMixingBowl, [1, 2])
+    assert isinstance(bowl.values, array)
+    bowl.set_top(BIG)
+    assert bowl.values == [1, BIG]
+
+    # the values that fit are not appended twice when the others do not
+    other = filled(CompactMixingBowl, [3])
+    other.extend(bowl)
+    assert other.values == [3, 1, BIG]
+    assert len(other.liquid) == len(other.slots) == 3
+
+    # an emptied stack goes back to an array
+    other.release()
+    assert isinstance(other.values, array)
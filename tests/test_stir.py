@@ -0,0 +1,87 @@
+import io
+
+import pytest
+
+from chef import BACKENDS, Chef
+from corpus import recipe
+
+INGREDIENTS = ["1 g one", "2 g two", "3 g three", "4 g four"]
+FILL = [
+    "Put one into the mixing bowl.",
+    "Put two into the mixing bowl.",
+    "Put three into the mixing bowl.",
+    "Put four into the mixing bowl.",
+]
+POUR = "Pour contents of the mixing bowl into the baking dish."
+
+
+def cook(method, backend, compact, ingredients=()):
+    chef = Chef(
+        recipe("Stir", INGREDIENTS + list(ingredients), method),
+        compact=compact,
+        backend=backend,
+    )
+    chef.parse_script()
+    chef.execute_script(io.StringIO())
+    return chef.serve()
+
+
+@pytest.fixture(params=sorted(BACKENDS))
+def backend(request):
+    return request.param
+
+
+@pytest.fixture(params=[False, True], ids=["list", "compact"])
+def compact(request):
+    return request.param
+
+
+# The bowl is 1 2 3 4 from the bottom, it is served from the top
+@pytest.mark.parametrize(
+    "minutes, served",
+    [
+        (0, "4321"),  # nothing moves
+        (1, "3421"),
+        (2, "3241"),
+        (3, "3214"),  # the top goes to the bottom
+        (4, "3214"),  # as deep as the bowl
+        (10, "3214"),  # deeper than the bowl
+    ],
+)
+def test_stir_for_minutes(backend, compact, minutes, served):
+    method = FILL + [f"Stir the mixing bowl for {minutes} minutes.", POUR]
+    assert cook(method, backend, compact) == served
+
+
+@pytest.mark.parametrize("value, served", [(0, "4321"), (2, "3241"), (7, "3214")])
+def test_stir_ingredient(backend, compact, value, served):
+    method = FILL + ["Stir spoons into the mixing bowl.", POUR]
+    assert cook(method, backend, compact, [f"{value} g spoons"]) == served
+
+
+def test_stir_ingredient_uses_its_current_value(backend, compact):
+    method = FILL + [
+        "Fold spoons into the mixing bowl.",  # takes 4, leaves 1 2 3
+        "Stir spoons into the mixing bowl.",
+        POUR,
+    ]
+    assert cook(method, backend, compact, ["0 g spoons"]) == "213"
+
+
+def test_stir_numbered_bowl(backend, compact):
+    method = [line.replace("the mixing", "the 2nd mixing") for line in FILL]
+    method += [
+        "Stir the 2nd mixing bowl for 1 minute.",
+        "Pour contents of the 2nd mixing bowl into the baking dish.",
+    ]
+    assert cook(method, backend, compact) == "3421"
+
+
+def test_stir_empty_bowl(backend, compact):
+    method = [
+        "Stir the mixing bowl for 1 minute.",
+        "Put one into the mixing bowl.",
+        POUR,
+    ]
+    with pytest.raises(ValueError, match="Mixing bowl 1 is empty"):
+        cook(method, backend, compact)
@@ -0,0 +1,53 @@
+import math
+
+import pytest
+
+from corpus import CORPUS
+from suite import measure, regressions
+
+RESULT = {"parse": 0.01, "execute": 0.1, "serve": 0.001, "peak_memory": 1000}
+
+
+def changed(**changes):
+    return {"recipe": dict(RESULT, **changes)}
+
+
+def test_no_regressions():
+    assert regressions(changed(execute=0.12), {"recipe": RESULT}, 0.25) == []
+
+
+def test_slower_execution_is_a_regression():
+    assert regressions(changed(execute=0.2), {"recipe": RESULT}, 0.25) == [
+        ("recipe", "execute", 0.1, 0.2)
+    ]
+
+
+def test_noise_is_not_a_regression():
+    # 1 ms to 1.9 ms is below the noise floor
+    assert regressions(changed(serve=0.0019), {"recipe": RESULT}, 0.25) == []
+
+
+def test_memory_has_no_noise_floor():
+    assert regressions(changed(peak_memory=2000), {"recipe": RESULT}, 0.25) == [
+        ("recipe", "peak_memory", 1000, 2000)
+    ]
+
+
+def test_recipes_missing_from_the_baseline_are_skipped():
+    assert regressions(changed(execute=1.0), {"other": RESULT}, 0.25) == []
+
+
+@pytest.mark.parametrize("compact", [False, True], ids=["list", "compact"])
+def test_measure(compact):
+    result = measure(CORPUS["factorial"](1), compact, repeat=1)
+    assert result["bytes_served"] == len(str(math.factorial(30)))
+    assert result["instructions"] > 0
+    assert result["instructions_per_second"] == pytest.approx(
+        result["instructions"] / result["execute"]
+    )
+    assert result["peak_memory"] > 0
+
+
+def test_folded_instructions_are_not_counted():
+    # hello_world is folded entirely before it runs
+    assert measure(CORPUS["hello_world"](1), repeat=1)["instructions"] == 0
@@ -0,0 +1,119 @@
+import io
+import sys
+
+import pytest
+
+from chef import BACKENDS, Chef, InputSource, NumberTokens
+from corpus import recipe
+
+TAKE_TWO = recipe(
+    "Take",
+    ["0 g x", "0 g y"],
+    [
+        "Take x from refrigerator.",
+        "Take y from the refrigerator.",
+        "Put x into the mixing bowl.",
+        "Put y into the mixing bowl.",
+        "Pour contents of the mixing bowl into the baking dish.",
+    ],
+)
+
+
+def numbers(source):
+    taken = []
+    while (number := source.read_number()) is not None:
+        taken.append(number)
+    return taken
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 1 << 16])
+@pytest.mark.parametrize("data", ["12 -345\n\t6 ", "12 -345\n\t6"])
+def test_numbers_across_chunks(data, chunk_size):
+    text = InputSource(io.StringIO(data), chunk_size)
+    binary = InputSource(io.BytesIO(data.encode()), chunk_size)
+    assert numbers(text) == numbers(binary) == [12, -345, 6]
+
+
+def test_end_of_input_stays_the_end():
+    source = InputSource(io.StringIO(" 1 "))
+    assert numbers(source) == [1]
+    assert source.read_number() is None
+
+
+@pytest.mark.parametrize("stream", [io.StringIO("1 2x 3"), io.BytesIO(b"1 2x 3")])
+def test_bad_token(stream):
+    source = InputSource(stream, chunk_size=1)
+    assert source.read_number() == 1
+    with pytest.raises(ValueError, match="Invalid input for Take, 2x is not a number"):
+        source.read_number()
+
+
+def test_standard_input_is_read_as_bytes(monkeypatch):
+    monkeypatch.setattr(sys, "stdin", io.TextIOWrapper(io.BytesIO(b"4 5")))
+    source = InputSource()
+    assert numbers(source) == [4, 5]
+    assert source.stream is sys.stdin.buffer
+
+
+def test_read1_is_preferred():
+    class Pipe(io.BytesIO):
+        # what a pipe has at hand, a byte at a time
+        def read1(self, size=-1):
+            return super().read(1)
+
+        def read(self, size=-1):
+            raise AssertionError("read would wait for a whole chunk")
+
+    assert numbers(InputSource(Pipe(b"10 20"))) == [10, 20]
+
+
+def test_number_tokens():
+    tokens = NumberTokens()
+    tokens.feed("1 2")
+    assert list(tokens.tokens) == ["1"]
+    tokens.feed("3 ")
+    assert list(tokens.tokens) == ["23"]
+    tokens.feed("")
+    assert tokens.done
+
+
+@pytest.fixture(params=sorted(BACKENDS))
+def backend(request):
+    return request.param
+
+
+def cook(backend, source):
+    chef = Chef(TAKE_TWO, backend=backend)
+    chef.parse_script()
+    chef.execute_script(io.StringIO(), source)
+    return chef.serve()
+
+
+def test_take(backend):
+    assert cook(backend, InputSource(io.StringIO("3\n4\n"))) == "43"
+
+
+def test_take_from_any_source(backend):
+    class Counter:
+        def __init__(self):
+            self.number = 0
+
+        def read_number(self):
+            self.number += 1
+            return self.number
+
+    assert cook(backend, Counter()) == "21"
+
+
+def test_take_at_the_end_of_the_input(backend):
+    with pytest.raises(
+        ValueError, match="No more input to take y from the refrigerator"
+    ):
+        cook(backend, InputSource(io.StringIO("3")))
+
+
+def test_take_a_bad_token(backend):
+    with pytest.raises(
+        ValueError, match="Invalid input for Take, three is not a number"
+    ):
+        cook(backend, InputSource(io.StringIO("three 4")))
@@ -0,0 +1,52 @@
+import ast
+import dataclasses
+import io
+
+import pytest
+
+from chef import Chef, Cookbook, transpile
+from corpus import recipe
+
+HOSTILE_TITLE = "Main\rimport os; os.system('echo INJECTED'); z = 1"
+
+
+def hello(title):
+    return recipe(
+        title,
+        ["72 ml letter"],
+        [
+            "Put letter into the mixing bowl.",
+            "Pour contents of the mixing bowl into the baking dish.",
+        ],
+    )
+
+
+def test_hostile_title_is_not_executed(capfd):
+    chef = Chef(hello(HOSTILE_TITLE), backend="python")
+    chef.parse_script()
+    chef.execute_script(io.StringIO())
+    assert chef.serve() == "H"
+    assert "INJECTED" not in capfd.readouterr().out
+
+
+def test_hostile_title_in_a_cookbook_is_not_executed(tmp_path, capfd):
+    path = tmp_path / "cookbook.chef"
+    path.write_text(hello(HOSTILE_TITLE), newline="")
+    cookbook = Cookbook(str(path), cache=False, backend="python")
+    output = io.StringIO()
+    for name in cookbook:
+        cookbook.cook(name, output)
+    assert output.getvalue() == "H"
+    assert "INJECTED" not in capfd.readouterr().out
+
+
+@pytest.mark.parametrize(
+    "separator", ["\n", "\r", "\x0b", "\x0c", "\x1c", "\x85", " ", "\x00"]
+)
+def test_title_cannot_leave_the_comment(separator):
+    chef = Chef(hello("Main"))
+    chef.parse_script()
+    name = f"Main{separator}raise SystemExit{separator}"
+    program = dataclasses.replace(chef.program, name=name)
+    module = ast.parse(transpile(program))
+    assert [type(node) for node in module.body] == [ast.FunctionDef]